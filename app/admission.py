@@ -0,0 +1,167 @@
+"""
+Admission control: bounded concurrency and load shedding in front of the routes.
+
+Requests are split into classes - reads (GET, and the POST batch-gets) and
+writes - and each class has its own ConcurrencyLimiter. Up to `limit`
+requests of a class run at once. Up to `max_queue` more wait in FIFO order
+for a slot, and a request that has not got one within `max_wait` is
+rejected. So is one that finds the queue full, at once. Either way the
+client gets 503 with Retry-After instead of waiting behind work the server
+cannot finish in time; under overload, latency stays bounded by the queue
+instead of growing until clients time out.
+
+An optional per-client token bucket (RATE_LIMIT_RPS) answers 429 to a
+client sending more than its share, before it takes a slot.
+
+/health and /metrics are never limited. A slot is held until the response
+starts: a streaming export is limited until its first bytes are ready.
+Everything runs on the event loop, so no locks are needed.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from app import metrics
+
+ADMISSION_READ_LIMIT = int(os.getenv("ADMISSION_READ_LIMIT", "32"))
+ADMISSION_READ_QUEUE = int(os.getenv("ADMISSION_READ_QUEUE", "128"))
+ADMISSION_WRITE_LIMIT = int(os.getenv("ADMISSION_WRITE_LIMIT", "64"))
+ADMISSION_WRITE_QUEUE = int(os.getenv("ADMISSION_WRITE_QUEUE", "256"))
+ADMISSION_MAX_WAIT_MS = float(os.getenv("ADMISSION_MAX_WAIT_MS", "2000"))
+ADMISSION_RETRY_AFTER_S = int(os.getenv("ADMISSION_RETRY_AFTER_S", "1"))
+RATE_LIMIT_RPS = float(os.getenv("RATE_LIMIT_RPS", "0"))  # per client; 0 = off
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "20"))
+# e.g. X-Forwarded-For behind a proxy, or an API key header; default: the peer address
+RATE_LIMIT_KEY_HEADER = os.getenv("RATE_LIMIT_KEY_HEADER", "")
+
+EXEMPT_ROUTES = {"/health", "/metrics"}
+READ_POSTS = {"/books/batch-get", "/authors/batch-get"}
+
+
+class ConcurrencyLimiter:
+    def __init__(self, name: str, limit: int, max_queue: int, max_wait: float):
+        self.name, self.limit, self.max_queue, self.max_wait = name, limit, max_queue, max_wait
+        self.active = 0
+        self._waiters: deque = deque()
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> Optional[str]:
+        """None once a slot is held (release() it), else why the request was shed."""
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            metrics.admission_in_flight.inc((self.name,))
+            return None
+        if len(self._waiters) >= self.max_queue:
+            return "queue_full"
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        metrics.admission_queue_depth.inc((self.name,))
+        started = time.perf_counter()
+        try:
+            await asyncio.wait((waiter,), timeout=self.max_wait)
+        except asyncio.CancelledError:
+            if waiter.done():
+                self.release()  # handed a slot just as the client went away
+            else:
+                self._waiters.remove(waiter)
+            raise
+        finally:
+            metrics.admission_queue_depth.dec((self.name,))
+            metrics.admission_wait.observe((self.name,), time.perf_counter() - started)
+        if waiter.done():
+            return None
+        self._waiters.remove(waiter)
+        waiter.cancel()
+        return "timeout"
+
+    def release(self) -> None:
+        metrics.admission_in_flight.dec((self.name,))
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # the slot passes to the waiter; active is unchanged
+                metrics.admission_in_flight.inc((self.name,))
+                return
+        self.active -= 1
+
+
+class TokenBuckets:
+    """Per-client token buckets: `rate` requests/s sustained, bursts of up to `burst`.
+
+    Only the last max_clients clients are tracked; one that is forgotten
+    starts again with a full bucket.
+    """
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 10000):
+        self.rate, self.burst, self.max_clients = rate, burst, max_clients
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def take(self, client: str) -> float:
+        """0 if the client may go ahead (one token taken), else seconds until it may."""
+        now = time.monotonic()
+        tokens, stamp = self._buckets.pop(client, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - stamp) * self.rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / self.rate
+        self._buckets[client] = (tokens, now)
+        if len(self._buckets) > self.max_clients:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+limiters = {
+    "read": ConcurrencyLimiter("read", ADMISSION_READ_LIMIT, ADMISSION_READ_QUEUE, ADMISSION_MAX_WAIT_MS / 1000),
+    "write": ConcurrencyLimiter("write", ADMISSION_WRITE_LIMIT, ADMISSION_WRITE_QUEUE, ADMISSION_MAX_WAIT_MS / 1000),
+}
+rate_limiter: Optional[TokenBuckets] = TokenBuckets(RATE_LIMIT_RPS, RATE_LIMIT_BURST) if RATE_LIMIT_RPS > 0 else None
+
+
+def request_class(method: str, route: str) -> str:
+    if method in ("GET", "HEAD", "OPTIONS") or route in READ_POSTS:
+        return "read"
+    return "write"
+
+
+def _client_key(request: Request) -> str:
+    if RATE_LIMIT_KEY_HEADER and request.headers.get(RATE_LIMIT_KEY_HEADER):
+        return request.headers[RATE_LIMIT_KEY_HEADER].split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def _reject(status_code: int, message: str, retry_after: float) -> JSONResponse:
+    return JSONResponse(status_code=status_code, content={"error": message},
+                        headers={"Retry-After": str(max(1, math.ceil(retry_after)))})
+
+
+async def admit(request: Request, call_next):
+    stats = metrics.current_request.get()
+    route = stats.route if stats else metrics.route_template(request)
+    if route in EXEMPT_ROUTES:
+        return await call_next(request)
+    cls = request_class(request.method, route)
+    if rate_limiter is not None:
+        wait = rate_limiter.take(_client_key(request))
+        if wait:
+            metrics.admission_shed.inc((cls, "rate_limited"))
+            return _reject(429, "Too many requests.", wait)
+    limiter = limiters[cls]
+    reason = await limiter.acquire()
+    if reason:
+        metrics.admission_shed.inc((cls, reason))
+        return _reject(503, "Server busy, retry later.", ADMISSION_RETRY_AFTER_S)
+    try:
+        return await call_next(request)
+    finally:
+        limiter.release()
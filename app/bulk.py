@@ -0,0 +1,120 @@
+"""
+Bulk ingest for POST /authors/bulk and POST /books/bulk.
+
+The body is a JSON array or NDJSON (one object per line, Content-Type
+application/x-ndjson), which is parsed as it streams in. Rows are validated
+with the normal AuthorCreate/BookCreate schemas and written in chunks of
+BULK_CHUNK_SIZE through the write queue; the next chunk is parsed while the
+previous one is being written.
+"""
+import asyncio
+import json
+import os
+from typing import Any, AsyncIterator, Callable, List, Optional
+
+from fastapi import Request
+from pydantic import BaseModel, ValidationError
+from starlette.concurrency import run_in_threadpool
+
+from app.writer import write_queue
+
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", "5000"))
+NDJSON_TYPES = {"application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines"}
+
+# request body documentation for the bulk routes (the body is read as a stream)
+BULK_OPENAPI = {"requestBody": {"required": True, "content": {
+    "application/json": {"schema": {"type": "array", "items": {"type": "object"}}},
+    "application/x-ndjson": {"schema": {"type": "string", "description": "one JSON object per line"}},
+}}}
+
+
+class BulkFormatError(ValueError):
+    """The request body is neither a JSON array nor NDJSON."""
+
+
+class _Malformed:
+    def __init__(self, error: str):
+        self.error = error
+
+
+def _parse_line(line: bytes) -> Any:
+    try:
+        return json.loads(line)
+    except ValueError:
+        return _Malformed("Malformed JSON line.")
+
+
+async def iter_records(request: Request) -> AsyncIterator[Any]:
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type in NDJSON_TYPES:
+        pending = b""
+        async for chunk in request.stream():
+            *lines, pending = (pending + chunk).split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield _parse_line(line)
+        if pending.strip():
+            yield _parse_line(pending)
+        return
+    try:
+        body = json.loads(await request.body())
+    except ValueError:
+        raise BulkFormatError("Body must be a JSON array or NDJSON.")
+    if not isinstance(body, list):
+        raise BulkFormatError("Body must be a JSON array or NDJSON.")
+    for obj in body:
+        yield obj
+
+
+def _validate(schema: type[BaseModel], raw: list, results: list) -> list:
+    """Validates (row, obj) pairs; fills results for invalid rows, returns (row, model) for the rest."""
+    valid = []
+    for row, obj in raw:
+        if isinstance(obj, _Malformed):
+            results[row] = {"row": row, "status": "error", "error": obj.error}
+            continue
+        try:
+            valid.append((row, schema.model_validate(obj)))
+        except ValidationError as e:
+            results[row] = {"row": row, "status": "error", "error": "Validation failed.",
+                            "details": [{"loc": err.get("loc"), "msg": err.get("msg")} for err in e.errors()]}
+    return valid
+
+
+async def ingest(records: AsyncIterator[Any], schema: type[BaseModel], bulk_fn: Callable) -> dict:
+    """Validates and writes records; returns {"created", "failed", "results"} with one result per row."""
+    results: List[Optional[dict]] = []
+    in_flight = None  # (rows, future) of the chunk being written
+
+    async def write(raw: list):
+        nonlocal in_flight
+        # validation is CPU-bound, keep it off the event loop
+        valid = await run_in_threadpool(_validate, schema, raw, results)
+        if in_flight:
+            await collect(*in_flight)
+        in_flight = ([row for row, _ in valid],
+                     asyncio.wrap_future(write_queue.submit(bulk_fn, [m for _, m in valid])) if valid else None)
+
+    async def collect(rows: list, future):
+        try:
+            outcomes = await future if future else []
+        except Exception as e:
+            outcomes = [("error", f"Server error: {e}")] * len(rows)
+        for row, (status, value) in zip(rows, outcomes):
+            results[row] = ({"row": row, "status": "created", "id": value} if status == "created"
+                            else {"row": row, "status": "error", "error": value})
+
+    raw: list = []
+    async for obj in records:
+        raw.append((len(results), obj))
+        results.append(None)
+        if len(raw) >= BULK_CHUNK_SIZE:
+            await write(raw)
+            raw = []
+    if raw:
+        await write(raw)
+    if in_flight:
+        await collect(*in_flight)
+
+    created = sum(1 for r in results if r["status"] == "created")
+    return {"created": created, "failed": len(results) - created, "results": results}
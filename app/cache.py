@@ -0,0 +1,210 @@
+"""
+Process-local caches and the table version counters that invalidate them.
+
+Writers in app/crud.py bump the version of every table they change after the
+commit. Cached values remember the versions they were computed under, so a
+bump makes them stale without having to find and delete them. Detail
+responses are cached per entity instead and invalidated key by key.
+
+In the app, versions are not counted locally but set to the sequence number
+of the change in the shared invalidation log (app/invalidation.py), so every
+worker process agrees on them.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Iterable, Optional
+
+
+class TableVersions:
+    def __init__(self):
+        self._versions: dict[str, int] = {}
+        self._floor = 0
+        self._lock = threading.Lock()
+
+    def bump(self, *tables: str, version: Optional[int] = None) -> None:
+        """Adds one to each table's version, or moves it up to `version`."""
+        with self._lock:
+            for t in tables:
+                current = self._versions.get(t, self._floor)
+                self._versions[t] = current + 1 if version is None else max(current, version)
+
+    def get(self, *tables: str) -> tuple[int, ...]:
+        return tuple(self._versions.get(t, self._floor) for t in tables)
+
+    def raise_floor(self, version: int) -> None:
+        """Moves every table below `version` up to it."""
+        with self._lock:
+            self._floor = max(self._floor, version)
+            for t, v in self._versions.items():
+                self._versions[t] = max(v, version)
+
+    def reset(self, version: int) -> None:
+        """Puts every table at `version`, for when changes may have been missed."""
+        with self._lock:
+            self._versions.clear()
+            self._floor = version
+
+
+class CountCache:
+    """Bounded LRU of filtered COUNT(*) results keyed on the normalized filter set."""
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._entries: OrderedDict[Hashable, tuple[tuple, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, key: Hashable, version: tuple, stale_ok: bool = False) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry[0] != version and not stale_ok):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, version: tuple, value: int) -> None:
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, version: tuple, compute: Callable[[], int],
+                       mode: str = "exact", estimate: Optional[Callable[[], int]] = None) -> Optional[int]:
+        """mode: exact -> current count; estimate -> any cached count (even from an
+        older version) or the cheap `estimate`, falling back to exact; none -> None."""
+        if mode == "none":
+            return None
+        if mode == "estimate":
+            cached = self.get(key, version, stale_ok=True)
+            if cached is not None:
+                return cached
+            if estimate is not None:
+                return estimate()
+        cached = self.get(key, version)
+        if cached is not None:
+            return cached
+        value = compute()
+        self.put(key, version, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class EntityCache:
+    """Bounded LRU + TTL cache of serialized detail responses.
+
+    Keys are (table, id). An entry may also be tagged with the keys of other
+    entities it embeds (a book embeds its author), so invalidating the author
+    drops the book entries too. Readers take `generation` before loading and
+    pass it to put(); if anything was invalidated meanwhile the put is dropped,
+    so a slow reader can never cache data older than a concurrent write.
+
+    version(key) is the generation of the key's last invalidation (or the
+    version passed to invalidate()), whether or not it was cached (ETags are
+    built from it). Only the last max_versions
+    invalidated keys are remembered; older ones report the highest generation
+    forgotten so far, which can make an unchanged row look changed but never
+    the reverse.
+    """
+
+    def __init__(self, maxsize: int = 2048, ttl: float = 300.0, max_versions: int = 65536):
+        self.maxsize, self.ttl, self.max_versions = maxsize, ttl, max_versions
+        self._entries: OrderedDict[Hashable, tuple[float, Any, tuple]] = OrderedDict()
+        self._tagged: dict[Hashable, set] = {}
+        self._versions: OrderedDict[Hashable, int] = OrderedDict()
+        self._version_floor = 0
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def get(self, key: Hashable) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] < time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, value: Any, tags: Iterable[Hashable] = (), generation: Optional[int] = None) -> None:
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            if key in self._entries:
+                self._drop(key)
+            tags = tuple(tags)
+            self._entries[key] = (time.monotonic() + self.ttl, value, tags)
+            for tag in tags:
+                self._tagged.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, *keys: Hashable, version: Optional[int] = None) -> None:
+        with self._lock:
+            self.generation += 1
+            for key in keys:
+                self._drop(key)
+                for tagged in list(self._tagged.get(key, ())):
+                    self._drop(tagged)
+                self._versions[key] = self.generation if version is None else version
+                self._versions.move_to_end(key)
+            while len(self._versions) > self.max_versions:
+                _, forgotten = self._versions.popitem(last=False)
+                self._version_floor = max(self._version_floor, forgotten)
+
+    def version(self, key: Hashable) -> int:
+        return self._versions.get(key, self._version_floor)
+
+    def raise_versions(self, version: int) -> None:
+        """Moves every key's version below `version` up to it, and drops the cached
+        entries: their ETags were built from the old versions."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._tagged.clear()
+            self._version_floor = max(self._version_floor, version)
+            for key, v in self._versions.items():
+                if v < version:
+                    self._versions[key] = version
+
+    def _drop(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tagged.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tagged[tag]
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "maxsize": self.maxsize, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "expirations": self.expirations}
+
+    def clear(self, version: Optional[int] = None) -> None:
+        """Drops everything; every key then reports `version` (default: the new generation)."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._tagged.clear()
+            self._versions.clear()
+            self._version_floor = self.generation if version is None else version
+
+
+table_versions = TableVersions()
+count_cache = CountCache()
+entity_cache = EntityCache()
@@ -0,0 +1,179 @@
+"""
+Response compression with a cache of compressed bodies.
+
+The middleware in main.py picks an encoding from Accept-Encoding (zstd and br
+when their packages are installed, gzip always) and compresses response
+bodies of at least COMPRESS_MIN_BYTES with a compressible content type.
+
+Compressing a 100-row page costs far more CPU than serializing it, and
+the hot pages are the same bytes request after request. So 200 responses
+to GET that carry an ETag are kept compressed in a bounded LRU
+(COMPRESS_CACHE_MB), keyed by path, normalized query and encoding, along
+with their headers. The ETag is the data version: it changes with every
+write to the tables or rows behind the response (app/conditional.py).
+
+A request with a cached entry is sent on with the entry's ETag in
+If-None-Match (unless the client sent its own). The handlers check it
+against the current versions before running any query, so a 304 means the
+entry is current: it is sent as the 200, and the request costs neither the
+query, the serialization nor the compression. Any other answer replaces
+the entry.
+
+Streaming responses (exports) have no Content-Length and pass through
+unchanged.
+"""
+import gzip
+import os
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+from fastapi import Request, Response
+from starlette.concurrency import run_in_threadpool
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_CACHE_MB = float(os.getenv("COMPRESS_CACHE_MB", "32"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "5"))
+ZSTD_LEVEL = int(os.getenv("ZSTD_LEVEL", "3"))
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/x-ndjson")
+# larger bodies are compressed on the threadpool, not on the event loop
+_INLINE_MAX = 64 * 1024
+
+# encoding -> compress(bytes); in order of preference when the client accepts several equally
+CODECS: Dict[str, Callable[[bytes], bytes]] = {}
+try:  # optional: pip install zstandard
+    import zstandard
+
+    _zstd = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    CODECS["zstd"] = _zstd.compress
+except ImportError:
+    pass
+try:  # optional: pip install brotli
+    import brotli
+
+    CODECS["br"] = lambda data: brotli.compress(data, quality=BROTLI_QUALITY)
+except ImportError:
+    pass
+CODECS["gzip"] = lambda data: gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """The encoding to use for an Accept-Encoding header, or None for identity."""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            accepted[name] = q
+    best, best_q = None, 0.0
+    for encoding in CODECS:
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compressible(content_type: str) -> bool:
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def cache_key(request: Request, encoding: str) -> tuple:
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    return request.url.path, query, encoding
+
+
+class Compressed(NamedTuple):
+    etag: str
+    headers: List[Tuple[bytes, bytes]]  # raw headers of the compressed 200
+    body: bytes
+
+
+class CompressedCache:
+    """LRU of compressed responses, bounded by the total size of their bodies in bytes.
+
+    Only used from the event loop (the compression middleware), so unlocked.
+    get() only looks up: whether an entry is still current is up to the caller,
+    which counts it with hit() or miss().
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: OrderedDict[Hashable, Compressed] = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Compressed]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def hit(self) -> None:
+        self.hits += 1
+
+    def miss(self) -> None:
+        self.misses += 1
+
+    def put(self, key: Hashable, entry: Compressed) -> None:
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.size -= len(old.body)
+        if len(entry.body) > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self.size += len(entry.body)
+        while self.size > self.max_bytes:
+            _, old = self._entries.popitem(last=False)
+            self.size -= len(old.body)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.size = 0
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "bytes": self.size, "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions}
+
+
+compressed_cache = CompressedCache(int(COMPRESS_CACHE_MB * 1024 * 1024))
+
+
+async def compress(request: Request, call_next):
+    encoding = negotiate(request.headers.get("accept-encoding", ""))
+    key = cache_key(request, encoding) if encoding and request.method == "GET" else None
+    cached = compressed_cache.get(key) if key else None
+    revalidating = cached is not None and "if-none-match" not in request.headers
+    if revalidating:
+        request.scope["headers"] = [*request.scope["headers"], (b"if-none-match", cached.etag.encode())]
+    response = await call_next(request)
+    if revalidating and response.status_code == 304:
+        compressed_cache.hit()
+        current = Response(cached.body)
+        current.raw_headers = cached.headers
+        return current
+    length = response.headers.get("content-length")
+    if (length is None or int(length) < COMPRESS_MIN_BYTES or "content-encoding" in response.headers
+            or not compressible(response.headers.get("content-type", ""))):
+        return response
+    response.headers.append("Vary", "Accept-Encoding")
+    if encoding is None:
+        return response
+    etag = response.headers.get("etag")
+    raw = b"".join([chunk async for chunk in response.body_iterator])
+    codec = CODECS[encoding]
+    body = codec(raw) if len(raw) <= _INLINE_MAX else await run_in_threadpool(codec, raw)
+    compressed = Response(body, status_code=response.status_code)
+    compressed.raw_headers = [(k, v) for k, v in response.raw_headers if k != b"content-length"] + [
+        (b"content-encoding", encoding.encode()), (b"content-length", str(len(body)).encode())]
+    if key and response.status_code == 200 and etag:
+        compressed_cache.miss()
+        compressed_cache.put(key, Compressed(etag, compressed.raw_headers, body))
+    return compressed
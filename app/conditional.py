@@ -0,0 +1,76 @@
+"""
+Conditional GET: ETag / If-None-Match, Cache-Control and Last-Modified.
+
+List ETags combine the table version counters (app/cache.py, bumped by the
+write paths in app/crud.py) with the query string, so a poll whose tables
+have not changed is answered 304 before any query runs. Detail ETags are
+built from the entity cache's per-row versions of the row and every row it
+embeds; when the response is cached its ETag is checked before any query or
+serialization too.
+
+Versions are sequence numbers from the invalidation log shared by all worker
+processes (app/invalidation.py), so an ETag is valid in every process and
+after a restart. Each ETag also carries the database's epoch token: if the
+file is replaced, old ETags stop matching instead of matching different data.
+"""
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Hashable, Iterable, Optional
+
+from fastapi import Request, Response
+
+from app.cache import entity_cache, table_versions
+from app.invalidation import invalidation_log
+
+CACHE_MAX_AGE = int(os.getenv("CACHE_MAX_AGE", "0"))
+CACHE_CONTROL = f"max-age={CACHE_MAX_AGE}, must-revalidate"
+
+
+def list_etag(request: Request, *tables: str) -> str:
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    digest = hashlib.blake2b(f"{request.url.path}?{query}".encode(), digest_size=8).hexdigest()
+    versions = ".".join(map(str, table_versions.get(*tables)))
+    return f'W/"{invalidation_log.epoch}-{versions}-{digest}"'
+
+
+def entity_etag(keys: Iterable[Hashable], generation: int) -> Optional[str]:
+    """ETag for a detail response loaded after reading entity_cache.generation.
+
+    None when anything was invalidated since: the versions may already be
+    newer than the data that was loaded.
+    """
+    versions = ".".join(str(entity_cache.version(k)) for k in keys)
+    if entity_cache.generation != generation:
+        return None
+    return f'W/"{invalidation_log.epoch}-{versions}"'
+
+
+def last_modified(*objs) -> Optional[datetime]:
+    stamps = [o.updated_at or o.created_at for o in objs if o is not None]
+    return max(stamps) if stamps else None
+
+
+def headers(etag: Optional[str], modified: Optional[datetime] = None) -> dict:
+    h = {"Cache-Control": CACHE_CONTROL}
+    if etag:
+        h["ETag"] = etag
+    if modified:
+        h["Last-Modified"] = format_datetime(modified.replace(tzinfo=timezone.utc), usegmt=True)
+    return h
+
+
+def is_fresh(request: Request, etag: Optional[str]) -> bool:
+    """If-None-Match matches etag (weak comparison)."""
+    header = request.headers.get("if-none-match")
+    if not header or not etag:
+        return False
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+def not_modified(etag: str, modified: Optional[datetime] = None) -> Response:
+    return Response(status_code=304, headers=headers(etag, modified))
@@ -1,40 +1,232 @@
-from typing import Optional, Tuple, List
-from sqlalchemy.orm import Session
-from sqlalchemy import select, func, asc, desc
+from datetime import datetime
+from typing import Iterator, Optional, Tuple, List
+from sqlalchemy.orm import Session, contains_eager, joinedload, load_only, selectinload
+from sqlalchemy import select, insert, update, func, asc, desc, and_, or_, tuple_, literal, event, bindparam, false
+from sqlalchemy.exc import IntegrityError
+from app import invalidation, stats, uniqueness
+from app.cache import table_versions, count_cache
 from app.models import Author, Book
+from app.search import books_fts, authors_fts, fts_query, deferred_indexing
+from app.utils.pagination import encode_cursor, decode_cursor, InvalidCursorError
 from app.schemas import AuthorCreate
 from app.schemas import BookCreate, BookUpdate
 
-def create_author(db: Session, author_in: AuthorCreate) -> Author:
-    author = Author(name=author_in.name, email=author_in.email)
-    db.add(author); db.commit(); db.refresh(author)
-    return author
+# Write side effects (version bumps, cache invalidation) are recorded in the
+# shared invalidation log within the write's transaction (app/invalidation.py)
+# and applied by the after_commit event, so they take effect once the change
+# is really committed - by the request's own commit, or by a batch commit in
+# app/writer.py (which passes commit=False and commits many writes at once).
+# Other worker processes apply them from the log before their next request.
 
-def get_author_by_id(db: Session, author_id: int) -> Optional[Author]:
+def on_commit(db: Session, fn) -> None:
+    db.info.setdefault("on_commit", []).append(fn)
+
+@event.listens_for(Session, "after_commit")
+def _run_on_commit(session: Session) -> None:
+    for fn in session.info.pop("on_commit", ()):
+        fn()
+
+@event.listens_for(Session, "after_rollback")
+def _discard_on_commit(session: Session) -> None:
+    session.info.pop("on_commit", None)
+
+def _invalidate(db: Session, tables: List[str], keys: List[tuple] = ()) -> None:
+    invalidation.record(db, tables, keys)
+    on_commit(db, invalidation.invalidation_log.sync)
+
+# Single-row writes are one INSERT/UPDATE ... RETURNING each: the row comes
+# back with its id and defaults, so there is no refresh SELECT, and there is
+# no look-before-write either - uq_books_isbn, the unique email index and the
+# books.author_id foreign key reject a conflicting write inside the statement,
+# which also closes the race between two requests passing the same check.
+# constraint_error() turns the IntegrityError into the API's status and message.
+
+CONSTRAINT_ERRORS = [  # (substring of the SQLite message, status, detail)
+    ("books.isbn", 409, "ISBN already exists."),
+    ("authors.email", 409, "Email already exists."),
+    ("FOREIGN KEY", 400, "Invalid author_id. Author does not exist."),
+    ("NOT NULL", 400, "Required field cannot be null."),
+]
+
+def constraint_error(e: IntegrityError) -> Tuple[int, str]:
+    message = str(e.orig)
+    for needle, status_code, detail in CONSTRAINT_ERRORS:
+        if needle in message:
+            return status_code, detail
+    return 409, f"Constraint violated: {message}"
+
+def _finish(db: Session, obj, commit: bool):
+    if commit:
+        db.commit()
+    return obj
+
+def create_author(db: Session, author_in: AuthorCreate, commit: bool = True) -> Author:
+    author = db.execute(insert(Author).values(name=author_in.name, email=author_in.email)
+                        .returning(Author)).scalar_one()
+    stats.record(db, authors=1)
+    _invalidate(db, ["authors"], [("authors", author.id), *uniqueness.keys(uniqueness.EMAIL_KEY, [author.email])])
+    return _finish(db, author, commit)
+
+def get_author_by_id(db: Session, author_id: int, with_books: bool = False) -> Optional[Author]:
+    # with_books eager-loads Author.books (lazy loads are not available on an AsyncSession);
+    # populate_existing makes the option apply to an author already in the identity map too
+    if with_books:
+        return db.get(Author, author_id, options=[selectinload(Author.books)], populate_existing=True)
     return db.get(Author, author_id)
 
+def get_authors_by_ids(db: Session, ids: List[int]) -> List[Author]:
+    """One IN (...) query plus one for all their books; missing ids are simply absent."""
+    return db.execute(select(Author).where(Author.id.in_(ids)).options(selectinload(Author.books))).scalars().all()
+
+def get_author_by_email(db: Session, email: str) -> Optional[Author]:
+    return db.execute(select(Author).where(Author.email == email)).scalars().first()
+
 def list_authors(db: Session, name: Optional[str], sort: Optional[str], order: Optional[str]) -> list[tuple[Author,int]]:
-    stmt = (select(Author, func.count(Book.id).label("book_count"))
-            .join(Book, Book.author_id==Author.id, isouter=True)
-            .group_by(Author.id))
+    stmt = select(Author, Author.book_count)
     if name:
         stmt = stmt.where(Author.name.ilike(f"%{name}%"))
     if sort == "book_count":
-        stmt = stmt.order_by((asc if (order or "desc").lower()=="asc" else desc)("book_count"), Author.id.asc())
+        stmt = stmt.order_by((asc if (order or "desc").lower()=="asc" else desc)(Author.book_count), Author.id.asc())
     else:
         stmt = stmt.order_by(Author.id.asc())
     return db.execute(stmt).all()
 
+def _bump_book_count(db: Session, author_id: int, delta: int) -> None:
+    db.execute(update(Author).where(Author.id == author_id).values(book_count=Author.book_count + delta))
+
+def recompute_author_book_counts(db: Session) -> int:
+    """Rebuilds Author.book_count from the books table; returns how many authors had drifted."""
+    actual = (select(func.count(Book.id)).where(Book.author_id == Author.id)
+              .correlate(Author).scalar_subquery())
+    drifted = db.execute(select(func.count(Author.id)).where(Author.book_count != actual)).scalar_one()
+    db.execute(update(Author).values(book_count=actual))
+    return drifted
 
-def create_book(db: Session, book_in: BookCreate) -> Book:
-    b = Book(**book_in.dict()); db.add(b); db.commit(); db.refresh(b); return b
 
-def get_book_by_id(db: Session, book_id: int) -> Optional[Book]:
+def create_book(db: Session, book_in: BookCreate, commit: bool = True) -> Book:
+    b = db.execute(insert(Book).values(**book_in.model_dump()).returning(Book)).scalar_one()
+    _bump_book_count(db, b.author_id, +1)
+    stats.record(db, books={b.published_year: 1})
+    # authors: book_count changed
+    _invalidate(db, ["books", "authors"], [("books", b.id), ("authors", b.author_id),
+                                           *uniqueness.keys(uniqueness.ISBN_KEY, [b.isbn])])
+    return _finish(db, b, commit)
+
+def get_book_by_id(db: Session, book_id: int, with_author: bool = False) -> Optional[Book]:
+    if with_author:
+        return db.get(Book, book_id, options=[joinedload(Book.author)], populate_existing=True)
     return db.get(Book, book_id)
 
-def update_book(db: Session, db_book: Book, updates: BookUpdate) -> Book:
-    for k, v in updates.dict(exclude_unset=True).items(): setattr(db_book, k, v)
-    db.add(db_book); db.commit(); db.refresh(db_book); return db_book
+def get_books_by_ids(db: Session, ids: List[int]) -> List[Book]:
+    """One IN (...) query with each book's author joined; missing ids are simply absent."""
+    return db.execute(select(Book).where(Book.id.in_(ids)).options(joinedload(Book.author))).scalars().all()
+
+def get_book_by_isbn(db: Session, isbn: str) -> Optional[Book]:
+    return db.execute(select(Book).where(Book.isbn == isbn)).scalars().first()
+
+def update_book(db: Session, db_book: Book, updates: BookUpdate, commit: bool = True) -> Book:
+    return update_book_by_id(db, db_book.id, updates, commit=commit)
+
+def update_book_by_id(db: Session, book_id: int, updates: BookUpdate, commit: bool = True) -> Optional[Book]:
+    """Applies the fields set in `updates` with one UPDATE ... RETURNING; None if there is no such book.
+
+    Only a change of author_id, published_year or isbn needs the old values
+    first (RETURNING yields the new row), to move the book between the two
+    authors' book_count or the two years' counts (app/stats.py), or to free
+    the old ISBN in app/uniqueness.py.
+    """
+    changes = updates.model_dump(exclude_unset=True)
+    if not changes:
+        return get_book_by_id(db, book_id)
+    old = None
+    if changes.keys() & {"author_id", "published_year", "isbn"}:
+        old = db.execute(select(Book.author_id, Book.published_year, Book.isbn).where(Book.id == book_id)).first()
+        if old is None:
+            return None
+    b = db.execute(update(Book).where(Book.id == book_id).values(**changes).returning(Book)
+                   .execution_options(populate_existing=True, synchronize_session=False)).scalar_one_or_none()
+    if b is None:
+        return None
+    moved = old is not None and b.author_id != old.author_id
+    if moved:
+        _bump_book_count(db, old.author_id, -1)
+        _bump_book_count(db, b.author_id, +1)
+    if old is not None and b.published_year != old.published_year:
+        stats.record(db, books={old.published_year: -1, b.published_year: 1})
+    renamed = old is not None and b.isbn != old.isbn
+    _invalidate(db, ["books", *(["authors"] if moved else [])],
+                [("books", b.id), ("authors", b.author_id), *([("authors", old.author_id)] if moved else []),
+                 *(uniqueness.keys(uniqueness.ISBN_KEY, [b.isbn], [old.isbn]) if renamed else [])])
+    return _finish(db, b, commit)
+
+# Bulk ingest
+# Set-based: one IN (...) lookup per check, one executemany INSERT per chunk and
+# one range scan for the new ids, instead of a lookup + insert + commit +
+# refresh per row. (INSERT ... RETURNING with per-row order makes SQLAlchemy
+# fall back to one statement per row on SQLite.) Search indexing is deferred to
+# one INSERT ... SELECT per chunk. Each function returns one ("created", id) or
+# ("error", message) per input, in order.
+
+def bulk_create_authors(db: Session, authors: List[AuthorCreate], commit: bool = True) -> List[Tuple[str, object]]:
+    existing = set(db.scalars(select(Author.email).where(Author.email.in_({a.email for a in authors}))))
+    results: list = [None] * len(authors)
+    rows, seen = [], set()
+    for i, a in enumerate(authors):
+        if a.email in existing or a.email in seen:
+            results[i] = ("error", "Email already exists.")
+        else:
+            seen.add(a.email)
+            rows.append((i, {"name": a.name, "email": a.email}))
+    if rows:
+        with deferred_indexing(db, "authors") as before:
+            db.execute(insert(Author.__table__), [r for _, r in rows])
+        ids = dict(db.execute(select(Author.email, Author.id).where(Author.id > before)).all())
+        for i, r in rows:
+            results[i] = ("created", ids[r["email"]])
+        stats.record(db, authors=len(rows))
+        _invalidate(db, ["authors"])
+        # not logged per key (see app/uniqueness.py): this process learns them on commit
+        on_commit(db, lambda: uniqueness.unique_index.add_emails(r["email"] for _, r in rows))
+    if commit:
+        db.commit()
+    return results
+
+def bulk_create_books(db: Session, books: List[BookCreate], commit: bool = True) -> List[Tuple[str, object]]:
+    isbns = {b.isbn for b in books}
+    existing = set(db.scalars(select(Book.isbn).where(Book.isbn.in_(isbns))))
+    authors = set(db.scalars(select(Author.id).where(Author.id.in_({b.author_id for b in books}))))
+    results: list = [None] * len(books)
+    rows, seen, per_author = [], set(), {}
+    for i, b in enumerate(books):
+        if b.author_id not in authors:
+            results[i] = ("error", "Invalid author_id. Author does not exist.")
+        elif b.isbn in existing or b.isbn in seen:
+            results[i] = ("error", "ISBN already exists.")
+        else:
+            seen.add(b.isbn)
+            per_author[b.author_id] = per_author.get(b.author_id, 0) + 1
+            rows.append((i, b.model_dump()))
+    if rows:
+        with deferred_indexing(db, "books") as before:
+            db.execute(insert(Book.__table__), [r for _, r in rows])
+        ids = dict(db.execute(select(Book.isbn, Book.id).where(Book.id > before)).all())
+        for i, r in rows:
+            results[i] = ("created", ids[r["isbn"]])
+        authors_t = Author.__table__
+        db.execute(
+            update(authors_t).where(authors_t.c.id == bindparam("aid"))
+            .values(book_count=authors_t.c.book_count + bindparam("n")),
+            [{"aid": aid, "n": n} for aid, n in per_author.items()],
+        )
+        per_year = {}
+        for _, r in rows:
+            per_year[r["published_year"]] = per_year.get(r["published_year"], 0) + 1
+        stats.record(db, books=per_year)
+        _invalidate(db, ["books", "authors"], [("authors", aid) for aid in per_author])
+        on_commit(db, lambda: uniqueness.unique_index.add_isbns(r["isbn"] for _, r in rows))
+    if commit:
+        db.commit()
+    return results
 
 def list_books(db: Session, title: Optional[str], author: Optional[str], year: Optional[int], sort: Optional[str], order: Optional[str]):
     stmt = select(Book).join(Book.author)
@@ -54,12 +246,145 @@ def list_books(db: Session, title: Optional[str], author: Optional[str], year: O
 
 
 #pagination starts
+#
+# Both list endpoints support two modes:
+#   * offset mode (LIMIT/OFFSET) - kept for backward compatibility
+#   * cursor mode - seeks on (sort_key, id) so deep pages cost the same as page 1
+# Every sort uses id as a tiebreaker in the same direction, which is what the
+# composite (sort_key, id) indexes on the models are built for.
+
+BOOK_SORTS = {
+    "title": Book.title,
+    "published_year": Book.published_year,
+    "created_at": Book.created_at,
+    "id": Book.id,
+}
+NULLABLE_SORTS = {"published_year"}
+
+def _resolve_sort(sort: Optional[str], order: Optional[str], allowed, default_order: str) -> Tuple[str, str]:
+    if sort not in allowed:
+        return "id", "asc"
+    return sort, (order or default_order).lower()
+
+def _seek(col, id_col, value, last_id: int, descending: bool, nullable: bool = False):
+    """WHERE clause selecting rows strictly after (value, last_id) in the given order.
+
+    SQLite sorts NULLs first ascending and last descending, so nullable keys
+    need the NULL block handled explicitly.
+    """
+    if col is id_col:
+        return id_col < last_id if descending else id_col > last_id
+    if value is None:
+        if descending:
+            return and_(col.is_(None), id_col < last_id)
+        return or_(col.is_not(None), and_(col.is_(None), id_col > last_id))
+    key, bound = tuple_(col, id_col), tuple_(literal(value), literal(last_id))
+    after = key < bound if descending else key > bound
+    if nullable and descending:
+        after = or_(after, col.is_(None))
+    return after
+
+def _cursor_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _decode_value(sort: str, value):
+    if sort == "created_at" and value is not None:
+        return datetime.fromisoformat(value)
+    return value
+
+# Filters
+# match="substring" keeps the original ILIKE '%term%' semantics; match="fts" goes
+# through the FTS5 index (token + prefix matching) and enables sort="relevance".
+# An fts term with no tokens ("!!!") matches nothing rather than being dropped.
+
+def _fts_ids(fts_col, term: str):
+    return select(fts_col.table.c.rowid).where(fts_col.match(term))
+
+def _ranked(stmt, fts_col, key, term: str):
+    # joining (instead of IN) exposes the FTS5 rank column, best match first
+    fts = fts_col.table
+    return stmt.join(fts, fts.c.rowid == key).where(fts_col.match(term)).order_by(fts.c.rank)
+
+def _filter_authors(stmt, name: Optional[str], match: str, ranked: bool = False):
+    if not name:
+        return stmt
+    if match == "fts":
+        q = fts_query(name)
+        if q is None:
+            return stmt.where(false())
+        if ranked:
+            return _ranked(stmt, authors_fts.c.name, Author.id, q)
+        return stmt.where(Author.id.in_(_fts_ids(authors_fts.c.name, q)))
+    return stmt.where(Author.name.ilike(f"%{name}%"))
+
+def _filter_books(stmt, title: Optional[str], author: Optional[str], year: Optional[int], match: str,
+                  ranked: bool = False):
+    if match == "fts":
+        title_q, author_q = fts_query(title), fts_query(author)
+        if (title and not title_q) or (author and not author_q):
+            return stmt.where(false())
+        # relevance ranks on the title match when there is one, else on the author match
+        if title_q:
+            stmt = (_ranked(stmt, books_fts.c.title, Book.id, title_q) if ranked
+                    else stmt.where(Book.id.in_(_fts_ids(books_fts.c.title, title_q))))
+        if author_q:
+            stmt = (_ranked(stmt, authors_fts.c.name, Book.author_id, author_q) if ranked and not title_q
+                    else stmt.where(Book.author_id.in_(_fts_ids(authors_fts.c.name, author_q))))
+    else:
+        if title:
+            stmt = stmt.where(Book.title.ilike(f"%{title}%"))
+        if author:
+            stmt = stmt.where(Author.name.ilike(f"%{author}%"))
+    if year:
+        stmt = stmt.where(Book.published_year == year)
+    return stmt
+
+def _load_options(model, fields: Optional[List[str]], sort: str = "id") -> list:
+    """load_only() for a sparse fieldset, plus id and the sort column the cursor needs
+    and the timestamps Last-Modified is built from."""
+    if not fields:
+        return []
+    return [load_only(*[getattr(model, f) for f in dict.fromkeys([*fields, "id", sort, "created_at", "updated_at"])])]
+
+def _can_rank(match: str, *terms: Optional[str]) -> bool:
+    return match == "fts" and any(fts_query(t) for t in terms)
+
+def _relevance_only(cursor: Optional[str]) -> None:
+    if cursor:
+        raise InvalidCursorError("Cursor pagination is not supported for sort=relevance; use offset.")
+
+# Totals
+# The list endpoints' total goes through count_cache, keyed on the normalized
+# filters and invalidated by the table versions bumped above. The unfiltered
+# estimate is max(id): the API never deletes rows, so it tracks the row count.
+
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+def _norm_term(term: Optional[str], match: str) -> Optional[str]:
+    if match == "fts":
+        q = fts_query(term)
+        # a term without tokens keeps its own (empty) count apart from the unfiltered one
+        return q.lower() if q else term or None
+    # SQLite's lower()/LIKE only fold ASCII, so only ASCII case is normalized
+    return term.translate(_ASCII_LOWER) if term else None
+
+def authors_total(db: Session, name: Optional[str], match: str = "substring", mode: str = "exact") -> Optional[int]:
+    key = ("authors", match, _norm_term(name, match))
+    estimate = None if key[2] else (lambda: db.execute(select(func.max(Author.id))).scalar() or 0)
+    return count_cache.get_or_compute(key, table_versions.get("authors"),
+                                      lambda: count_authors(db, name=name, match=match), mode, estimate)
+
+def books_total(db: Session, title: Optional[str], author: Optional[str], year: Optional[int],
+                match: str = "substring", mode: str = "exact") -> Optional[int]:
+    key = ("books", match, _norm_term(title, match), _norm_term(author, match), year or None)
+    estimate = None if any(key[2:]) else (lambda: db.execute(select(func.max(Book.id))).scalar() or 0)
+    return count_cache.get_or_compute(key, table_versions.get("books", "authors"),
+                                      lambda: count_books(db, title=title, author=author, year=year, match=match),
+                                      mode, estimate)
 
 # AUTHORS with pagination 
-def count_authors(db: Session, name: Optional[str]) -> int:
-    stmt = select(func.count(Author.id))
-    if name:
-        stmt = stmt.where(Author.name.ilike(f"%{name}%"))
+def count_authors(db: Session, name: Optional[str], match: str = "substring") -> int:
+    stmt = _filter_authors(select(func.count(Author.id)), name, match)
     return db.execute(stmt).scalar_one()
 
 def list_authors_paginated(
@@ -69,33 +394,53 @@ def list_authors_paginated(
     order: Optional[str],
     limit: int,
     offset: int,
-) -> List[Tuple[Author, int]]:
-    stmt = (
-        select(Author, func.count(Book.id).label("book_count"))
-        .join(Book, Book.author_id == Author.id, isouter=True)
-        .group_by(Author.id)
-    )
-    if name:
-        stmt = stmt.where(Author.name.ilike(f"%{name}%"))
+    cursor: Optional[str] = None,
+    match: str = "substring",
+    include: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+) -> Tuple[List[Tuple[Author, int]], Optional[str]]:
+    """Returns (rows, next_cursor); rows are (Author, book_count) tuples.
 
-    if sort == "book_count":
-        ordering = asc("book_count") if (order or "desc").lower() == "asc" else desc("book_count")
-        stmt = stmt.order_by(ordering, Author.id.asc())
+    include="books" loads every author's books in one extra query; fields
+    limits the author columns selected (see _load_options).
+    """
+    stmt = select(Author, Author.book_count)
+    if include == "books":
+        stmt = stmt.options(selectinload(Author.books))
+    if sort == "relevance" and _can_rank(match, name):
+        _relevance_only(cursor)
+        stmt = _filter_authors(stmt.options(*_load_options(Author, fields)), name, match, ranked=True)
+        return db.execute(stmt.order_by(Author.id.asc()).limit(limit).offset(offset)).all(), None
+
+    sort, order = _resolve_sort(sort, order, {"book_count", "id"}, "desc")
+    descending = order == "desc"
+    col = Author.book_count if sort == "book_count" else Author.id
+    stmt = _filter_authors(stmt.options(*_load_options(Author, fields, sort)), name, match)
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort, order)
+        stmt = stmt.where(_seek(col, Author.id, value, last_id, descending))
+        offset = 0
+
+    direction = desc if descending else asc
+    if col is Author.id:
+        stmt = stmt.order_by(direction(Author.id))
     else:
-        stmt = stmt.order_by(Author.id.asc())
+        stmt = stmt.order_by(direction(col), direction(Author.id))
 
-    stmt = stmt.limit(limit).offset(offset)
-    return db.execute(stmt).all()
+    rows = db.execute(stmt.limit(limit + 1).offset(offset)).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last, last_count = rows[-1]
+        value = last_count if sort == "book_count" else last.id
+        next_cursor = encode_cursor(sort, order, value, last.id)
+    return rows, next_cursor
 
 # BOOKS with pagination 
-def count_books(db: Session, title: Optional[str], author: Optional[str], year: Optional[int]) -> int:
-    stmt = select(func.count(Book.id)).join(Book.author)
-    if title:
-        stmt = stmt.where(Book.title.ilike(f"%{title}%"))
-    if author:
-        stmt = stmt.where(Author.name.ilike(f"%{author}%"))
-    if year:
-        stmt = stmt.where(Book.published_year == year)
+def count_books(db: Session, title: Optional[str], author: Optional[str], year: Optional[int],
+                match: str = "substring") -> int:
+    stmt = _filter_books(select(func.count(Book.id)).join(Book.author), title, author, year, match)
     return db.execute(stmt).scalar_one()
 
 def list_books_paginated(
@@ -107,23 +452,74 @@ def list_books_paginated(
     order: Optional[str],
     limit: int,
     offset: int,
-):
+    cursor: Optional[str] = None,
+    match: str = "substring",
+    include: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+) -> Tuple[List[Book], Optional[str]]:
+    """Returns (books, next_cursor). A cursor, when given, takes precedence over offset.
+
+    include="author" fills Book.author from the join the filters already use
+    (no extra query); fields limits the book columns selected.
+    """
     stmt = select(Book).join(Book.author)
-    if title:
-        stmt = stmt.where(Book.title.ilike(f"%{title}%"))
-    if author:
-        stmt = stmt.where(Author.name.ilike(f"%{author}%"))
-    if year:
-        stmt = stmt.where(Book.published_year == year)
+    if include == "author":
+        stmt = stmt.options(contains_eager(Book.author))
+    if sort == "relevance" and _can_rank(match, title, author):
+        _relevance_only(cursor)
+        stmt = _filter_books(stmt.options(*_load_options(Book, fields)), title, author, year, match, ranked=True)
+        return db.execute(stmt.order_by(Book.id.asc()).limit(limit).offset(offset)).scalars().all(), None
 
-    if sort == "title":
-        stmt = stmt.order_by(Book.title.asc() if (order or "asc").lower()=="asc" else Book.title.desc())
-    elif sort == "published_year":
-        stmt = stmt.order_by(Book.published_year.asc() if (order or "asc").lower()=="asc" else Book.published_year.desc())
-    elif sort == "created_at":
-        stmt = stmt.order_by(Book.created_at.asc() if (order or "asc").lower()=="asc" else Book.created_at.desc())
+    sort, order = _resolve_sort(sort, order, BOOK_SORTS, "asc")
+    descending = order == "desc"
+    col = BOOK_SORTS[sort]
+
+    stmt = _filter_books(stmt.options(*_load_options(Book, fields, sort)), title, author, year, match)
+
+    if cursor:
+        value, last_id = decode_cursor(cursor, sort, order)
+        stmt = stmt.where(_seek(col, Book.id, _decode_value(sort, value), last_id, descending,
+                                nullable=sort in NULLABLE_SORTS))
+        offset = 0
+
+    direction = desc if descending else asc
+    if col is Book.id:
+        stmt = stmt.order_by(direction(Book.id))
     else:
-        stmt = stmt.order_by(Book.id.asc())
+        stmt = stmt.order_by(direction(col), direction(Book.id))
+
+    items = db.execute(stmt.limit(limit + 1).offset(offset)).scalars().all()
+    next_cursor = None
+    if len(items) > limit:
+        items = items[:limit]
+        last = items[-1]
+        next_cursor = encode_cursor(sort, order, _cursor_value(getattr(last, col.key)), last.id)
+    return items, next_cursor
+
+
+# Export
+# Plain column tuples (no ORM objects) in id order, fetched with yield_per so
+# only one batch is held in memory however many rows match. Same filters as
+# the list endpoints.
+
+BOOK_EXPORT_COLUMNS = (Book.id, Book.title, Book.isbn, Book.published_year, Book.author_id, Book.created_at)
+AUTHOR_EXPORT_COLUMNS = (Author.id, Author.name, Author.email, Author.created_at, Author.book_count)
+
+# field names accepted by fields= on the list endpoints (same as BookOut/AuthorOut)
+BOOK_FIELDS = tuple(c.key for c in BOOK_EXPORT_COLUMNS)
+AUTHOR_FIELDS = tuple(c.key for c in AUTHOR_EXPORT_COLUMNS)
+
+def export_books(db: Session, title: Optional[str], author: Optional[str], year: Optional[int],
+                 match: str = "substring", batch_size: int = 1000) -> Iterator[list]:
+    """Yields lists of up to batch_size rows, columns as in BOOK_EXPORT_COLUMNS."""
+    stmt = select(*BOOK_EXPORT_COLUMNS)
+    if author and match != "fts":
+        stmt = stmt.join(Book.author)
+    stmt = _filter_books(stmt, title, author, year, match).order_by(Book.id)
+    yield from db.execute(stmt.execution_options(yield_per=batch_size)).partitions()
 
-    stmt = stmt.limit(limit).offset(offset)
-    return db.execute(stmt).scalars().all()
\ No newline at end of file
+def export_authors(db: Session, name: Optional[str], match: str = "substring",
+                   batch_size: int = 1000) -> Iterator[list]:
+    """Yields lists of up to batch_size rows, columns as in AUTHOR_EXPORT_COLUMNS."""
+    stmt = _filter_authors(select(*AUTHOR_EXPORT_COLUMNS), name, match).order_by(Author.id)
+    yield from db.execute(stmt.execution_options(yield_per=batch_size)).partitions()
@@ -0,0 +1,83 @@
+"""
+Async versions of the app/crud.py functions used by the routers.
+
+Each one runs its sync counterpart through AsyncSession.run_sync(): with an
+aiosqlite AsyncSession the ORM code runs on the event loop and only awaits the
+driver, so no threadpool worker is held for the round trip. The query logic
+itself lives in one place, app/crud.py. `db` can also be a deps.ThreadedSession
+(DB_MODE=sync), which runs the same function on the threadpool instead.
+"""
+from typing import List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import crud
+from app.models import Author, Book
+from app.schemas import AuthorCreate, BookCreate, BookUpdate
+
+# Authors
+async def create_author(db: AsyncSession, author_in: AuthorCreate) -> Author:
+    return await db.run_sync(crud.create_author, author_in)
+
+async def get_author_by_id(db: AsyncSession, author_id: int, with_books: bool = False) -> Optional[Author]:
+    return await db.run_sync(crud.get_author_by_id, author_id, with_books=with_books)
+
+async def get_authors_by_ids(db: AsyncSession, ids: List[int]) -> List[Author]:
+    return await db.run_sync(crud.get_authors_by_ids, ids)
+
+async def get_author_by_email(db: AsyncSession, email: str) -> Optional[Author]:
+    return await db.run_sync(crud.get_author_by_email, email)
+
+async def list_authors(db: AsyncSession, name: Optional[str], sort: Optional[str], order: Optional[str]):
+    return await db.run_sync(crud.list_authors, name, sort, order)
+
+async def count_authors(db: AsyncSession, name: Optional[str], match: str = "substring") -> int:
+    return await db.run_sync(crud.count_authors, name, match)
+
+async def authors_total(db: AsyncSession, name: Optional[str], match: str = "substring",
+                        mode: str = "exact") -> Optional[int]:
+    return await db.run_sync(crud.authors_total, name, match, mode)
+
+async def list_authors_paginated(db: AsyncSession, name: Optional[str], sort: Optional[str], order: Optional[str],
+                                 limit: int, offset: int, cursor: Optional[str] = None,
+                                 match: str = "substring", include: Optional[str] = None,
+                                 fields: Optional[List[str]] = None) -> Tuple[List[Tuple[Author, int]], Optional[str]]:
+    return await db.run_sync(crud.list_authors_paginated, name, sort, order, limit, offset, cursor, match,
+                             include, fields)
+
+async def recompute_author_book_counts(db: AsyncSession) -> int:
+    return await db.run_sync(crud.recompute_author_book_counts)
+
+# Books
+async def create_book(db: AsyncSession, book_in: BookCreate) -> Book:
+    return await db.run_sync(crud.create_book, book_in)
+
+async def get_book_by_id(db: AsyncSession, book_id: int, with_author: bool = False) -> Optional[Book]:
+    return await db.run_sync(crud.get_book_by_id, book_id, with_author=with_author)
+
+async def get_books_by_ids(db: AsyncSession, ids: List[int]) -> List[Book]:
+    return await db.run_sync(crud.get_books_by_ids, ids)
+
+async def get_book_by_isbn(db: AsyncSession, isbn: str) -> Optional[Book]:
+    return await db.run_sync(crud.get_book_by_isbn, isbn)
+
+async def update_book(db: AsyncSession, db_book: Book, updates: BookUpdate) -> Book:
+    return await db.run_sync(crud.update_book, db_book, updates)
+
+async def list_books(db: AsyncSession, title: Optional[str], author: Optional[str], year: Optional[int],
+                     sort: Optional[str], order: Optional[str]):
+    return await db.run_sync(crud.list_books, title, author, year, sort, order)
+
+async def count_books(db: AsyncSession, title: Optional[str], author: Optional[str], year: Optional[int],
+                      match: str = "substring") -> int:
+    return await db.run_sync(crud.count_books, title, author, year, match)
+
+async def books_total(db: AsyncSession, title: Optional[str], author: Optional[str], year: Optional[int],
+                      match: str = "substring", mode: str = "exact") -> Optional[int]:
+    return await db.run_sync(crud.books_total, title, author, year, match, mode)
+
+async def list_books_paginated(db: AsyncSession, title: Optional[str], author: Optional[str], year: Optional[int],
+                               sort: Optional[str], order: Optional[str], limit: int, offset: int,
+                               cursor: Optional[str] = None,
+                               match: str = "substring", include: Optional[str] = None,
+                               fields: Optional[List[str]] = None) -> Tuple[List[Book], Optional[str]]:
+    return await db.run_sync(crud.list_books_paginated, title, author, year, sort, order, limit, offset,
+                             cursor, match, include, fields)
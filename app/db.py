@@ -1,10 +1,207 @@
-from sqlalchemy import create_engine
+"""
+Engines and session factories, created on first use.
+
+Importing this module (and so the app) opens nothing and creates no engine:
+`database` only holds the Settings. Each engine is built the first time it
+is used - by main.create_app's lifespan at startup, or by the first request
+or script that needs it - so a process pays only for the engines it uses.
+
+    engine / SessionLocal            read-write, for scripts (seed, migrate, rebuilds)
+    read_engine / ReadSessionLocal   read-only pool for the API's reads
+    write_engine / WriteSessionLocal the single writer in app/writer.py
+    async_engine / AsyncSessionLocal read-only aiosqlite pool (DB_MODE=async only)
+
+The names are also module attributes (`from app.db import SessionLocal`),
+resolved against the current `database` when accessed.
+"""
+import threading
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 
-DATABASE_URL = "sqlite:///./app.db" 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},  
-    future=True,
-)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+from app.metrics import instrument_engine
+from app.settings import Settings
+
+
+class Database:
+    def __init__(self, settings: Settings):
+        self.settings = settings
+        self.path = settings.database_path
+        self.url = f"sqlite:///{self.path}"
+        # opened with mode=ro, so a read path can never take the write lock; in
+        # WAL mode these connections never block, or are blocked by, the writer
+        self.read_url = f"sqlite:///file:{self.path}?mode=ro&uri=true"
+        self.async_url = f"sqlite+aiosqlite:///{self.path}"
+        self.async_read_url = f"sqlite+aiosqlite:///file:{self.path}?mode=ro&uri=true"
+        self._lock = threading.RLock()
+        self._built: dict = {}
+
+    def _get(self, name: str, build):
+        value = self._built.get(name)
+        if value is None:
+            with self._lock:
+                value = self._built.get(name)
+                if value is None:
+                    value = self._built[name] = build()
+        return value
+
+    def created(self, name: str) -> bool:
+        return name in self._built
+
+    def _configure(self, dbapi_connection, read_only: bool = False) -> None:
+        s = self.settings
+        cursor = dbapi_connection.cursor()
+        # WAL lets readers (a long streaming export, say) keep their snapshot while the
+        # writer commits; in the default rollback-journal mode an open read blocks it.
+        # A read-only connection cannot switch modes; migrations create the file in WAL.
+        if not read_only:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA busy_timeout={s.busy_timeout_ms}")
+        cursor.execute(f"PRAGMA cache_size=-{s.cache_size_kb}")
+        cursor.execute(f"PRAGMA mmap_size={s.mmap_size}")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        else:
+            # SQLite ignores REFERENCES unless asked; crud's writes rely on the
+            # books.author_id foreign key to reject unknown authors
+            cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+    def _read_only(self, dbapi_connection, connection_record) -> None:
+        self._configure(dbapi_connection, read_only=True)
+
+    @property
+    def engine(self):
+        def build():
+            e = create_engine(self.url, connect_args={"check_same_thread": False}, future=True)
+            event.listen(e, "connect", lambda dbapi_connection, record: self._configure(dbapi_connection))
+            # per-request query count / SQL time and the slow-query log (app/metrics.py)
+            instrument_engine(e)
+            return e
+        return self._get("engine", build)
+
+    @property
+    def SessionLocal(self):
+        return self._get("SessionLocal", lambda: sessionmaker(bind=self.engine, autoflush=False, autocommit=False,
+                                                              future=True))
+
+    @property
+    def read_engine(self):
+        def build():
+            e = create_engine(self.read_url, connect_args={"check_same_thread": False},
+                              pool_size=self.settings.read_pool_size, max_overflow=32, future=True)
+            event.listen(e, "connect", self._read_only)
+            instrument_engine(e)
+            return e
+        return self._get("read_engine", build)
+
+    @property
+    def ReadSessionLocal(self):
+        return self._get("ReadSessionLocal", lambda: sessionmaker(bind=self.read_engine, autoflush=False,
+                                                                  autocommit=False, future=True))
+
+    # pysqlite's own transaction handling is switched off on the writer's connection
+    # so SQLAlchemy emits the BEGIN itself: BEGIN IMMEDIATE takes the write lock up
+    # front, and SAVEPOINTs (one per write in a batch) then always sit inside the
+    # batch transaction.
+    @property
+    def write_engine(self):
+        def build():
+            e = create_engine(self.url, connect_args={"check_same_thread": False}, pool_size=1, future=True)
+
+            @event.listens_for(e, "connect")
+            def _disable_pysqlite_transactions(dbapi_connection, connection_record):
+                self._configure(dbapi_connection)
+                # in WAL mode NORMAL only syncs at checkpoints: a power loss can lose the last
+                # commits but never corrupts the file, and a commit no longer waits on an fsync
+                dbapi_connection.execute("PRAGMA synchronous=NORMAL")
+                dbapi_connection.isolation_level = None
+
+            @event.listens_for(e, "begin")
+            def _begin_immediate(connection):
+                connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+            instrument_engine(e)
+            return e
+        return self._get("write_engine", build)
+
+    @property
+    def WriteSessionLocal(self):
+        return self._get("WriteSessionLocal", lambda: sessionmaker(bind=self.write_engine, autoflush=False,
+                                                                   expire_on_commit=False, future=True))
+
+    @property
+    def async_engine(self):
+        if self.settings.db_mode != "async":
+            return None
+
+        def build():
+            # imported lazily so the sync mode does not need aiosqlite installed
+            from sqlalchemy.ext.asyncio import create_async_engine
+
+            e = create_async_engine(self.async_read_url, pool_size=self.settings.read_pool_size, max_overflow=32,
+                                    future=True)
+            event.listen(e.sync_engine, "connect", self._read_only)
+            instrument_engine(e.sync_engine)
+            return e
+        return self._get("async_engine", build)
+
+    @property
+    def AsyncSessionLocal(self):
+        if self.settings.db_mode != "async":
+            return None
+
+        def build():
+            from sqlalchemy.ext.asyncio import async_sessionmaker
+
+            return async_sessionmaker(bind=self.async_engine, autoflush=False, expire_on_commit=False)
+        return self._get("AsyncSessionLocal", build)
+
+    def build(self) -> list:
+        """Creates, without connecting, the engines the API serves from; returns them."""
+        engines = [self.read_engine, self.write_engine]
+        if self.settings.db_mode == "async":
+            engines.append(self.async_engine)
+        return engines
+
+    def dispose(self) -> None:
+        """Closes the pooled connections of the sync engines built so far (aclose() also the async one)."""
+        for name in ("engine", "read_engine", "write_engine"):
+            if name in self._built:
+                self._built[name].dispose()
+
+    async def aclose(self) -> None:
+        if "async_engine" in self._built:
+            await self._built["async_engine"].dispose()
+        self.dispose()
+
+
+database = Database(Settings.from_env())
+
+
+def configure(settings: Settings) -> Database:
+    """Points the process at `settings` (a no-op if unchanged); nothing is opened until used."""
+    global database
+    if settings != database.settings:
+        database.dispose()
+        database = Database(settings)
+    return database
+
+
+_LAZY = {"engine", "SessionLocal", "read_engine", "ReadSessionLocal", "write_engine", "WriteSessionLocal",
+         "async_engine", "AsyncSessionLocal"}
+
+
+def __getattr__(name: str):
+    # resolved on access: an engine is only built once one of these is imported or used
+    if name in _LAZY:
+        return getattr(database, name)
+    if name == "DB_MODE":
+        return database.settings.db_mode
+    if name == "DATABASE_PATH":
+        return database.path
+    if name == "DATABASE_URL":
+        return database.url
+    if name == "ASYNC_DATABASE_URL":
+        return database.async_url
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,9 +1,36 @@
-from typing import Generator
-from app.db import SessionLocal
+from typing import AsyncGenerator, Generator
+from starlette.concurrency import run_in_threadpool
+from app import db as database
 
 def get_db() -> Generator:
-    db = SessionLocal()
+    db = database.ReadSessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+class ThreadedSession:
+    """A sync Session behind the AsyncSession.run_sync() interface.
+
+    Lets app.crud_async (and so the routers) run unchanged in DB_MODE=sync:
+    each call is dispatched to Starlette's threadpool.
+    """
+    def __init__(self, session):
+        self.sync_session = session
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+
+async def get_async_db() -> AsyncGenerator:
+    """Yields an AsyncSession (DB_MODE=async) or a ThreadedSession (DB_MODE=sync)."""
+    if database.DB_MODE == "async":
+        async with database.AsyncSessionLocal() as session:
+            yield session
+        return
+    db = database.ReadSessionLocal()
+    try:
+        yield ThreadedSession(db)
+    finally:
+        db.close()
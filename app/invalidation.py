@@ -0,0 +1,131 @@
+"""
+Cross-process cache invalidation.
+
+Each worker process (scripts/serve.py) has its own caches and version
+counters (app/cache.py), but a write is committed by whichever process
+received it. So every write also appends what it changed - tables and
+entity keys - to the cache_invalidations table, in its own transaction
+(record()), and every process applies new entries before serving a request
+(sync()). The check costs one PRAGMA data_version on a dedicated read-only
+connection; it reads the WAL index in shared memory and only changes when
+another connection has committed. The log itself is read only then.
+
+Versions are the entries' sequence numbers: a table's or entity's version
+is the sequence number of its last logged change, or the floor stored next
+to the ETag epoch in cache_epoch if that entry was pruned. Pruning raises
+the floor in the same transaction, and every process raises its versions
+to it, so versions and the ETags built from them depend only on the
+database: they are the same in every process, whenever it started, and
+survive restarts. The ETag epoch is a token stored in the database, so it
+changes only when the file is replaced.
+"""
+import os
+import sqlite3
+import threading
+from typing import Hashable, Iterable, Optional
+
+import orjson
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.cache import entity_cache, table_versions
+from app import db as database
+from app.uniqueness import is_unique_key, unique_index
+
+CACHE_LOG_RETAIN = int(os.getenv("CACHE_LOG_RETAIN", "10000"))
+_PRUNE_EVERY = 1000
+
+
+def record(db: Session, tables: Iterable[str], keys: Iterable[Hashable] = ()) -> int:
+    """Logs a change in the caller's transaction; returns its sequence number.
+
+    Entries older than the last CACHE_LOG_RETAIN are pruned now and then,
+    raising the version floor to the last one pruned; a process that falls
+    that far behind drops all its caches (see sync()).
+    """
+    seq = db.execute(text("INSERT INTO cache_invalidations (tables, keys) VALUES (:tables, :keys)"),
+                     {"tables": ",".join(tables), "keys": orjson.dumps(list(keys)).decode()}).lastrowid
+    if seq % _PRUNE_EVERY == 0 and seq > CACHE_LOG_RETAIN:
+        floor = seq - CACHE_LOG_RETAIN
+        db.execute(text("DELETE FROM cache_invalidations WHERE seq <= :floor"), {"floor": floor})
+        db.execute(text("UPDATE cache_epoch SET floor = :floor WHERE floor < :floor"), {"floor": floor})
+    return seq
+
+
+class InvalidationLog:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._data_version = None
+        self.seq: Optional[int] = None  # last entry applied
+        self.epoch: Optional[str] = None
+        self.floor: Optional[int] = None  # versions are at least this (cache_epoch.floor)
+        self.applied = self.resets = 0
+
+    def sync(self) -> None:
+        """Applies log entries committed since the last call (by any process)."""
+        with self._lock:
+            if self._conn is None:
+                path = self.path or database.DATABASE_PATH
+                self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False,
+                                             isolation_level=None)
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if data_version == self._data_version:
+                return
+            self._data_version = data_version
+            # the floor and the entries above it, read from one snapshot
+            self._conn.execute("BEGIN")
+            try:
+                self._apply()
+            finally:
+                self._conn.execute("COMMIT")
+
+    def _apply(self) -> None:
+        if self.seq is None:
+            self._start()
+        floor = self._conn.execute("SELECT floor FROM cache_epoch").fetchone()[0]
+        if floor > self.seq:
+            # entries not applied yet were pruned: anything may have changed up to the floor
+            self._reset(floor)
+            unique_index.reload()
+            self.resets += 1
+        elif floor > self.floor:
+            # pruned entries this process had applied: what they changed is now at the floor
+            table_versions.raise_floor(floor)
+            entity_cache.raise_versions(floor)
+            self.floor = floor
+        rows = self._conn.execute("SELECT seq, tables, keys FROM cache_invalidations WHERE seq > ? ORDER BY seq",
+                                  (self.seq,)).fetchall()
+        for seq, tables, keys in rows:
+            keys = orjson.loads(keys)
+            table_versions.bump(*tables.split(","), version=seq)
+            entity_cache.invalidate(*(tuple(k) for k in keys if not is_unique_key(k)), version=seq)
+            # ISBNs / emails taken or freed (app/uniqueness.py)
+            unique_index.apply([k for k in keys if is_unique_key(k)])
+            self.seq = seq
+        self.applied += len(rows)
+
+    def close(self) -> None:
+        """Forgets the database; the next sync() opens the current one and starts over."""
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = self._data_version = self.seq = self.epoch = self.floor = None
+
+    def _start(self) -> None:
+        # anything last changed by a pruned entry counts as changed at the floor;
+        # the retained entries, all above it, are then applied in order
+        self.epoch, floor = self._conn.execute("SELECT token, floor FROM cache_epoch").fetchone()
+        self._reset(floor)
+
+    def _reset(self, floor: int) -> None:
+        table_versions.reset(floor)
+        entity_cache.clear(version=floor)
+        self.seq = self.floor = floor
+
+    def stats(self) -> dict:
+        return {"seq": self.seq or 0, "applied": self.applied, "resets": self.resets}
+
+
+invalidation_log = InvalidationLog()
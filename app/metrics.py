@@ -0,0 +1,189 @@
+"""
+Request and SQL metrics, exposed in Prometheus text format at GET /metrics.
+
+The request middleware in main.py puts a RequestStats in a ContextVar; the
+cursor hooks installed on every engine (instrument_engine(), see app/db.py)
+add each statement's time to it. The threadpool and the write queue copy the
+context, so statements run there are charged to the request that caused them.
+
+Routes are labelled with their template ("/books/{book_id}"), never the raw
+path, so label cardinality is bounded by the number of routes.
+
+Set SLOW_QUERY_MS to log every statement slower than that (off by default).
+"""
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional, Sequence
+
+from sqlalchemy import event
+from starlette.requests import Request
+from starlette.routing import Match
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+
+slow_query_logger = logging.getLogger("app.sql.slow")
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: tuple) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _num(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, labels: tuple = ()) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            return [f"{self.name}{_labels(self.labels, k)} {_num(v)}" for k, v in sorted(self._values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels: tuple = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts..., count, sum]
+        self._values: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float) -> None:
+        with self._lock:
+            v = self._values.setdefault(labels, [0] * len(self.buckets) + [0, 0.0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    v[i] += 1
+            v[-2] += 1
+            v[-1] += value
+
+    def samples(self) -> list[str]:
+        out = []
+        names = self.labels + ("le",)
+        with self._lock:
+            for k, v in sorted(self._values.items()):
+                for bound, n in zip(self.buckets, v):
+                    out.append(f"{self.name}_bucket{_labels(names, k + (_num(bound),))} {n}")
+                out.append(f"{self.name}_bucket{_labels(names, k + ('+Inf',))} {v[-2]}")
+                out.append(f"{self.name}_count{_labels(self.labels, k)} {v[-2]}")
+                out.append(f"{self.name}_sum{_labels(self.labels, k)} {_num(v[-1])}")
+        return out
+
+
+requests_total = Counter("http_requests_total", "HTTP requests.", ("method", "route", "status"))
+request_duration = Histogram("http_request_duration_seconds", "HTTP request latency.", ("method", "route"))
+requests_in_flight = Gauge("http_requests_in_flight", "HTTP requests being served.", ("method", "route"))
+request_queries = Histogram("http_request_db_queries", "SQL statements per HTTP request.", ("method", "route"),
+                            buckets=QUERY_COUNT_BUCKETS)
+request_db_duration = Histogram("http_request_db_seconds", "Time spent in SQL per HTTP request.", ("method", "route"))
+db_queries_total = Counter("db_queries_total", "SQL statements executed.", ("route",))
+db_seconds_total = Counter("db_query_seconds_total", "Time spent executing SQL.", ("route",))
+slow_queries_total = Counter("db_slow_queries_total", "SQL statements slower than SLOW_QUERY_MS.", ("route",))
+# admission control (app/admission.py), by request class
+admission_in_flight = Gauge("admission_in_flight", "Requests holding an admission slot.", ("class",))
+admission_queue_depth = Gauge("admission_queue_depth", "Requests waiting for an admission slot.", ("class",))
+admission_wait = Histogram("admission_wait_seconds", "Time queued for an admission slot.", ("class",))
+admission_shed = Counter("admission_shed_total", "Requests rejected by admission control.", ("class", "reason"))
+
+METRICS = [requests_total, request_duration, requests_in_flight, request_queries, request_db_duration,
+           db_queries_total, db_seconds_total, slow_queries_total,
+           admission_in_flight, admission_queue_depth, admission_wait, admission_shed]
+
+
+class RequestStats:
+    __slots__ = ("route", "queries", "db_time")
+
+    def __init__(self, route: str):
+        self.route = route
+        self.queries = 0
+        self.db_time = 0.0
+
+
+current_request: ContextVar[Optional[RequestStats]] = ContextVar("current_request", default=None)
+
+
+def route_template(request: Request) -> str:
+    """The path template of the route that will handle the request, or "unmatched"."""
+    partial = None
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path  # right path, wrong method (405)
+    return partial or "unmatched"
+
+
+def observe_request(method: str, stats: RequestStats, status: int, duration: float) -> None:
+    labels = (method, stats.route)
+    requests_total.inc((method, stats.route, str(status)))
+    request_duration.observe(labels, duration)
+    request_queries.observe(labels, stats.queries)
+    request_db_duration.observe(labels, stats.db_time)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._metrics_start
+    stats = current_request.get()
+    route = stats.route if stats else "background"
+    if stats:
+        stats.queries += 1
+        stats.db_time += elapsed
+    db_queries_total.inc((route,))
+    db_seconds_total.inc((route,), elapsed)
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+        slow_queries_total.inc((route,))
+        slow_query_logger.warning("slow query (%.1f ms, %s): %s", elapsed * 1000, route, " ".join(statement.split()))
+
+
+def instrument_engine(engine) -> None:
+    """Counts and times every statement on a (sync) Engine; pass async_engine.sync_engine for async."""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def render(extra: Sequence[tuple[str, str, str, float]] = ()) -> str:
+    """Prometheus text format; extra is (name, type, help, value) for point-in-time values."""
+    lines = []
+    for m in METRICS:
+        lines += [f"# HELP {m.name} {m.help}", f"# TYPE {m.name} {m.kind}", *m.samples()]
+    for name, kind, help, value in extra:
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} {kind}", f"{name} {_num(value)}"]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,192 @@
+"""
+Versioned schema migrations for the SQLite database.
+
+Each Migration has a version, an `up` and (usually) a `down`; the versions
+applied to a database are recorded in schema_migrations. migrate() applies
+the pending ones in order, or reverts down to a target version, one
+transaction per migration: SQLite DDL is transactional, and the write
+engine (app/db.py) opens an explicit BEGIN IMMEDIATE, so a failing step
+leaves the file at the previous version.
+
+Migration 1 adopts databases created before versioning (by create_all and
+the old ADD COLUMN pass); later migrations are the explicit changes. They
+are written to be no-ops where create_all already produced the result, so
+a fresh database and an upgraded one end up with the same schema.
+
+Add a migration by appending to MIGRATIONS, and make the same change to
+app/models.py.
+"""
+import secrets
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import Column, Integer, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn
+
+from app.models import Base
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    name: str
+    up: Callable[[Connection], None]
+    down: Optional[Callable[[Connection], None]] = None
+
+
+# Operations. All are safe to run on a live database file; index and column
+# changes take the write lock for as long as SQLite needs to rebuild them.
+
+def column_names(conn: Connection, table: str) -> set:
+    return {c["name"] for c in inspect(conn).get_columns(table)}
+
+def add_column(conn: Connection, table: str, column: Column) -> bool:
+    """ALTER TABLE ... ADD COLUMN; returns False when the column already exists."""
+    if column.name in column_names(conn, table):
+        return False
+    spec = CreateColumn(column).compile(dialect=conn.dialect)
+    conn.exec_driver_sql(f"ALTER TABLE {table} ADD COLUMN {spec}")
+    return True
+
+def drop_column(conn: Connection, table: str, name: str) -> None:
+    """ALTER TABLE ... DROP COLUMN (SQLite 3.35+). Indexes on the column must be dropped first."""
+    if name in column_names(conn, table):
+        conn.exec_driver_sql(f"ALTER TABLE {table} DROP COLUMN {name}")
+
+def create_index(conn: Connection, name: str, table: str, *columns: str, unique: bool = False) -> None:
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    conn.exec_driver_sql(f"CREATE {kind} IF NOT EXISTS {name} ON {table} ({', '.join(columns)})")
+
+def drop_index(conn: Connection, name: str) -> None:
+    conn.exec_driver_sql(f"DROP INDEX IF EXISTS {name}")
+
+
+# Migrations
+
+def _baseline(conn: Connection) -> None:
+    # imported here: app.crud imports the models, and the models must not need this module
+    from app.crud import recompute_author_book_counts
+    from app.search import create_search_index, rebuild_search_index
+
+    Base.metadata.create_all(bind=conn)
+    added = [f"{t.name}.{c.name}" for t in Base.metadata.sorted_tables for c in t.columns
+             if add_column(conn, t.name, c)]
+    if "authors.book_count" in added:
+        recompute_author_book_counts(Session(bind=conn))
+    for table in ("authors", "books"):
+        if f"{table}.updated_at" in added:
+            conn.exec_driver_sql(f"UPDATE {table} SET updated_at = created_at WHERE updated_at IS NULL")
+    # create_all skips tables that already exist, including their new indexes
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+    create_search_index(conn)
+    rebuild_search_index(conn)
+
+def _drop_redundant_indexes(conn: Connection) -> None:
+    # the integer primary key is the rowid, and uq_books_isbn already indexes isbn;
+    # each duplicate index was one more b-tree to update on every insert
+    for name in ("ix_authors_id", "ix_books_id", "ix_books_isbn"):
+        drop_index(conn, name)
+
+def _restore_redundant_indexes(conn: Connection) -> None:
+    create_index(conn, "ix_authors_id", "authors", "id")
+    create_index(conn, "ix_books_id", "books", "id")
+    create_index(conn, "ix_books_isbn", "books", "isbn")
+
+def _add_year_sort_indexes(conn: Connection) -> None:
+    create_index(conn, "ix_books_published_year_title_id", "books", "published_year", "title", "id")
+    create_index(conn, "ix_books_published_year_created_at_id", "books", "published_year", "created_at", "id")
+
+def _drop_year_sort_indexes(conn: Connection) -> None:
+    drop_index(conn, "ix_books_published_year_title_id")
+    drop_index(conn, "ix_books_published_year_created_at_id")
+
+def _add_invalidation_log(conn: Connection) -> None:
+    # app/invalidation.py: writes append here, every worker process tails it
+    conn.exec_driver_sql("CREATE TABLE IF NOT EXISTS cache_invalidations "
+                         "(seq INTEGER PRIMARY KEY AUTOINCREMENT, tables TEXT NOT NULL, keys TEXT NOT NULL)")
+    conn.exec_driver_sql("CREATE TABLE IF NOT EXISTS cache_epoch (token TEXT NOT NULL)")
+    conn.execute(text("INSERT INTO cache_epoch (token) SELECT :token WHERE NOT EXISTS (SELECT 1 FROM cache_epoch)"),
+                 {"token": secrets.token_hex(4)})
+
+def _drop_invalidation_log(conn: Connection) -> None:
+    conn.exec_driver_sql("DROP TABLE IF EXISTS cache_invalidations")
+    conn.exec_driver_sql("DROP TABLE IF EXISTS cache_epoch")
+
+def _add_cache_version_floor(conn: Connection) -> None:
+    # app/invalidation.py: the version of anything last changed by a pruned log entry
+    if add_column(conn, "cache_epoch", Column("floor", Integer, nullable=False, server_default="0")):
+        conn.exec_driver_sql(
+            "UPDATE cache_epoch SET floor = coalesce((SELECT min(seq) - 1 FROM cache_invalidations), "
+            "(SELECT seq FROM sqlite_sequence WHERE name = 'cache_invalidations'), 0)")
+
+def _drop_cache_version_floor(conn: Connection) -> None:
+    drop_column(conn, "cache_epoch", "floor")
+
+def _add_stats_tables(conn: Connection) -> None:
+    # app/stats.py: summary tables the crud writes keep current, backfilled here
+    from app import stats
+
+    conn.exec_driver_sql("CREATE TABLE IF NOT EXISTS book_year_stats "
+                         "(published_year INTEGER PRIMARY KEY, book_count INTEGER NOT NULL)")
+    conn.exec_driver_sql("CREATE TABLE IF NOT EXISTS catalog_stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+    stats.rebuild(conn)
+
+def _drop_stats_tables(conn: Connection) -> None:
+    conn.exec_driver_sql("DROP TABLE IF EXISTS book_year_stats")
+    conn.exec_driver_sql("DROP TABLE IF EXISTS catalog_stats")
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "baseline schema and search index", _baseline),
+    Migration(2, "drop indexes duplicating the primary key and uq_books_isbn",
+              _drop_redundant_indexes, _restore_redundant_indexes),
+    Migration(3, "books (published_year, title|created_at, id) indexes",
+              _add_year_sort_indexes, _drop_year_sort_indexes),
+    Migration(4, "cache invalidation log shared by worker processes", _add_invalidation_log, _drop_invalidation_log),
+    Migration(5, "catalog statistics summary tables", _add_stats_tables, _drop_stats_tables),
+    Migration(6, "cache version floor advanced by log pruning", _add_cache_version_floor,
+              _drop_cache_version_floor),
+]
+
+
+# Runner
+
+def _ensure_version_table(conn: Connection) -> None:
+    conn.exec_driver_sql("CREATE TABLE IF NOT EXISTS schema_migrations "
+                         "(version INTEGER PRIMARY KEY, name VARCHAR(255) NOT NULL, applied_at DATETIME NOT NULL)")
+
+def applied_versions(bind: Engine) -> List[int]:
+    with bind.begin() as conn:
+        _ensure_version_table(conn)
+        return list(conn.scalars(text("SELECT version FROM schema_migrations ORDER BY version")))
+
+def migrate(bind: Engine, target: Optional[int] = None) -> List[Tuple[str, Migration]]:
+    """Brings the database to `target` (default: the latest version).
+
+    Returns the steps taken, as ("up" | "down", migration) in the order run.
+    Raises ValueError for an unknown target or a migration without a down.
+    """
+    latest = MIGRATIONS[-1].version
+    target = latest if target is None else target
+    if target != 0 and target not in {m.version for m in MIGRATIONS}:
+        raise ValueError(f"Unknown migration version {target}; latest is {latest}.")
+    applied = set(applied_versions(bind))
+    steps = [("up", m) for m in MIGRATIONS if m.version <= target and m.version not in applied]
+    steps += [("down", m) for m in reversed(MIGRATIONS) if m.version > target and m.version in applied]
+    irreversible = [m for direction, m in steps if direction == "down" and m.down is None]
+    if irreversible:
+        raise ValueError(f"Migration {irreversible[0].version} ({irreversible[0].name}) cannot be reverted.")
+    for direction, m in steps:
+        with bind.begin() as conn:
+            if direction == "up":
+                m.up(conn)
+                conn.execute(text("INSERT INTO schema_migrations (version, name, applied_at) VALUES (:v, :n, :t)"),
+                             {"v": m.version, "n": m.name, "t": datetime.utcnow()})
+            else:
+                m.down(conn)
+                conn.execute(text("DELETE FROM schema_migrations WHERE version = :v"), {"v": m.version})
+    return steps
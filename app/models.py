@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, UniqueConstraint
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, UniqueConstraint, Index
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -7,25 +7,44 @@ Base = declarative_base()
 class Author(Base):
     __tablename__ = "authors"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     name = Column(String(255), nullable=False)
     email = Column(String(255), nullable=False, unique=True, index=True)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # Last-Modified; nullable only because SQLite cannot ADD COLUMN with a
+    # non-constant default (migration 1 in app/migrations.py backfills it from created_at)
+    updated_at = Column(DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # denormalized count of books, maintained by crud.create_book/update_book
+    book_count = Column(Integer, nullable=False, default=0, server_default="0")
 
     books = relationship("Book", back_populates="author", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        Index("ix_authors_book_count_id", "book_count", "id"),
+    )
+
 class Book(Base):
     __tablename__ = "books"
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     title = Column(String(255), nullable=False)
-    isbn = Column(String(10), nullable=False, index=True)  
+    isbn = Column(String(10), nullable=False)  # indexed by uq_books_isbn
     published_year = Column(Integer, nullable=True)
     author_id = Column(Integer, ForeignKey("authors.id", ondelete="CASCADE"), nullable=False)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    updated_at = Column(DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     author = relationship("Author", back_populates="books")
 
     __table_args__ = (
         UniqueConstraint("isbn", name="uq_books_isbn"),  # optional but sensible
+        # (sort_key, id) indexes back the keyset seeks in crud.list_books_paginated
+        Index("ix_books_title_id", "title", "id"),
+        Index("ix_books_published_year_id", "published_year", "id"),
+        Index("ix_books_created_at_id", "created_at", "id"),
+        # year filter + title/created_at sort, without a temp sort of the year's rows
+        Index("ix_books_published_year_title_id", "published_year", "title", "id"),
+        Index("ix_books_published_year_created_at_id", "published_year", "created_at", "id"),
+        # an author's books (detail page, include=books) without a table scan
+        Index("ix_books_author_id_id", "author_id", "id"),
     )
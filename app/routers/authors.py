@@ -1,10 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
-from sqlalchemy import select
-from app.deps import get_db
+from functools import partial
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import crud, uniqueness
+from app.deps import get_async_db
 from app import schemas
-from app.crud import create_author, get_author_by_id, list_authors_paginated, count_authors
-from app.models import Author
+from app.bulk import BULK_OPENAPI, BulkFormatError, ingest, iter_records
+from app.cache import entity_cache
+from app.conditional import entity_etag, headers, is_fresh, last_modified, list_etag, not_modified
+from app.export import export_response
+from app.crud_async import get_author_by_id, get_authors_by_ids, list_authors_paginated, authors_total
+from app.serialization import page_response, to_dicts
+from app.utils.fieldsets import InvalidFieldsError, parse_fields
+from app.utils.pagination import InvalidCursorError
+from app.writer import write_queue
 
 router = APIRouter(prefix="/authors", tags=["Authors"])
 
@@ -12,54 +22,129 @@ router = APIRouter(prefix="/authors", tags=["Authors"])
 # GET /authors - List authors
 # -------------------------------
 @router.get("/", response_model=schemas.PaginatedAuthors)
-def get_authors(
+async def get_authors(
+    request: Request,
     name: str | None = Query(default=None, description="Filter by author name"),
-    sort: str | None = Query(default=None, description='Sort by "book_count"'),
+    match: str = Query(default="substring", regex="^(substring|fts)$",
+                       description="substring: ILIKE match; fts: full-text token/prefix match"),
+    sort: str | None = Query(default=None, description='Sort by "book_count", "id" or "relevance" (fts only)'),
     order: str | None = Query(default="desc", regex="(?i)^(asc|desc)$"),
     limit: int = Query(default=20, ge=1, le=100),
     offset: int = Query(default=0, ge=0),
-    db: Session = Depends(get_db),
+    cursor: str | None = Query(default=None, description="next_cursor from a previous page (overrides offset)"),
+    total_mode: str = Query(default="exact", alias="total", regex="^(exact|estimate|none)$",
+                       description="exact: current count; estimate: cached/approximate count; none: skip the count"),
+    include: str | None = Query(default=None, regex="^books$", description="embed each author's books"),
+    fields: str | None = Query(default=None, description="comma-separated author fields to return, e.g. id,name"),
+    db: AsyncSession = Depends(get_async_db),
 ):
     try:
-        total = count_authors(db, name=name)
-        rows = list_authors_paginated(db, name=name, sort=sort, order=order, limit=limit, offset=offset)
-        
-        # Ensure rows are tuples (Author, book_count)
-        data = [
-            schemas.AuthorOut(
-                id=a.id,
-                name=a.name,
-                email=a.email,
-                created_at=a.created_at,
-                book_count=bc or 0
-            ) for a, bc in rows
-        ]
-
-        return {"data": data, "total": total, "limit": limit, "offset": offset}
+        field_list = parse_fields(fields, crud.AUTHOR_FIELDS)
+        # book_count lives on authors; book rows only matter when embedded
+        etag = list_etag(request, "authors", *(["books"] if include else []))
+        if is_fresh(request, etag):
+            return not_modified(etag)
+        total = await authors_total(db, name=name, match=match, mode=total_mode)
+        rows, next_cursor = await list_authors_paginated(
+            db, name=name, sort=sort, order=order, limit=limit, offset=offset, cursor=cursor, match=match,
+            include=include, fields=field_list
+        )
+        # rendered straight from the ORM columns, no response_model validation
+        authors = [a for a, _ in rows]
+        data = to_dicts(authors, field_list or crud.AUTHOR_FIELDS)
+        if include:
+            for item, a in zip(data, authors):
+                item["books"] = to_dicts(a.books, crud.BOOK_FIELDS)
+        modified = last_modified(*authors, *(b for a in authors if include for b in a.books))
+        return page_response(data, total, limit, offset, next_cursor, headers(etag, modified))
 
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {e}")
 
 
+# -------------------------------
+# GET /authors/export - stream matching authors as NDJSON or CSV
+# -------------------------------
+@router.get("/export", response_class=StreamingResponse)
+async def export_authors_endpoint(
+    name: str | None = Query(default=None, description="Filter by author name"),
+    match: str = Query(default="substring", regex="^(substring|fts)$"),
+    fmt: str = Query(default="ndjson", alias="format", regex="^(ndjson|csv)$"),
+):
+    query = partial(crud.export_authors, name=name, match=match)
+    return export_response(query, crud.AUTHOR_EXPORT_COLUMNS, fmt, "authors")
+
+
 # -------------------------------
 # POST /authors - Create author
 # -------------------------------
 @router.post("/", response_model=schemas.AuthorOut, status_code=status.HTTP_201_CREATED)
-def create_author_endpoint(payload: schemas.AuthorCreate, db: Session = Depends(get_db)):
+async def create_author_endpoint(payload: schemas.AuthorCreate):
     try:
-        # Check if email already exists
-        existing_author = db.execute(select(Author).where(Author.email == payload.email)).scalars().first()
-        if existing_author:
+        # a known email is turned away here, without a write (app/uniqueness.py); one
+        # taken since is caught by the unique index (crud.constraint_error)
+        if await uniqueness.email_duplicate(payload.email):
             raise HTTPException(status_code=409, detail="Email already exists.")
+        return await write_queue.run(crud.create_author, payload)
+    except IntegrityError as e:
+        status_code, detail = crud.constraint_error(e)
+        raise HTTPException(status_code=status_code, detail=detail)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Server error: {e}")
 
-        a = create_author(db, payload)
-        return schemas.AuthorOut(
-            id=a.id,
-            name=a.name,
-            email=a.email,
-            created_at=a.created_at,
-            book_count=0
-        )
+
+# -------------------------------
+# POST /authors/bulk - bulk create authors
+# -------------------------------
+@router.post("/bulk", response_model=schemas.BulkResult, openapi_extra=BULK_OPENAPI)
+async def bulk_create_authors_endpoint(request: Request):
+    """JSON array or NDJSON of AuthorCreate objects; returns one result per row, in input order."""
+    try:
+        report = await ingest(iter_records(request), schemas.AuthorCreate, crud.bulk_create_authors)
+        # the report can hold millions of rows: skip re-validating it against response_model
+        return ORJSONResponse(report)
+    except BulkFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Server error: {e}")
+
+
+def _cache_author(a, generation: int) -> tuple:
+    """Serializes an author loaded with their books; caches and returns (data, etag, last_modified)."""
+    key = ("authors", a.id)
+    # book writes invalidate their author's key, so it versions the embedded books too
+    entry = (schemas.AuthorWithBooks.model_validate(a).model_dump(mode="json"),
+             entity_etag([key], generation), last_modified(a, *a.books))
+    entity_cache.put(key, entry, generation=generation)
+    return entry
+
+
+# -------------------------------
+# POST /authors/batch-get - several authors by id
+# -------------------------------
+@router.post("/batch-get", response_model=schemas.AuthorBatchResult)
+async def batch_get_authors(payload: schemas.BatchGetRequest, db: AsyncSession = Depends(get_async_db)):
+    try:
+        ids = list(dict.fromkeys(payload.ids))
+        found = {}
+        for author_id in ids:
+            cached = entity_cache.get(("authors", author_id))
+            if cached is not None:
+                found[author_id] = cached[0]
+        missing = [i for i in ids if i not in found]
+        if missing:
+            # one IN (...) query (plus one for their books) for everything not cached
+            generation = entity_cache.generation
+            for a in await get_authors_by_ids(db, missing):
+                found[a.id] = _cache_author(a, generation)[0]
+        return ORJSONResponse({"results": [
+            {"id": i, "status": "found", "data": found[i]} if i in found else {"id": i, "status": "not_found"}
+            for i in payload.ids
+        ]})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {e}")
 
@@ -68,11 +153,24 @@ def create_author_endpoint(payload: schemas.AuthorCreate, db: Session = Depends(
 # GET /authors/{author_id} - Get single author
 # -------------------------------
 @router.get("/{author_id}", response_model=schemas.AuthorWithBooks)
-def get_author(author_id: int, db: Session = Depends(get_db)):
+async def get_author(author_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
     try:
-        a = get_author_by_id(db, author_id)
+        key = ("authors", author_id)
+        cached = entity_cache.get(key)
+        if cached is not None:
+            data, etag, modified = cached
+            if is_fresh(request, etag):
+                return not_modified(etag, modified)
+            return ORJSONResponse(data, headers=headers(etag, modified))
+        generation = entity_cache.generation
+        a = await get_author_by_id(db, author_id, with_books=True)
         if not a:
             raise HTTPException(status_code=404, detail="Author not found.")
-        return a
+        data, etag, modified = _cache_author(a, generation)
+        if is_fresh(request, etag):
+            return not_modified(etag, modified)
+        return ORJSONResponse(data, headers=headers(etag, modified))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {e}")
@@ -1,10 +1,20 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
-from sqlalchemy import select
-from app.deps import get_db
+from functools import partial
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import crud, uniqueness
+from app.deps import get_async_db
 from app import schemas
-from app.crud import create_book, get_book_by_id, update_book, list_books_paginated, count_books
-from app.models import Author, Book
+from app.bulk import BULK_OPENAPI, BulkFormatError, ingest, iter_records
+from app.cache import entity_cache
+from app.conditional import entity_etag, headers, is_fresh, last_modified, list_etag, not_modified
+from app.export import export_response
+from app.crud_async import get_book_by_id, get_books_by_ids, list_books_paginated, books_total
+from app.serialization import page_response, to_dict, to_dicts
+from app.utils.fieldsets import InvalidFieldsError, parse_fields
+from app.utils.pagination import InvalidCursorError
+from app.writer import write_queue
 
 router = APIRouter(prefix="/books", tags=["Books"])
 
@@ -12,41 +22,132 @@ router = APIRouter(prefix="/books", tags=["Books"])
 # GET /books - list books (with pagination)
 # -------------------------------
 @router.get("/", response_model=schemas.PaginatedBooks)
-def get_books(
+async def get_books(
+    request: Request,
     title: str | None = None,
     author: str | None = None,
     year: int | None = None,
-    sort: str | None = Query(default=None, description="title|published_year|created_at"),
+    match: str = Query(default="substring", regex="^(substring|fts)$",
+                       description="substring: ILIKE match; fts: full-text token/prefix match"),
+    sort: str | None = Query(default=None, description="title|published_year|created_at|id|relevance (fts only)"),
     order: str | None = Query(default="asc", regex="(?i)^(asc|desc)$"),
     limit: int = Query(default=20, ge=1, le=100),
     offset: int = Query(default=0, ge=0),
-    db: Session = Depends(get_db),
+    cursor: str | None = Query(default=None, description="next_cursor from a previous page (overrides offset)"),
+    total_mode: str = Query(default="exact", alias="total", regex="^(exact|estimate|none)$",
+                       description="exact: current count; estimate: cached/approximate count; none: skip the count"),
+    include: str | None = Query(default=None, regex="^author$", description="embed each book's author"),
+    fields: str | None = Query(default=None, description="comma-separated book fields to return, e.g. id,title"),
+    db: AsyncSession = Depends(get_async_db),
 ):
     try:
-        total = count_books(db, title=title, author=author, year=year)
-        items = list_books_paginated(
+        field_list = parse_fields(fields, crud.BOOK_FIELDS)
+        # author rows only matter when filtered on or embedded
+        etag = list_etag(request, "books", *(["authors"] if author or include else []))
+        if is_fresh(request, etag):
+            return not_modified(etag)
+        total = await books_total(db, title=title, author=author, year=year, match=match, mode=total_mode)
+        items, next_cursor = await list_books_paginated(
             db, title=title, author=author, year=year,
-            sort=sort, order=order, limit=limit, offset=offset
+            sort=sort, order=order, limit=limit, offset=offset, cursor=cursor, match=match,
+            include=include, fields=field_list
         )
-        return {"data": items, "total": total, "limit": limit, "offset": offset}
+        # rendered straight from the ORM columns, no response_model validation
+        data = to_dicts(items, field_list or crud.BOOK_FIELDS)
+        if include:
+            for item, b in zip(data, items):
+                item["author"] = to_dict(b.author, crud.AUTHOR_FIELDS)
+        modified = last_modified(*items, *(b.author for b in items if include))
+        return page_response(data, total, limit, offset, next_cursor, headers(etag, modified))
+    except (InvalidCursorError, InvalidFieldsError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {e}")
 
 
+# -------------------------------
+# GET /books/export - stream matching books as NDJSON or CSV
+# -------------------------------
+@router.get("/export", response_class=StreamingResponse)
+async def export_books_endpoint(
+    title: str | None = None,
+    author: str | None = None,
+    year: int | None = None,
+    match: str = Query(default="substring", regex="^(substring|fts)$"),
+    fmt: str = Query(default="ndjson", alias="format", regex="^(ndjson|csv)$"),
+):
+    query = partial(crud.export_books, title=title, author=author, year=year, match=match)
+    return export_response(query, crud.BOOK_EXPORT_COLUMNS, fmt, "books")
+
+
 # -------------------------------
 # POST /books - create book
 # -------------------------------
 @router.post("/", response_model=schemas.BookOut, status_code=status.HTTP_201_CREATED)
-def create_book_endpoint(payload: schemas.BookCreate, db: Session = Depends(get_db)):
+async def create_book_endpoint(payload: schemas.BookCreate):
     try:
-        if not db.get(Author, payload.author_id):
-            raise HTTPException(status_code=400, detail="Invalid author_id. Author does not exist.")
-
-        existing = db.execute(select(Book).where(Book.isbn == payload.isbn)).scalars().first()
-        if existing:
+        # a known ISBN is turned away here, without a write (app/uniqueness.py); anything
+        # else - unknown author, an ISBN taken since - is caught by the constraints
+        if uniqueness.isbn_duplicate(payload.isbn):
             raise HTTPException(status_code=409, detail="ISBN already exists.")
+        return await write_queue.run(crud.create_book, payload)
+    except IntegrityError as e:
+        status_code, detail = crud.constraint_error(e)
+        raise HTTPException(status_code=status_code, detail=detail)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Server error: {e}")
+
+
+# -------------------------------
+# POST /books/bulk - bulk create books
+# -------------------------------
+@router.post("/bulk", response_model=schemas.BulkResult, openapi_extra=BULK_OPENAPI)
+async def bulk_create_books_endpoint(request: Request):
+    """JSON array or NDJSON of BookCreate objects; returns one result per row, in input order."""
+    try:
+        report = await ingest(iter_records(request), schemas.BookCreate, crud.bulk_create_books)
+        # the report can hold millions of rows: skip re-validating it against response_model
+        return ORJSONResponse(report)
+    except BulkFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Server error: {e}")
+
+
+def _cache_book(b, generation: int) -> tuple:
+    """Serializes a book loaded with its author; caches and returns (data, etag, last_modified)."""
+    key, author_key = ("books", b.id), ("authors", b.author_id)
+    entry = (schemas.BookWithAuthor.model_validate(b).model_dump(mode="json"),
+             entity_etag([key, author_key], generation), last_modified(b, b.author))
+    # the embedded author (and its book_count) goes stale with the author
+    entity_cache.put(key, entry, tags=[author_key], generation=generation)
+    return entry
 
-        return create_book(db, payload)
+
+# -------------------------------
+# POST /books/batch-get - several books by id
+# -------------------------------
+@router.post("/batch-get", response_model=schemas.BookBatchResult)
+async def batch_get_books(payload: schemas.BatchGetRequest, db: AsyncSession = Depends(get_async_db)):
+    try:
+        ids = list(dict.fromkeys(payload.ids))
+        found = {}
+        for book_id in ids:
+            cached = entity_cache.get(("books", book_id))
+            if cached is not None:
+                found[book_id] = cached[0]
+        missing = [i for i in ids if i not in found]
+        if missing:
+            # one IN (...) query for everything not cached
+            generation = entity_cache.generation
+            for b in await get_books_by_ids(db, missing):
+                found[b.id] = _cache_book(b, generation)[0]
+        return ORJSONResponse({"results": [
+            {"id": i, "status": "found", "data": found[i]} if i in found else {"id": i, "status": "not_found"}
+            for i in payload.ids
+        ]})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {e}")
 
@@ -55,25 +156,53 @@ def create_book_endpoint(payload: schemas.BookCreate, db: Session = Depends(get_
 # GET /books/{book_id} - get single book
 # -------------------------------
 @router.get("/{book_id}", response_model=schemas.BookWithAuthor)
-def get_book(book_id: int, db: Session = Depends(get_db)):
+async def get_book(book_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
     try:
-        b = get_book_by_id(db, book_id)
+        key = ("books", book_id)
+        cached = entity_cache.get(key)
+        if cached is not None:
+            data, etag, modified = cached
+            if is_fresh(request, etag):
+                return not_modified(etag, modified)
+            return ORJSONResponse(data, headers=headers(etag, modified))
+        generation = entity_cache.generation
+        b = await get_book_by_id(db, book_id, with_author=True)
         if not b:
             raise HTTPException(status_code=404, detail="Book not found.")
-        return b
+        data, etag, modified = _cache_book(b, generation)
+        if is_fresh(request, etag):
+            return not_modified(etag, modified)
+        return ORJSONResponse(data, headers=headers(etag, modified))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {e}")
 
 
 # -------------------------------
 # PUT /books/{book_id} - update book
+# PATCH /books/{book_id} - update only the fields sent
 # -------------------------------
-@router.put("/{book_id}", response_model=schemas.BookOut)
-def update_book_endpoint(book_id: int, payload: schemas.BookUpdate, db: Session = Depends(get_db)):
+async def _update_book(book_id: int, payload: schemas.BookUpdate):
     try:
-        b = get_book_by_id(db, book_id)
+        b = await write_queue.run(crud.update_book_by_id, book_id, payload)
         if not b:
             raise HTTPException(status_code=404, detail="Book not found.")
-        return update_book(db, b, payload)
+        return b
+    except IntegrityError as e:
+        status_code, detail = crud.constraint_error(e)
+        raise HTTPException(status_code=status_code, detail=detail)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Server error: {e}")
+
+
+@router.put("/{book_id}", response_model=schemas.BookOut)
+async def update_book_endpoint(book_id: int, payload: schemas.BookUpdate):
+    return await _update_book(book_id, payload)
+
+
+@router.patch("/{book_id}", response_model=schemas.BookOut)
+async def patch_book_endpoint(book_id: int, payload: schemas.BookUpdate):
+    return await _update_book(book_id, payload)
@@ -0,0 +1,63 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import schemas, stats
+from app.conditional import headers, is_fresh, list_etag, not_modified
+from app.deps import get_async_db
+
+router = APIRouter(prefix="/stats", tags=["Stats"])
+
+# Every endpoint reads the summary tables of app/stats.py: constant cost
+# however many books there are. ETags follow the tables each one summarizes.
+
+async def _respond(request: Request, db: AsyncSession, tables: tuple, fn, *args):
+    try:
+        etag = list_etag(request, *tables)
+        if is_fresh(request, etag):
+            return not_modified(etag)
+        return ORJSONResponse(await db.run_sync(fn, *args), headers=headers(etag))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Server error: {e}")
+
+
+# -------------------------------
+# GET /stats - catalog totals
+# -------------------------------
+@router.get("/", response_model=schemas.CatalogTotals)
+async def get_totals(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await _respond(request, db, ("books", "authors"), stats.totals)
+
+
+# -------------------------------
+# GET /stats/years - books per published year
+# -------------------------------
+@router.get("/years", response_model=List[schemas.YearCount])
+async def get_year_counts(
+    request: Request,
+    from_year: int | None = Query(default=None, alias="from", description="first year (inclusive)"),
+    to_year: int | None = Query(default=None, alias="to", description="last year (inclusive)"),
+    db: AsyncSession = Depends(get_async_db),
+):
+    return await _respond(request, db, ("books",), stats.year_counts, from_year, to_year)
+
+
+# -------------------------------
+# GET /stats/decades - books per decade
+# -------------------------------
+@router.get("/decades", response_model=List[schemas.DecadeCount])
+async def get_decade_counts(request: Request, db: AsyncSession = Depends(get_async_db)):
+    return await _respond(request, db, ("books",), stats.decade_counts)
+
+
+# -------------------------------
+# GET /stats/authors - authors with the most books
+# -------------------------------
+@router.get("/authors", response_model=List[schemas.TopAuthor])
+async def get_top_authors(
+    request: Request,
+    limit: int = Query(default=10, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+):
+    # book_count lives on the authors rows
+    return await _respond(request, db, ("authors",), stats.top_authors, limit)
@@ -18,9 +18,10 @@ class AuthorOut(BaseModel):
 
 class PaginatedAuthors(BaseModel):
     data: List[AuthorOut]
-    total: int
+    total: int | None
     limit: int
     offset: int
+    next_cursor: str | None = None
 
 class BookOut(BaseModel):
     id: int
@@ -33,9 +34,10 @@ class BookOut(BaseModel):
     
 class PaginatedBooks(BaseModel):
     data: List[BookOut]
-    total: int
+    total: int | None
     limit: int
     offset: int
+    next_cursor: str | None = None
 
 class AuthorWithBooks(BaseModel):
     id: int
@@ -94,3 +96,63 @@ class BookOut(BaseModel):
 
 class BookWithAuthor(BookOut):
     author: AuthorOut  # uses AuthorOut defined above
+
+
+#BULK INGEST SCHEMAS
+class BulkRowResult(BaseModel):
+    row: int
+    status: str  # "created" | "error"
+    id: int | None = None
+    error: str | None = None
+    details: list[dict] | None = None
+
+class BulkResult(BaseModel):
+    created: int
+    failed: int
+    results: List[BulkRowResult]
+
+
+#BATCH GET SCHEMAS
+BATCH_GET_MAX = 500
+
+class BatchGetRequest(BaseModel):
+    ids: List[int] = Field(min_length=1, max_length=BATCH_GET_MAX)
+
+class BookBatchItem(BaseModel):
+    id: int
+    status: str  # "found" | "not_found"
+    data: BookWithAuthor | None = None
+
+class BookBatchResult(BaseModel):
+    results: List[BookBatchItem]
+
+class AuthorBatchItem(BaseModel):
+    id: int
+    status: str  # "found" | "not_found"
+    data: AuthorWithBooks | None = None
+
+class AuthorBatchResult(BaseModel):
+    results: List[AuthorBatchItem]
+
+
+#STATS SCHEMAS
+class CatalogTotals(BaseModel):
+    books: int
+    authors: int
+    books_without_year: int
+    years: int
+    first_year: int | None
+    last_year: int | None
+
+class YearCount(BaseModel):
+    year: int
+    books: int
+
+class DecadeCount(BaseModel):
+    decade: int
+    books: int
+
+class TopAuthor(BaseModel):
+    id: int
+    name: str
+    book_count: int
@@ -0,0 +1,89 @@
+"""
+SQLite FTS5 search index over Book.title and Author.name.
+
+The FTS tables are external-content tables (they store only the index, the
+text lives in books/authors) and are kept in sync by triggers, so every write
+path - ORM, Core inserts, scripts - updates the index in the same transaction.
+
+Per-row triggers on a virtual table are slow for bulk loads, so the insert
+triggers are skipped while search_index_deferred has a row; bulk writers set
+it, insert, then index the new rows with one INSERT ... SELECT (see
+deferred_indexing()).
+"""
+import re
+from contextlib import contextmanager
+from typing import Optional
+from sqlalchemy import event, table, column, text
+from app.models import Base
+
+books_fts = table("books_fts", column("rowid"), column("title"), column("rank"))
+authors_fts = table("authors_fts", column("rowid"), column("name"), column("rank"))
+
+# (fts table, content table, indexed column)
+_INDEXES = [("books_fts", "books", "title"), ("authors_fts", "authors", "name")]
+
+def _ddl(fts: str, src: str, col: str) -> list[str]:
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5("
+        f"{col}, content='{src}', content_rowid='id', "
+        f"tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        # recreated so databases built before the bulk-load guard get it
+        f"DROP TRIGGER IF EXISTS {fts}_ai",
+        f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {src} "
+        f"WHEN NOT EXISTS (SELECT 1 FROM search_index_deferred) BEGIN "
+        f"INSERT INTO {fts}(rowid, {col}) VALUES (new.id, new.{col}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {src} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {col}) VALUES ('delete', old.id, old.{col}); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {col} ON {src} BEGIN "
+        f"INSERT INTO {fts}({fts}, rowid, {col}) VALUES ('delete', old.id, old.{col}); "
+        f"INSERT INTO {fts}(rowid, {col}) VALUES (new.id, new.{col}); END",
+    ]
+
+def create_search_index(connection) -> None:
+    connection.execute(text("CREATE TABLE IF NOT EXISTS search_index_deferred (flag INTEGER)"))
+    for fts, src, col in _INDEXES:
+        for stmt in _ddl(fts, src, col):
+            connection.execute(text(stmt))
+
+def rebuild_search_index(connection) -> None:
+    """Re-reads every row of the content tables into the FTS index."""
+    for fts, _, _ in _INDEXES:
+        connection.execute(text(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')"))
+
+@contextmanager
+def deferred_indexing(db, src: str):
+    """Suspends the per-row insert triggers while the caller inserts into `src`,
+    then indexes everything above the previous max(id) in one statement.
+
+    Yields that previous max(id) so the caller can find its new rows. Only
+    valid while `db` holds the write lock - a session of the writer's engine
+    (BEGIN IMMEDIATE), or one that has already written in this transaction -
+    so no other connection can insert between the max(id) and the indexing
+    (ids are allocated max+1 under the lock), and inside the caller's
+    transaction or savepoint, so a failure rolls the flag back together with
+    the rows. Raises RuntimeError when no write transaction is open.
+    """
+    if not db.connection().connection.dbapi_connection.in_transaction:
+        raise RuntimeError("deferred_indexing needs the write lock: use WriteSessionLocal or write first")
+    fts, col = next((f, c) for f, s, c in _INDEXES if s == src)
+    before = db.execute(text(f"SELECT coalesce(max(id), 0) FROM {src}")).scalar()
+    db.execute(text("INSERT INTO search_index_deferred (flag) VALUES (1)"))
+    yield before
+    db.execute(text(f"INSERT INTO {fts}(rowid, {col}) SELECT id, {col} FROM {src} WHERE id > :before"),
+               {"before": before})
+    db.execute(text("DELETE FROM search_index_deferred"))
+
+@event.listens_for(Base.metadata, "after_create")
+def _create_on_metadata_create(target, connection, **kw):
+    create_search_index(connection)
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def fts_query(term: Optional[str]) -> Optional[str]:
+    """Turns free text into an FTS5 query: every token must match, as a prefix.
+
+    "lord ring" -> '"lord"* "ring"*'. Returns None when the term has no tokens.
+    Tokens are always quoted, so FTS5 operators in user input are inert.
+    """
+    tokens = _TOKEN_RE.findall(term or "")
+    return " ".join(f'"{t}"*' for t in tokens) or None
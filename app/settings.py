@@ -0,0 +1,43 @@
+"""
+Settings for main.create_app, read from the environment by Settings.from_env().
+
+Only what the application factory and the database layer need lives here;
+the tuning knobs of individual modules (WRITE_BATCH_*, ADMISSION_*,
+COMPRESS_*, ...) stay module constants read at import.
+"""
+import os
+from dataclasses import dataclass
+
+
+def _flag(value: str) -> bool:
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+@dataclass(frozen=True)
+class Settings:
+    database_path: str = "./app.db"
+    # sync: crud on the read pool via the threadpool; async: crud on a read-only aiosqlite AsyncEngine
+    db_mode: str = "sync"
+    read_pool_size: int = 8
+    # busy_timeout makes a connection wait for the write lock (another worker
+    # process's writer, a migration) instead of failing with "database is locked";
+    # mmap lets readers page the file straight from the OS cache instead of
+    # copying it into each connection's private page cache
+    busy_timeout_ms: int = 5000
+    cache_size_kb: int = 65536
+    mmap_size: int = 256 * 1024 * 1024
+    # at startup, open the pools and run the common queries once (app/warmup.py)
+    prewarm: bool = False
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        d = cls()
+        return cls(
+            database_path=os.getenv("DATABASE_PATH", d.database_path),
+            db_mode=os.getenv("DB_MODE", d.db_mode).lower(),
+            read_pool_size=int(os.getenv("DB_READ_POOL_SIZE", d.read_pool_size)),
+            busy_timeout_ms=int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", d.busy_timeout_ms)),
+            cache_size_kb=int(os.getenv("SQLITE_CACHE_SIZE_KB", d.cache_size_kb)),
+            mmap_size=int(os.getenv("SQLITE_MMAP_SIZE", d.mmap_size)),
+            prewarm=_flag(os.getenv("PREWARM", "0")),
+        )
@@ -0,0 +1,81 @@
+"""
+Catalog statistics, read from summary tables instead of aggregating the catalog.
+
+book_year_stats holds the number of books per published_year, catalog_stats
+the catalog-wide counters (books, authors, books without a year), and books
+per author is the denormalized authors.book_count. The crud write functions
+update them in the write's own transaction (record()), so they are exactly
+as current as the rows they summarize. A /stats read touches at most one
+row per year (1000-2100) or the top of ix_authors_book_count_id, however
+large the catalog grows.
+
+rebuild() recomputes the tables from books/authors: migration 5 backfills
+with it, and scripts/rebuild_stats.py runs it after editing the data by hand.
+"""
+from typing import Dict, List, Optional
+
+from sqlalchemy import desc, select, text
+from sqlalchemy.orm import Session
+
+from app.models import Author
+
+_UPSERT_YEAR = text(
+    "INSERT INTO book_year_stats (published_year, book_count) VALUES (:year, :n) "
+    "ON CONFLICT (published_year) DO UPDATE SET book_count = book_count + excluded.book_count")
+_UPSERT_COUNTER = text(
+    "INSERT INTO catalog_stats (name, value) VALUES (:name, :n) "
+    "ON CONFLICT (name) DO UPDATE SET value = value + excluded.value")
+
+
+def record(db: Session, books: Optional[Dict[Optional[int], int]] = None, authors: int = 0) -> None:
+    """Applies a write's change: books maps published_year (None: no year) to the change in its book count."""
+    books = books or {}
+    years = [{"year": y, "n": n} for y, n in books.items() if y is not None and n]
+    if years:
+        db.execute(_UPSERT_YEAR, years)
+    counters = {"books": sum(books.values()), "books_without_year": books.get(None, 0), "authors": authors}
+    counters = [{"name": k, "n": n} for k, n in counters.items() if n]
+    if counters:
+        db.execute(_UPSERT_COUNTER, counters)
+
+
+def rebuild(db: Session) -> None:
+    db.execute(text("DELETE FROM book_year_stats"))
+    db.execute(text("INSERT INTO book_year_stats (published_year, book_count) "
+                    "SELECT published_year, count(*) FROM books WHERE published_year IS NOT NULL "
+                    "GROUP BY published_year"))
+    db.execute(text("DELETE FROM catalog_stats"))
+    db.execute(text("INSERT INTO catalog_stats (name, value) VALUES "
+                    "('books', (SELECT count(*) FROM books)), "
+                    "('books_without_year', (SELECT count(*) FROM books WHERE published_year IS NULL)), "
+                    "('authors', (SELECT count(*) FROM authors))"))
+
+
+def totals(db: Session) -> dict:
+    counters = dict(db.execute(text("SELECT name, value FROM catalog_stats")).all())
+    years, first, last = db.execute(text(
+        "SELECT count(*), min(published_year), max(published_year) FROM book_year_stats WHERE book_count > 0")).one()
+    return {"books": counters.get("books", 0), "authors": counters.get("authors", 0),
+            "books_without_year": counters.get("books_without_year", 0),
+            "years": years, "first_year": first, "last_year": last}
+
+
+def year_counts(db: Session, start: Optional[int] = None, end: Optional[int] = None) -> List[dict]:
+    rows = db.execute(text(
+        "SELECT published_year, book_count FROM book_year_stats WHERE book_count > 0 "
+        "AND published_year >= coalesce(:start, published_year) AND published_year <= coalesce(:end, published_year) "
+        "ORDER BY published_year"), {"start": start, "end": end})
+    return [{"year": y, "books": n} for y, n in rows]
+
+
+def decade_counts(db: Session) -> List[dict]:
+    rows = db.execute(text(
+        "SELECT published_year / 10 * 10 AS decade, sum(book_count) FROM book_year_stats "
+        "GROUP BY decade HAVING sum(book_count) > 0 ORDER BY decade"))
+    return [{"decade": d, "books": n} for d, n in rows]
+
+
+def top_authors(db: Session, limit: int = 10) -> List[dict]:
+    rows = db.execute(select(Author.id, Author.name, Author.book_count)
+                      .order_by(desc(Author.book_count), desc(Author.id)).limit(limit))
+    return [{"id": i, "name": name, "book_count": n} for i, name, n in rows]
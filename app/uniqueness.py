@@ -0,0 +1,367 @@
+"""
+In-memory index of the taken ISBNs and emails, to turn duplicate creates away
+before they reach the write queue.
+
+A duplicate POST /books or /authors is otherwise rejected by the unique index
+inside the writer's transaction (crud.constraint_error): it waits its turn in
+the queue, takes the write lock for a SAVEPOINT and an INSERT that fails. During
+catalog imports that is a large share of the writes.
+
+    isbns    SortedKeys: every ISBN as an int64 in one sorted array('q') (ISBNs are
+             10 digits), 8 bytes per book, plus small sets of keys added and
+             removed since, merged in when they grow. Exact: a hit is a 409.
+    emails   BloomFilter: under 3 bytes per author (sized at load for twice as
+             many, at UNIQUE_BLOOM_FP_RATE). A miss is certain; a hit is confirmed
+             by one indexed SELECT on the read pool (the "exact fallback"), and is
+             a 409 only if the row is there. Emails are never changed or deleted
+             through the API, so nothing is removed.
+
+A key the index does not have still goes to the writer as before: the
+database's constraint stays the authority, so a key missing from the index
+only costs the round trip. An ISBN wrongly present would be a wrong 409; it
+takes a row deleted or changed outside the API (restart the workers after
+editing by hand). What keeps the index current:
+
+  * load() reads both columns on a background thread started at startup
+    (app/warmup.py), after the invalidation log has been applied once - about
+    1 s per million books plus 4 s per million authors, so the app does not
+    wait for it; a change logged meanwhile is replayed on top;
+  * single-row writes log ("books.isbn", isbn, taken) / ("authors.email", ...)
+    keys with their invalidation entry (crud._invalidate), and every process
+    applies them in log order (apply(), from InvalidationLog.sync) before its
+    next request - the process that wrote included, on commit;
+  * bulk inserts add their keys in-process on commit but do not log them (a
+    chunk can hold thousands); other workers catch those duplicates at the
+    constraint, as before.
+
+UNIQUE_INDEX=0 turns it off; until load() has run every key counts as unknown.
+stats() and /metrics report the memory used and the filter's false positives.
+"""
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from typing import Iterable, List, Optional
+
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from app import db as database
+
+UNIQUE_INDEX = os.getenv("UNIQUE_INDEX", "1").strip().lower() in ("1", "true", "yes", "on")
+UNIQUE_BLOOM_FP_RATE = float(os.getenv("UNIQUE_BLOOM_FP_RATE", "0.01"))
+
+ISBN_KEY, EMAIL_KEY = "books.isbn", "authors.email"
+
+logger = logging.getLogger("app")
+
+
+def _isbn_int(isbn: str) -> Optional[int]:
+    # None for a value the API could never accept (schemas: exactly 10 digits)
+    return int(isbn) if len(isbn) == 10 and isbn.isdigit() else None
+
+
+class SortedKeys:
+    """Set of ints: a sorted array('q') plus the keys added and removed since it was built.
+
+    The three parts are replaced together as one tuple, so a reader on another
+    thread never sees a merged array with the old deltas, or the reverse.
+    """
+
+    def __init__(self, keys: Iterable[int] = ()):
+        self._state = (array("q", sorted(keys)), set(), set())
+        self._lock = threading.Lock()
+
+    def __contains__(self, key: int) -> bool:
+        base, added, removed = self._state
+        if key in added:
+            return True
+        if key in removed:
+            return False
+        i = bisect_left(base, key)
+        return i < len(base) and base[i] == key
+
+    def __len__(self) -> int:
+        base, added, removed = self._state
+        return len(base) + len(added) - len(removed)
+
+    def add(self, key: int) -> None:
+        with self._lock:
+            base, added, removed = self._state
+            removed.discard(key)
+            if not self._in_base(base, key):
+                added.add(key)
+            self._maybe_merge()
+
+    def discard(self, key: int) -> None:
+        with self._lock:
+            base, added, removed = self._state
+            added.discard(key)
+            if self._in_base(base, key):
+                removed.add(key)
+            self._maybe_merge()
+
+    @staticmethod
+    def _in_base(base: array, key: int) -> bool:
+        i = bisect_left(base, key)
+        return i < len(base) and base[i] == key
+
+    def _maybe_merge(self) -> None:
+        base, added, removed = self._state
+        # the deltas cost ~60 bytes a key against 8 in the array; merging is O(n), so amortize it
+        if len(added) + len(removed) > max(1024, len(base) // 32):
+            merged = array("q", sorted(added.union(k for k in base if k not in removed)))
+            self._state = (merged, set(), set())
+
+    def nbytes(self) -> int:
+        base, added, removed = self._state
+        return base.itemsize * len(base) + sys.getsizeof(added) + sys.getsizeof(removed) + 32 * (
+            len(added) + len(removed))
+
+
+class BloomFilter:
+    """Scalable Bloom filter: when a layer is full, a new one twice the size with half
+    the false-positive rate is added, so the overall rate stays under fp_rate."""
+
+    def __init__(self, capacity: int, fp_rate: float):
+        self.fp_rate = fp_rate
+        self.layers: List[dict] = []
+        self.count = 0
+        self._lock = threading.Lock()
+        self._add_layer(max(capacity, 1024), fp_rate / 2)
+
+    def _add_layer(self, capacity: int, fp_rate: float) -> None:
+        bits = max(64, int(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        hashes = max(1, round(bits / capacity * math.log(2)))
+        self.layers.append({"bits": bytearray((bits + 7) // 8), "m": bits, "k": hashes, "capacity": capacity,
+                            "fp_rate": fp_rate, "count": 0})
+
+    @staticmethod
+    def _hashes(key: str):
+        # str's own hash (SipHash, cached on the object): the filter never leaves the
+        # process, so its per-process seed does not matter. Two 32-bit halves drive the
+        # k probes (Kirsch-Mitzenmacher double hashing).
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        return h & 0xFFFFFFFF, (h >> 32) | 1
+
+    def __contains__(self, key: str) -> bool:
+        h1, h2 = self._hashes(key)
+        for layer in self.layers:
+            bits, m = layer["bits"], layer["m"]
+            if all(bits[(p := (h1 + i * h2) % m) >> 3] & (1 << (p & 7)) for i in range(layer["k"])):
+                return True
+        return False
+
+    def add(self, key: str) -> None:
+        if key not in self:
+            self.update([key])
+
+    def update(self, keys: Iterable[str]) -> None:
+        """Adds keys known to be new (distinct, not added before): no lookup first."""
+        with self._lock:
+            for key in keys:
+                layer = self.layers[-1]
+                if layer["count"] >= layer["capacity"]:
+                    self._add_layer(layer["capacity"] * 2, layer["fp_rate"] / 2)
+                    layer = self.layers[-1]
+                h1, h2 = self._hashes(key)
+                bits, m = layer["bits"], layer["m"]
+                for i in range(layer["k"]):
+                    p = (h1 + i * h2) % m
+                    bits[p >> 3] |= 1 << (p & 7)
+                layer["count"] += 1
+                self.count += 1
+
+    def expected_fp_rate(self) -> float:
+        """The current chance a key never added is reported present, from the layers' fill."""
+        miss = 1.0
+        for layer in self.layers:
+            miss *= 1 - (1 - math.exp(-layer["k"] * layer["count"] / layer["m"])) ** layer["k"]
+        return 1 - miss
+
+    def nbytes(self) -> int:
+        return sum(len(layer["bits"]) for layer in self.layers)
+
+
+class UniquenessIndex:
+    def __init__(self):
+        self.isbns: Optional[SortedKeys] = None
+        self.emails: Optional[BloomFilter] = None
+        self.rejected = {ISBN_KEY: 0, EMAIL_KEY: 0}
+        self.email_checks = self.false_positives = self.loads = 0
+        self._lock = threading.Lock()
+        self._pending: Optional[list] = None  # keys logged while load() reads the tables
+        self._loader: Optional[threading.Thread] = None
+        self._generation = 0  # bumped by reset(): a load started before it is discarded
+
+    @property
+    def ready(self) -> bool:
+        return self.isbns is not None
+
+    def load(self, db) -> bool:
+        """(Re)builds both structures from the database; `db` is a read Session.
+
+        Keys applied while it reads are replayed on top, so a change committed
+        during the load is not lost whether or not the read saw it. Returns
+        False if reset() was called meanwhile and the result was dropped.
+        """
+        with self._lock:
+            self._pending = []
+            generation = self._generation
+        # uq_books_isbn and ix_authors_email cover these: index-only scans. SQLite does
+        # _isbn_int()'s work, and the rows come off the driver's cursor without Result
+        # rows: about 1 s per million books
+        conn = db.connection()
+        isbns = conn.exec_driver_sql(
+            "SELECT CAST(isbn AS INTEGER) FROM books WHERE length(isbn) = 10 AND isbn NOT GLOB '*[^0-9]*'")
+        isbn_keys = SortedKeys(k for k, in isbns.cursor)
+        emails = [email for email, in conn.exec_driver_sql("SELECT email FROM authors").cursor]
+        bloom = BloomFilter(2 * len(emails), UNIQUE_BLOOM_FP_RATE)
+        bloom.update(emails)  # unique in the table
+        with self._lock:
+            if generation != self._generation:
+                return False
+            # emails first: `ready` checks isbns
+            self.emails, self.isbns = bloom, isbn_keys
+            pending, self._pending = self._pending, None
+            self.loads += 1
+        self.apply(pending)
+        return True
+
+    def load_in_background(self) -> None:
+        """Runs load() on a thread; until it is done every key counts as unknown."""
+        def run() -> None:
+            started = time.perf_counter()
+            try:
+                with database.ReadSessionLocal() as db:
+                    loaded = self.load(db)
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                logger.exception("uniqueness index: load failed, duplicates are left to the constraints")
+                return
+            isbns, emails = self.isbns, self.emails
+            if loaded and isbns is not None and emails is not None:
+                logger.info("uniqueness index: %d ISBNs, %d emails loaded in %.0f ms", len(isbns), emails.count,
+                            (time.perf_counter() - started) * 1000)
+        self._loader = threading.Thread(target=run, name="unique-index-load", daemon=True)
+        self._loader.start()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Waits for a load_in_background() in progress; returns whether the index is ready."""
+        if self._loader is not None:
+            self._loader.join(timeout)
+        return self.ready
+
+    def reload(self) -> None:
+        """Drops the index and loads it again (after the invalidation log was pruned past
+        this process: the changes in between are unknown)."""
+        if self.ready:
+            self.isbns = self.emails = None
+            self.load_in_background()
+
+    def reset(self) -> None:
+        """Drops the index and discards a load in progress (the process now serves another database)."""
+        with self._lock:
+            self.isbns = self.emails = self._pending = None
+            self._generation += 1
+
+    # reload() and reset() can drop the structures at any time: each method reads them once
+
+    def isbn_taken(self, isbn: str) -> Optional[bool]:
+        """True/False if known, None if the index cannot tell (not loaded)."""
+        isbns, key = self.isbns, _isbn_int(isbn)
+        return None if isbns is None or key is None else key in isbns
+
+    def email_maybe_taken(self, email: str) -> Optional[bool]:
+        """False if certainly free, True if the filter has it (may be a false positive), None if not loaded."""
+        emails = self.emails
+        return None if emails is None else email in emails
+
+    def apply(self, keys: Iterable[list]) -> None:
+        """Applies ("books.isbn" | "authors.email", value, taken) keys from the invalidation log, in order."""
+        if self._pending is not None:
+            with self._lock:
+                if self._pending is not None:
+                    self._pending.extend(keys)
+                    return
+        isbns, emails = self.isbns, self.emails
+        if isbns is None or emails is None:
+            return
+        for space, value, taken in keys:
+            if space == ISBN_KEY:
+                key = _isbn_int(value)
+                if key is None:
+                    continue
+                if taken:
+                    isbns.add(key)
+                else:
+                    isbns.discard(key)
+            elif space == EMAIL_KEY and taken:
+                emails.add(value)
+
+    def add_isbns(self, isbns: Iterable[str]) -> None:
+        self.apply([ISBN_KEY, isbn, True] for isbn in isbns)
+
+    def add_emails(self, emails: Iterable[str]) -> None:
+        self.apply([EMAIL_KEY, email, True] for email in emails)
+
+    def stats(self) -> dict:
+        isbns, emails = self.isbns, self.emails
+        if isbns is None or emails is None:
+            return {"loaded": False}
+        checks = self.email_checks
+        return {
+            "loaded": True,
+            "isbn_keys": len(isbns), "isbn_bytes": isbns.nbytes(),
+            "email_keys": emails.count, "email_bytes": emails.nbytes(),
+            "email_layers": len(emails.layers),
+            "email_fp_rate_expected": emails.expected_fp_rate(),
+            # of the emails the filter reported taken, the share the database did not have
+            "email_fp_rate_observed": self.false_positives / checks if checks else 0.0,
+            "email_checks": checks, "false_positives": self.false_positives,
+            "rejected_isbn": self.rejected[ISBN_KEY], "rejected_email": self.rejected[EMAIL_KEY],
+        }
+
+
+unique_index = UniquenessIndex()
+
+
+def keys(space: str, taken: Iterable[str] = (), freed: Iterable[str] = ()) -> List[list]:
+    """Invalidation log keys for unique values a write took or freed."""
+    return [[space, v, True] for v in taken] + [[space, v, False] for v in freed]
+
+
+def is_unique_key(key) -> bool:
+    return len(key) == 3 and key[0] in (ISBN_KEY, EMAIL_KEY)
+
+
+# used by the create endpoints
+
+def isbn_duplicate(isbn: str) -> bool:
+    """True if `isbn` is certainly taken: the caller answers 409 without a write."""
+    if unique_index.isbn_taken(isbn):
+        unique_index.rejected[ISBN_KEY] += 1
+        return True
+    return False
+
+
+def _email_in_db(email: str) -> bool:
+    with database.ReadSessionLocal() as db:
+        return db.execute(text("SELECT 1 FROM authors WHERE email = :email"), {"email": email}).first() is not None
+
+
+async def email_duplicate(email: str) -> bool:
+    """True if `email` is certainly taken; a filter hit is checked against the read pool first."""
+    if not unique_index.email_maybe_taken(email):
+        return False
+    unique_index.email_checks += 1
+    if await run_in_threadpool(_email_in_db, email):
+        unique_index.rejected[EMAIL_KEY] += 1
+        return True
+    unique_index.false_positives += 1
+    return False
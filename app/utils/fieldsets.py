@@ -0,0 +1,15 @@
+from typing import Optional, Sequence
+
+
+class InvalidFieldsError(ValueError):
+    """Raised when fields= names a column the resource does not have."""
+
+
+def parse_fields(raw: Optional[str], allowed: Sequence[str]) -> Optional[list[str]]:
+    """"title,isbn" -> ["title", "isbn"]; None/empty -> None (all fields)."""
+    fields = list(dict.fromkeys(f.strip() for f in (raw or "").split(",") if f.strip()))
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        raise InvalidFieldsError(f"Unknown field(s): {', '.join(unknown)}. Allowed: {', '.join(allowed)}.")
+    return fields or None
+
@@ -0,0 +1,26 @@
+import base64
+import json
+from typing import Any
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a client sends a cursor we did not issue (or for another sort)."""
+
+
+def encode_cursor(sort: str, order: str, value: Any, last_id: int) -> str:
+    payload = json.dumps({"s": sort, "o": order, "v": value, "id": last_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str, order: str) -> tuple[Any, int]:
+    """Returns (sort_value, last_id) or raises InvalidCursorError."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        value, last_id = payload["v"], int(payload["id"])
+        issued_for = (payload["s"], payload["o"])
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursorError("Invalid cursor.")
+    if issued_for != (sort, order):
+        raise InvalidCursorError("Cursor does not match the requested sort/order.")
+    return value, last_id
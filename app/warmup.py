@@ -0,0 +1,118 @@
+"""
+Startup work, run by main.create_app's lifespan before the first request.
+
+start() builds the engines the app serves from, applies the cache
+invalidation log once (reading the ETag epoch), work the first request
+would otherwise pay for, and starts loading the ISBN/email index in the
+background (app/uniqueness.py, unless UNIQUE_INDEX=0). With PREWARM=1 it then
+also prewarms:
+
+    pools       opens DB_READ_POOL_SIZE read connections and the writer's one,
+                so no request waits on a connect and its PRAGMAs
+    queries     runs the common crud reads once: SQLAlchemy compiles and caches
+                each statement, SQLite reads the schema and the index roots, and
+                the unfiltered totals the default list pages show are counted
+                into the count cache; a book and an author go through the
+                detail pages' response schemas
+    validators  validates sample payloads through the request schemas, and
+                builds the OpenAPI schema for /docs
+    index       waits for the ISBN/email index load to finish
+
+The queries stop at a LIMIT or look up one key, except those two counts,
+which walk the smallest index of books and of authors once - work the first
+list request would otherwise do while a client waits.
+"""
+import logging
+import time
+from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
+
+from app import crud, schemas, stats, uniqueness
+from app import db as database
+from app.invalidation import invalidation_log
+
+logger = logging.getLogger("app")
+
+
+def _open_pool(engine, size: int) -> None:
+    conns = [engine.connect() for _ in range(size)]
+    for conn in conns:
+        conn.close()
+
+
+def _run_queries(db) -> None:
+    """The reads behind the list, detail and stats pages, and the detail pages' serialization."""
+    books, _ = crud.list_books_paginated(db, None, None, None, None, "asc", 20, 0, include="author")
+    crud.books_total(db, None, None, None)
+    authors, _ = crud.list_authors_paginated(db, None, None, "desc", 20, 0)
+    crud.authors_total(db, None)
+    book = crud.get_book_by_id(db, books[0].id if books else 0, with_author=True)
+    author = crud.get_author_by_id(db, authors[0][0].id if authors else 0, with_books=True)
+    crud.get_books_by_ids(db, [0])
+    crud.get_authors_by_ids(db, [0])
+    stats.totals(db)
+    # while the session is open: the relationships may load lazily
+    if book is not None:
+        schemas.BookWithAuthor.model_validate(book).model_dump(mode="json")
+    if author is not None:
+        schemas.AuthorWithBooks.model_validate(author).model_dump(mode="json")
+
+
+def _build_validators(app: FastAPI) -> None:
+    schemas.BookCreate.model_validate({"title": "Warm", "isbn": "0000000000", "author_id": 1})
+    schemas.BookUpdate.model_validate({"published_year": 2000})
+    schemas.AuthorCreate.model_validate({"name": "Warm", "email": "warm@example.com"})
+    app.openapi()
+
+
+async def prewarm(app: FastAPI) -> dict:
+    """Runs the prewarm steps; returns each one's duration in ms."""
+    db, timings = database.database, {}
+    started = time.perf_counter()
+
+    def lap(name: str) -> None:
+        nonlocal started
+        now = time.perf_counter()
+        timings[name] = (now - started) * 1000
+        started = now
+
+    async_engine = db.async_engine
+    if async_engine is not None:
+        conns = [await async_engine.connect() for _ in range(db.settings.read_pool_size)]
+        for conn in conns:
+            await conn.close()
+    else:
+        await run_in_threadpool(_open_pool, db.read_engine, db.settings.read_pool_size)
+    await run_in_threadpool(_open_pool, db.write_engine, 1)
+    lap("pools")
+    if async_engine is not None:
+        async with db.AsyncSessionLocal() as session:
+            await session.run_sync(_run_queries)
+    else:
+        def queries() -> None:
+            with db.ReadSessionLocal() as session:
+                _run_queries(session)
+        await run_in_threadpool(queries)
+    lap("queries")
+    _build_validators(app)
+    lap("validators")
+    if uniqueness.UNIQUE_INDEX:
+        await run_in_threadpool(uniqueness.unique_index.wait)
+        lap("index")
+    return timings
+
+
+async def start(app: FastAPI) -> dict:
+    """Startup: engines, the invalidation log and the uniqueness index load, then prewarm() if enabled;
+    returns timings in ms."""
+    db = database.database
+    started = time.perf_counter()
+    db.build()
+    await run_in_threadpool(invalidation_log.sync)
+    timings = {"engines": (time.perf_counter() - started) * 1000}
+    if uniqueness.UNIQUE_INDEX:
+        uniqueness.unique_index.load_in_background()
+    if db.settings.prewarm:
+        timings.update(await prewarm(app))
+    logger.info("startup: %s", ", ".join(f"{name} {ms:.1f} ms" for name, ms in timings.items()))
+    return timings
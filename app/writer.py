@@ -0,0 +1,135 @@
+"""
+Single-writer group-commit queue for POST/PUT traffic.
+
+SQLite allows one writer at a time and every commit is an fsync. Instead of
+each request committing on its own connection (and fighting over the database
+lock), writes are submitted here and executed by one dedicated thread. Writes
+that arrive within WRITE_BATCH_WAIT_MS of each other (up to WRITE_BATCH_MAX)
+share a single transaction:
+
+    BEGIN IMMEDIATE
+      SAVEPOINT / job 1 / RELEASE
+      SAVEPOINT / job 2 / ROLLBACK TO   <- e.g. duplicate ISBN, only job 2 fails
+      ...
+    COMMIT                              <- one fsync for the whole batch
+
+Every caller gets its own result or exception back through a Future.
+"""
+import asyncio
+import contextvars
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable
+
+from app import db as database
+
+WRITE_BATCH_MAX = int(os.getenv("WRITE_BATCH_MAX", "64"))
+WRITE_BATCH_WAIT_MS = float(os.getenv("WRITE_BATCH_WAIT_MS", "2"))
+
+_STOP = object()
+
+
+class WriteQueue:
+    def __init__(self, session_factory=None, max_batch: int = WRITE_BATCH_MAX,
+                 max_wait_ms: float = WRITE_BATCH_WAIT_MS):
+        self.session_factory = session_factory
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue: queue.Queue = queue.Queue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self.batches = self.jobs = self.failed = self.largest_batch = 0
+
+    def submit(self, fn: Callable, *args) -> Future:
+        """Queues fn(session, *args, commit=False); the writer commits the batch.
+
+        fn is a crud write function: it must flush but not commit. It runs in a
+        copy of the caller's context, so its SQL is counted against the request.
+        """
+        self._ensure_started()
+        future: Future = Future()
+        self._queue.put((fn, args, future, contextvars.copy_context()))
+        return future
+
+    async def run(self, fn: Callable, *args):
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="db-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def stats(self) -> dict:
+        return {"queued": self._queue.qsize(), "batches": self.batches, "jobs": self.jobs,
+                "failed": self.failed, "largest_batch": self.largest_batch}
+
+    def _loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    self._queue.put(_STOP)  # finish this batch, stop on the next get()
+                    break
+                batch.append(item)
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: list) -> None:
+        self.batches += 1
+        self.jobs += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        done = []
+        # default: the writer engine of the current database, built on first use
+        factory = self.session_factory or database.WriteSessionLocal
+        with factory() as db:
+            try:
+                for fn, args, future, ctx in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    hooks = len(db.info.get("on_commit", ()))
+                    savepoint = db.begin_nested()
+                    try:
+                        result = ctx.run(fn, db, *args, commit=False)
+                        savepoint.commit()
+                    except Exception as e:
+                        savepoint.rollback()
+                        # drop the post-commit hooks the failed job queued
+                        del db.info.setdefault("on_commit", [])[hooks:]
+                        self.failed += 1
+                        future.set_exception(e)
+                    else:
+                        done.append((future, result))
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                for _, _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                        self.failed += 1
+                return
+        for future, result in done:
+            future.set_result(result)
+
+
+write_queue = WriteQueue()
@@ -1,19 +1,22 @@
+from contextlib import asynccontextmanager
+from typing import Optional
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 import logging
 import time
 
+from app import admission, compression, metrics, uniqueness, warmup
+from app import db as database
+from app.cache import count_cache, entity_cache, table_versions
+from app.compression import compressed_cache
+from app.invalidation import invalidation_log
+from app.settings import Settings
+from app.writer import write_queue
 from app.routers import authors as authors_router
 from app.routers import books as books_router
-
-#app
-app = FastAPI(
-    title="Library Management API",
-    version="1.0.0",
-    description="RESTful API for managing authors and books (YIPL Internship Task).",
-)
+from app.routers import stats as stats_router
 
 #  Logging 
 logger = logging.getLogger("app")
@@ -22,31 +25,141 @@ logging.basicConfig(
     format="%(asctime)s %(levelname)s %(name)s: %(message)s",
 )
 
-@app.middleware("http")
+# gzip / br / zstd by Accept-Encoding, with hot pages served from a cache of compressed
+# responses (app/compression.py). Registered first, so it runs inside log_requests: the
+# handler's 304 to its revalidation is logged and counted as the 200 the client gets.
+async def compress_responses(request: Request, call_next):
+    return await compression.compress(request, call_next)
+
+# Admission control: per-class concurrency limits, a bounded wait queue and
+# 503 / 429 when over capacity (app/admission.py). Registered before log_requests
+# so it runs inside it, and log_requests logs and counts the rejected requests too.
+async def admission_control(request: Request, call_next):
+    return await admission.admit(request, call_next)
+
 async def log_requests(request: Request, call_next):
+    # apply cache invalidations committed by other worker processes
+    invalidation_log.sync()
+    stats = metrics.RequestStats(metrics.route_template(request))
+    token = metrics.current_request.set(stats)
+    labels = (request.method, stats.route)
+    metrics.requests_in_flight.inc(labels)
     start = time.perf_counter()
-    response = await call_next(request)
-    duration_ms = (time.perf_counter() - start) * 1000
-    logger.info("%s %s -> %s (%.1f ms)",
-                request.method, request.url.path, response.status_code, duration_ms)
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        duration = time.perf_counter() - start
+        metrics.requests_in_flight.dec(labels)
+        metrics.observe_request(request.method, stats, status_code, duration)
+        metrics.current_request.reset(token)
+    logger.info("%s %s -> %s (%.1f ms, %d queries, %.1f ms SQL)",
+                request.method, request.url.path, status_code, duration * 1000, stats.queries, stats.db_time * 1000)
     return response
 
 # Unified Error Handlers
-@app.exception_handler(StarletteHTTPException)
 async def http_exc_handler(_: Request, exc: StarletteHTTPException):
     # Ensures errors raised via fastapi.HTTPException become {"error": "..."}
     return JSONResponse(status_code=exc.status_code, content={"error": exc.detail})
 
-@app.exception_handler(RequestValidationError)
 async def validation_exc_handler(_: Request, exc: RequestValidationError):
     details = [{"loc": e.get("loc"), "msg": e.get("msg")} for e in exc.errors()]
     return JSONResponse(status_code=400, content={"error": "Validation failed.", "details": details})
 
 # Health
-@app.get("/health")
 def health_check():
     return {"status": "ok"}
 
-# Routers
-app.include_router(authors_router.router)
-app.include_router(books_router.router)
+# Metrics (Prometheus text format)
+def get_metrics():
+    cache, writer, log = entity_cache.stats(), write_queue.stats(), invalidation_log.stats()
+    compressed, unique = compressed_cache.stats(), uniqueness.unique_index.stats()
+    extra = [
+        ("entity_cache_entries", "gauge", "Cached detail responses.", cache["size"]),
+        ("entity_cache_hits_total", "counter", "Detail cache hits.", cache["hits"]),
+        ("entity_cache_misses_total", "counter", "Detail cache misses.", cache["misses"]),
+        ("write_queue_depth", "gauge", "Writes waiting for the writer thread.", writer["queued"]),
+        ("write_queue_batches_total", "counter", "Write transactions committed.", writer["batches"]),
+        ("write_queue_jobs_total", "counter", "Writes executed.", writer["jobs"]),
+        ("cache_invalidation_seq", "gauge", "Last invalidation log entry applied.", log["seq"]),
+        ("cache_invalidation_resets_total", "counter", "Caches dropped after falling behind the log.",
+         log["resets"]),
+        ("compressed_cache_entries", "gauge", "Cached compressed response bodies.", compressed["entries"]),
+        ("compressed_cache_bytes", "gauge", "Size of the cached compressed bodies.", compressed["bytes"]),
+        ("compressed_cache_hits_total", "counter", "Responses served precompressed.", compressed["hits"]),
+        ("compressed_cache_misses_total", "counter", "Cacheable responses compressed anew.", compressed["misses"]),
+    ]
+    if unique["loaded"]:
+        extra += [
+            ("unique_index_isbn_keys", "gauge", "ISBNs in the uniqueness index.", unique["isbn_keys"]),
+            ("unique_index_isbn_bytes", "gauge", "Memory used by the ISBN index.", unique["isbn_bytes"]),
+            ("unique_index_email_keys", "gauge", "Emails in the Bloom filter.", unique["email_keys"]),
+            ("unique_index_email_bytes", "gauge", "Memory used by the email Bloom filter.", unique["email_bytes"]),
+            ("unique_index_email_fp_rate", "gauge", "Expected false-positive rate of the email Bloom filter.",
+             unique["email_fp_rate_expected"]),
+            ("unique_index_email_checks_total", "counter", "Bloom filter hits checked against the database.",
+             unique["email_checks"]),
+            ("unique_index_false_positives_total", "counter", "Bloom filter hits the database did not have.",
+             unique["false_positives"]),
+            ("unique_index_rejected_total", "counter", "Duplicate creates rejected without a write.",
+             unique["rejected_isbn"] + unique["rejected_email"]),
+        ]
+    return PlainTextResponse(metrics.render(extra), media_type="text/plain; version=0.0.4")
+
+def reset_state() -> None:
+    """Drops what the process holds about the database it served: queued writes are
+    committed to it, then the invalidation log, caches and uniqueness index start over."""
+    write_queue.stop()
+    invalidation_log.close()
+    table_versions.reset(0)
+    count_cache.clear()
+    entity_cache.clear()
+    compressed_cache.clear()
+    uniqueness.unique_index.reset()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # engines, the invalidation log and (PREWARM=1) warm pools and caches, before the first request
+    await warmup.start(app)
+    yield
+    write_queue.stop()
+    await database.database.aclose()
+
+def create_app(settings: Optional[Settings] = None) -> FastAPI:
+    """Builds the app for `settings` (default: from the environment, see app/settings.py).
+
+    Nothing touches the database here: engines are created by the lifespan at
+    startup, or on first use when the app runs without one (TestClient outside
+    a with block).
+
+    The engines, caches and invalidation log are process-wide: a process
+    serves one database at a time. When `settings` point at another one,
+    that state is reset (reset_state()) and apps built earlier serve the new
+    database too.
+    """
+    previous = database.database
+    if database.configure(settings or Settings.from_env()) is not previous:
+        logger.warning("create_app: now serving %s; caches reset", database.DATABASE_PATH)
+        reset_state()
+    app = FastAPI(
+        title="Library Management API",
+        version="1.0.0",
+        description="RESTful API for managing authors and books (YIPL Internship Task).",
+        lifespan=lifespan,
+    )
+    # the last one added is the outermost
+    app.middleware("http")(compress_responses)
+    app.middleware("http")(admission_control)
+    app.middleware("http")(log_requests)
+    app.add_exception_handler(StarletteHTTPException, http_exc_handler)
+    app.add_exception_handler(RequestValidationError, validation_exc_handler)
+    app.get("/health")(health_check)
+    app.get("/metrics", include_in_schema=False)(get_metrics)
+    app.include_router(authors_router.router)
+    app.include_router(books_router.router)
+    app.include_router(stats_router.router)
+    return app
+
+# for `uvicorn main:app`, scripts/serve.py and the tests
+app = create_app()
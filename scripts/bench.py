@@ -0,0 +1,312 @@
+"""
+Benchmark harness: drives every API route in-process (httpx ASGITransport, no
+network or server) against the configured database and reports throughput
+and p50/p95/p99 latency per scenario.
+
+Results are written as JSON so runs can be compared. Pass --baseline to flag
+regressions against a stored run (exit code 1 if any), and --save-baseline to
+store this run as the new baseline.
+
+Usage:
+    python -m scripts.migrate && python -m scripts.generate_data --authors 100000 --books 1000000
+    python -m scripts.bench [--requests 200] [--concurrency 8] [--only books.] \\
+                            [--baseline bench/baseline.json] [--save-baseline]
+
+DB_MODE is honoured as in the app. Write scenarios add rows to the database.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Callable, Optional
+
+import httpx
+from fastapi.routing import APIRoute
+from sqlalchemy import func, select
+
+from app.db import DB_MODE, SessionLocal
+from app.models import Author, Book
+from app import uniqueness
+from app.writer import write_queue
+from main import app
+from scripts.generate_data import TITLE_WORDS
+
+RESULTS_DIR = os.path.join("bench", "results")
+DEFAULT_BASELINE = os.path.join("bench", "baseline.json")
+
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    route: str  # route template it exercises, for the coverage check
+    request: Callable[["Context"], tuple]  # ctx -> (path, params, json_body)
+    follow_cursor: bool = False  # walk pages: the next request uses the previous next_cursor
+    allowed: tuple = (404,)  # error statuses that are the expected answer, not errors
+
+
+@dataclass
+class Context:
+    rng: random.Random
+    max_author_id: int
+    max_book_id: int
+    cursor: dict = field(default_factory=dict)  # worker -> next_cursor
+    taken_isbns: list = field(default_factory=list)  # existing values, for the duplicate creates
+    taken_emails: list = field(default_factory=list)
+
+    def book_id(self) -> int:
+        return self.rng.randint(1, self.max_book_id)
+
+    def author_id(self) -> int:
+        return self.rng.randint(1, self.max_author_id)
+
+    def word(self) -> str:
+        return self.rng.choice(TITLE_WORDS[3:])  # skip stopwords
+
+    def year(self) -> int:
+        return self.rng.choice([1935, 1975, 2005, 2018])
+
+    def isbn(self) -> str:
+        return f"{self.rng.randrange(10 ** 10):010d}"
+
+    def email(self) -> str:
+        return f"bench.{self.rng.getrandbits(64):x}@example.com"
+
+    def taken_isbn(self) -> str:
+        return self.rng.choice(self.taken_isbns)
+
+    def taken_email(self) -> str:
+        return self.rng.choice(self.taken_emails)
+
+    def new_book(self) -> dict:
+        return {"title": f"Bench {self.word()}", "isbn": self.isbn(), "published_year": self.year(),
+                "author_id": self.author_id()}
+
+
+SCENARIOS = [
+    Scenario("health", "GET", "/health", lambda c: ("/health", {}, None)),
+    Scenario("metrics", "GET", "/metrics", lambda c: ("/metrics", {}, None)),
+    # books: reads
+    Scenario("books.list", "GET", "/books/", lambda c: ("/books/", {"limit": 20}, None)),
+    Scenario("books.list.total_none", "GET", "/books/", lambda c: ("/books/", {"limit": 20, "total": "none"}, None)),
+    Scenario("books.list.total_estimate", "GET", "/books/",
+             lambda c: ("/books/", {"limit": 20, "total": "estimate"}, None)),
+    Scenario("books.list.deep_offset", "GET", "/books/",
+             lambda c: ("/books/", {"limit": 20, "offset": c.max_book_id // 2, "total": "none"}, None)),
+    Scenario("books.list.cursor_walk", "GET", "/books/",
+             lambda c: ("/books/", {"limit": 100, "sort": "title", "total": "none"}, None), follow_cursor=True),
+    Scenario("books.list.sort_year_desc", "GET", "/books/",
+             lambda c: ("/books/", {"limit": 20, "sort": "published_year", "order": "desc"}, None)),
+    Scenario("books.list.filter_year", "GET", "/books/", lambda c: ("/books/", {"limit": 20, "year": c.year()}, None)),
+    Scenario("books.list.title_substring", "GET", "/books/",
+             lambda c: ("/books/", {"limit": 20, "title": c.word()}, None)),
+    Scenario("books.list.title_fts", "GET", "/books/",
+             lambda c: ("/books/", {"limit": 20, "title": c.word(), "match": "fts"}, None)),
+    Scenario("books.list.fts_relevance", "GET", "/books/",
+             lambda c: ("/books/", {"limit": 20, "title": f"{c.word()} {c.word()}", "match": "fts",
+                                    "sort": "relevance"}, None)),
+    Scenario("books.list.include_author", "GET", "/books/",
+             lambda c: ("/books/", {"limit": 100, "include": "author", "total": "none"}, None)),
+    Scenario("books.list.fields", "GET", "/books/",
+             lambda c: ("/books/", {"limit": 100, "fields": "id,title", "total": "none"}, None)),
+    Scenario("books.detail", "GET", "/books/{book_id}", lambda c: (f"/books/{c.book_id()}", {}, None)),
+    Scenario("books.batch_get", "POST", "/books/batch-get",
+             lambda c: ("/books/batch-get", {}, {"ids": [c.book_id() for _ in range(100)]})),
+    Scenario("books.export", "GET", "/books/export",
+             lambda c: ("/books/export", {"title": f"{c.word()} {c.word()} {c.word()}", "match": "fts"}, None)),
+    # books: writes
+    Scenario("books.create", "POST", "/books/", lambda c: ("/books/", {}, c.new_book())),
+    # the ISBN is taken: 409 (app/uniqueness.py rejects it before the write queue)
+    Scenario("books.create.duplicate", "POST", "/books/",
+             lambda c: ("/books/", {}, {**c.new_book(), "isbn": c.taken_isbn()}), allowed=(409,)),
+    Scenario("books.update", "PUT", "/books/{book_id}",
+             lambda c: (f"/books/{c.book_id()}", {}, {"published_year": c.year()})),
+    Scenario("books.patch", "PATCH", "/books/{book_id}",
+             lambda c: (f"/books/{c.book_id()}", {}, {"published_year": c.year()})),
+    Scenario("books.bulk", "POST", "/books/bulk",
+             lambda c: ("/books/bulk", {}, [c.new_book() for _ in range(100)])),
+    # authors
+    Scenario("authors.list", "GET", "/authors/", lambda c: ("/authors/", {"limit": 20}, None)),
+    Scenario("authors.list.cursor_walk", "GET", "/authors/",
+             lambda c: ("/authors/", {"limit": 100, "total": "none"}, None), follow_cursor=True),
+    Scenario("authors.list.name_fts", "GET", "/authors/",
+             lambda c: ("/authors/", {"limit": 20, "name": "smith", "match": "fts"}, None)),
+    Scenario("authors.list.include_books", "GET", "/authors/",
+             lambda c: ("/authors/", {"limit": 20, "sort": "id", "include": "books", "total": "none"}, None)),
+    Scenario("authors.detail", "GET", "/authors/{author_id}", lambda c: (f"/authors/{c.author_id()}", {}, None)),
+    Scenario("authors.batch_get", "POST", "/authors/batch-get",
+             lambda c: ("/authors/batch-get", {}, {"ids": [c.author_id() for _ in range(50)]})),
+    Scenario("authors.export", "GET", "/authors/export",
+             lambda c: ("/authors/export", {"name": "tanaka priya", "match": "fts"}, None)),
+    Scenario("authors.create", "POST", "/authors/",
+             lambda c: ("/authors/", {}, {"name": "Bench Author", "email": c.email()})),
+    Scenario("authors.create.duplicate", "POST", "/authors/",
+             lambda c: ("/authors/", {}, {"name": "Bench Author", "email": c.taken_email()}), allowed=(409,)),
+    Scenario("authors.bulk", "POST", "/authors/bulk",
+             lambda c: ("/authors/bulk", {}, [{"name": "Bench Author", "email": c.email()} for _ in range(100)])),
+    # stats (summary tables: should not slow down as the catalog grows)
+    Scenario("stats.totals", "GET", "/stats/", lambda c: ("/stats/", {}, None)),
+    Scenario("stats.years", "GET", "/stats/years", lambda c: ("/stats/years", {}, None)),
+    Scenario("stats.decades", "GET", "/stats/decades", lambda c: ("/stats/decades", {}, None)),
+    Scenario("stats.authors", "GET", "/stats/authors", lambda c: ("/stats/authors", {"limit": 20}, None)),
+]
+
+
+def _percentile(sorted_values: list, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+async def _run_scenario(client: httpx.AsyncClient, s: Scenario, ctx: Context, requests: int,
+                        concurrency: int) -> dict:
+    latencies, errors = [], 0
+    remaining = requests
+
+    async def worker(n: int):
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            path, params, body = s.request(ctx)
+            if s.follow_cursor and ctx.cursor.get(n):
+                params = {**params, "cursor": ctx.cursor[n]}
+            started = time.perf_counter()
+            r = await client.request(s.method, path, params=params, json=body)
+            latencies.append(time.perf_counter() - started)
+            if r.status_code >= 400 and r.status_code not in s.allowed:
+                errors += 1
+            if s.follow_cursor and r.status_code == 200:
+                ctx.cursor[n] = r.json().get("next_cursor")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(n) for n in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3),
+        "p50_ms": round(_percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(_percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+def uncovered_routes() -> list:
+    covered = {(s.method, s.route) for s in SCENARIOS}
+    return sorted(f"{m} {r.path}" for r in app.routes if isinstance(r, APIRoute) and r.include_in_schema
+                  for m in r.methods if (m, r.path) not in covered)
+
+
+def compare(current: dict, baseline: dict, tolerance: float = 0.2, min_delta_ms: float = 1.0) -> list:
+    """Regressions of `current` against `baseline`: p95 up or throughput down by more than tolerance.
+
+    Latency changes smaller than min_delta_ms are ignored (noise on sub-millisecond routes).
+    """
+    regressions = []
+    for name, cur in current["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        if cur["p95_ms"] > base["p95_ms"] * (1 + tolerance) and cur["p95_ms"] - base["p95_ms"] >= min_delta_ms:
+            regressions.append(f"{name}: p95 {base['p95_ms']:.2f} -> {cur['p95_ms']:.2f} ms")
+        if cur["rps"] < base["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {base['rps']:.0f} -> {cur['rps']:.0f} req/s")
+        if cur["errors"] > base["errors"]:
+            regressions.append(f"{name}: errors {base['errors']} -> {cur['errors']}")
+    return regressions
+
+
+async def run(requests: int, concurrency: int, only: Optional[str], seed: int) -> dict:
+    with SessionLocal() as db:
+        counts = {"authors": db.scalar(select(func.count(Author.id))), "books": db.scalar(select(func.count(Book.id)))}
+        max_author = db.scalar(select(func.max(Author.id))) or 1
+        max_book = db.scalar(select(func.max(Book.id))) or 1
+        ctx = Context(random.Random(seed), max_author, max_book)
+        ids = [ctx.book_id() for _ in range(1000)]
+        ctx.taken_isbns = list(db.scalars(select(Book.isbn).where(Book.id.in_(ids)))) or ["0000000000"]
+        ids = [ctx.author_id() for _ in range(1000)]
+        ctx.taken_emails = list(db.scalars(select(Author.email).where(Author.id.in_(ids)))) or ["none@example.com"]
+    scenarios = [s for s in SCENARIOS if not only or s.name.startswith(only)]
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    # the app's startup (main.lifespan), which ASGITransport does not run
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        uniqueness.unique_index.wait()  # measure with the index loaded, not while it loads
+        for s in scenarios:
+            ctx.cursor.clear()
+            results[s.name] = await _run_scenario(client, s, ctx, requests, concurrency)
+            r = results[s.name]
+            print(f"{s.name:<30} {r['rps']:>9.1f} req/s  p50 {r['p50_ms']:>8.2f}  p95 {r['p95_ms']:>8.2f}  "
+                  f"p99 {r['p99_ms']:>8.2f} ms" + (f"  errors {r['errors']}" if r["errors"] else ""))
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "db_mode": DB_MODE,
+            "rows": counts,
+            "requests": requests,
+            "concurrency": concurrency,
+            "seed": seed,
+        },
+        "scenarios": results,
+    }
+
+
+def _write(path: str, data: dict) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--only", help="run scenarios whose name starts with this prefix")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help=f"results file (default: {RESULTS_DIR}/<timestamp>.json)")
+    parser.add_argument("--baseline", help="compare against this results file")
+    parser.add_argument("--save-baseline", action="store_true", help=f"also write results to --baseline "
+                                                                      f"(default {DEFAULT_BASELINE})")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown (default 0.2)")
+    args = parser.parse_args()
+
+    for route in uncovered_routes():
+        print(f"warning: no scenario covers {route}", file=sys.stderr)
+    try:
+        results = asyncio.run(run(args.requests, args.concurrency, args.only, args.seed))
+    finally:
+        write_queue.stop()
+
+    out = args.out or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    _write(out, results)
+    print(f"results: {out}")
+
+    baseline_path = args.baseline or DEFAULT_BASELINE
+    if args.save_baseline:
+        _write(baseline_path, results)
+        print(f"baseline saved: {baseline_path}")
+    elif args.baseline:
+        with open(baseline_path) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print("no regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Microbenchmark: rendering a 100-row list page through response_model
+validation (the old path) vs app/serialization.py (the current path).
+
+The old path is what FastAPI does for a route that returns a dict with a
+response_model: validate with from_attributes, dump in JSON mode, json.dumps.
+Rows are in-memory ORM objects, so no database is needed.
+
+Usage:
+    python -m scripts.bench_serialization [--rows 100] [--repeat 2000]
+"""
+import argparse
+import json
+import timeit
+from datetime import datetime
+
+from pydantic import TypeAdapter
+
+from app import crud, schemas
+from app.models import Author, Book
+from app.serialization import page_response, to_dicts
+
+
+def _books(n: int) -> list:
+    return [Book(id=i, title=f"Book number {i}", isbn=f"{i:010d}", published_year=1900 + i % 120,
+                 author_id=i % 50 + 1, created_at=datetime(2025, 1, 1, 12, 0, i % 60, i)) for i in range(1, n + 1)]
+
+
+def _authors(n: int) -> list:
+    return [(Author(id=i, name=f"Author {i}", email=f"author{i}@example.com", book_count=i % 7,
+                    created_at=datetime(2025, 1, 1, 12, 0, i % 60, i)), i % 7) for i in range(1, n + 1)]
+
+
+def _render_json(content) -> bytes:
+    # starlette JSONResponse.render
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+BOOKS_PAGE = TypeAdapter(schemas.PaginatedBooks)
+AUTHORS_PAGE = TypeAdapter(schemas.PaginatedAuthors)
+
+
+def old_books(items: list) -> bytes:
+    payload = {"data": items, "total": 1000, "limit": len(items), "offset": 0, "next_cursor": None}
+    value = BOOKS_PAGE.validate_python(payload, from_attributes=True)
+    return _render_json(BOOKS_PAGE.dump_python(value, mode="json"))
+
+
+def new_books(items: list) -> bytes:
+    return page_response(to_dicts(items, crud.BOOK_FIELDS), 1000, len(items), 0, None).body
+
+
+def old_authors(rows: list) -> bytes:
+    data = [schemas.AuthorOut(id=a.id, name=a.name, email=a.email, created_at=a.created_at, book_count=bc or 0)
+            for a, bc in rows]
+    payload = {"data": data, "total": 1000, "limit": len(rows), "offset": 0, "next_cursor": None}
+    value = AUTHORS_PAGE.validate_python(payload, from_attributes=True)
+    return _render_json(AUTHORS_PAGE.dump_python(value, mode="json"))
+
+
+def new_authors(rows: list) -> bytes:
+    return page_response(to_dicts([a for a, _ in rows], crud.AUTHOR_FIELDS), 1000, len(rows), 0, None).body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    cases = [("GET /books", old_books, new_books, _books(args.rows)),
+             ("GET /authors", old_authors, new_authors, _authors(args.rows))]
+    for name, old, new, rows in cases:
+        assert old(rows) == new(rows), f"{name}: outputs differ"
+        t_old = min(timeit.repeat(lambda: old(rows), number=args.repeat, repeat=3)) / args.repeat
+        t_new = min(timeit.repeat(lambda: new(rows), number=args.repeat, repeat=3)) / args.repeat
+        print(f"{name:<14} {args.rows} rows: response_model {t_old * 1e6:8.1f} us   "
+              f"fast path {t_new * 1e6:8.1f} us   x{t_old / t_new:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Cold start: how long a fresh process takes to import the app, start it, and
+answer its first requests, with and without PREWARM.
+
+Each run is a new Python process (nothing cached in the interpreter) against
+the database at DATABASE_PATH (default ./app.db), timing:
+
+    import     `import main`: modules, routers, create_app() - no database work
+    startup    the lifespan: engines, the invalidation log, PREWARM's pools/queries
+    first      the first GET /books/?limit=20 after startup
+    detail     the first GET /books/{id} after that
+    second     the same list request again, for the warm figure to compare with
+    total      process start to the first list response
+
+Reports the median over --runs for each PREWARM setting. Prewarming moves
+work from the first requests to startup, so it shows as a larger startup and
+smaller first/detail.
+
+Usage:
+    python -m scripts.migrate && python -m scripts.generate_data
+    python -m scripts.bench_startup [--runs 7]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STEPS = ("import", "startup", "first", "detail", "second", "total")
+
+# runs in the child process; prints one JSON object of timings in ms
+_CHILD = """
+import json, time
+t0 = time.perf_counter()
+import main
+from fastapi.testclient import TestClient
+t1 = time.perf_counter()
+with TestClient(main.app) as client:
+    t2 = time.perf_counter()
+    r = client.get("/books/?limit=20")
+    t3, first_at = time.perf_counter(), time.time()
+    book_id = r.json()["data"][0]["id"] if r.json()["data"] else 1
+    client.get(f"/books/{book_id}")
+    t4 = time.perf_counter()
+    client.get("/books/?limit=20")
+    t5 = time.perf_counter()
+ms = lambda a, b: (b - a) * 1000
+print(json.dumps({"import": ms(t0, t1), "startup": ms(t1, t2), "first": ms(t2, t3), "detail": ms(t3, t4),
+                  "second": ms(t4, t5), "first_at": first_at}))
+"""
+
+
+def run_once(prewarm: bool) -> dict:
+    env = dict(os.environ, PREWARM="1" if prewarm else "0", PYTHONPATH=ROOT)
+    # wall clock, so "total" also covers the interpreter's own startup before `import main`
+    started = time.time()
+    out = subprocess.run([sys.executable, "-c", _CHILD], env=env, capture_output=True, text=True, check=True)
+    timings = json.loads(out.stdout.strip().splitlines()[-1])
+    timings["total"] = (timings.pop("first_at") - started) * 1000
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    print(f"{'PREWARM':>7} " + " ".join(f"{step + ' ms':>11}" for step in STEPS))
+    for prewarm in (False, True):
+        runs = [run_once(prewarm) for _ in range(args.runs)]
+        medians = {step: statistics.median(r[step] for r in runs) for step in STEPS}
+        print(f"{int(prewarm):>7} " + " ".join(f"{medians[step]:>11.1f}" for step in STEPS))
+
+
+if __name__ == "__main__":
+    main()
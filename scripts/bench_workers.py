@@ -0,0 +1,125 @@
+"""
+Read throughput of the multi-process server (scripts/serve.py) by worker count.
+
+For each worker count a real server is started on a local port against the
+database at DATABASE_PATH (default ./app.db), then client processes issue
+keep-alive GET requests (book and author detail pages at random ids, list
+pages) for a fixed time. Reports requests/s and the speedup over one worker. Reads only:
+writes serialize on the database lock however many workers there are.
+
+Throughput can only scale with the cores the server gets. The clients run
+on the same machine, so leave them some: on a 4-core host, --workers 1 2 4
+with the default client count shows the curve flattening at 4.
+
+Usage:
+    python -m scripts.migrate && python -m scripts.generate_data
+    python -m scripts.bench_workers [--workers 1 2 4] [--clients 8] [--seconds 10]
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import time
+
+from app.settings import Settings
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _paths(rng: random.Random, max_book: int, max_author: int):
+    while True:
+        pick = rng.random()
+        if pick < 0.5:
+            yield f"/books/{rng.randint(1, max_book)}"
+        elif pick < 0.7:
+            yield f"/authors/{rng.randint(1, max_author)}"
+        elif pick < 0.9:
+            yield f"/books/?limit=20&sort=title&total=none&offset={rng.randrange(1000)}"
+        else:
+            yield f"/authors/?limit=20&sort=book_count&total=estimate&offset={rng.randrange(1000)}"
+
+
+def _client(port: int, seconds: float, seed: int, max_book: int, max_author: int, out) -> None:
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection("127.0.0.1", port)
+    done = errors = 0
+    deadline = time.perf_counter() + seconds
+    for path in _paths(rng, max_book, max_author):
+        if time.perf_counter() >= deadline:
+            break
+        conn.request("GET", path)
+        r = conn.getresponse()
+        r.read()
+        done += 1
+        errors += r.status >= 500
+    out.put((done, errors))
+
+
+def _wait_ready(port: int, proc: subprocess.Popen, timeout: float = 30) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"server exited with {proc.returncode}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit("server did not start")
+
+
+def run(workers: int, clients: int, seconds: float, port: int, max_book: int, max_author: int) -> tuple:
+    server = subprocess.Popen(
+        [sys.executable, "-m", "scripts.serve", "--workers", str(workers), "--port", str(port),
+         "--log-level", "warning"],
+        env={**os.environ, "PYTHONPATH": ROOT}, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        _wait_ready(port, server)
+        _client(port, min(2.0, seconds), 0, max_book, max_author, multiprocessing.Queue())  # warm up
+        out = multiprocessing.Queue()
+        procs = [multiprocessing.Process(target=_client, args=(port, seconds, i + 1, max_book, max_author, out))
+                 for i in range(clients)]
+        for p in procs:
+            p.start()
+        results = [out.get() for _ in procs]
+        for p in procs:
+            p.join()
+        done, errors = sum(r[0] for r in results), sum(r[1] for r in results)
+        return done / seconds, errors
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    cpus = os.cpu_count() or 1
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, *[n for n in (2, 4, 8, 16) if n <= cpus], cpus}))
+    parser.add_argument("--clients", type=int, default=None, help="client processes (default: 2 per worker)")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    path = Settings.from_env().database_path
+    with sqlite3.connect(f"file:{path}?mode=ro", uri=True) as db:
+        max_book = db.execute("SELECT max(id) FROM books").fetchone()[0] or 1
+        max_author = db.execute("SELECT max(id) FROM authors").fetchone()[0] or 1
+    print(f"{cpus} CPUs, {max_book} books, {max_author} authors, {args.seconds:.0f}s per run")
+    print(f"{'workers':>7} {'clients':>7} {'req/s':>9} {'speedup':>8} {'5xx':>5}")
+    baseline = None
+    for n in args.workers:
+        clients = args.clients or 2 * n
+        rps, errors = run(n, clients, args.seconds, args.port, max_book, max_author)
+        baseline = baseline or rps
+        print(f"{n:>7} {clients:>7} {rps:>9.0f} {rps / baseline:>7.2f}x {errors:>5}")
+
+
+if __name__ == "__main__":
+    main()
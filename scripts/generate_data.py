@@ -0,0 +1,134 @@
+"""
+Generates a large synthetic catalog for benchmarking.
+
+The data is skewed the way real catalogs are:
+- authors are picked with a Zipf-like weight, so a few are very prolific and
+  most have one or two books
+- publication years cluster around a few eras
+- titles are built from a small shared vocabulary, so search terms match
+  many rows and the title sorts have long runs of equal prefixes
+
+Output is deterministic for a given --seed. Rows are appended to the
+configured database through the bulk insert path (crud.bulk_create_*), one
+transaction per chunk on the writer's engine, which takes the write lock up
+front (BEGIN IMMEDIATE), so the API can keep serving while it runs; run
+migrations first.
+
+Usage:
+    python -m scripts.generate_data --authors 100000 --books 1000000 [--seed 42]
+"""
+import argparse
+import bisect
+import itertools
+import random
+import time
+from typing import Iterator
+
+from sqlalchemy import func, select
+
+from app.crud import bulk_create_authors, bulk_create_books
+from app import db as database
+from app.models import Author, Book
+from app.schemas import AuthorCreate, BookCreate
+
+# rows per bulk_create_* call; each becomes IN (...) lookups with one bound parameter
+# per row, and stock SQLite builds allow at most 32766 (the API's BULK_CHUNK_SIZE is 5000)
+CHUNK_SIZE = 10_000
+
+FIRST_NAMES = ["James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+               "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Charles", "Karen",
+               "Ana", "Jose", "Sofia", "Hiroshi", "Yuki", "Olga", "Ivan", "Amara", "Chen", "Priya"]
+LAST_NAMES = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+              "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+              "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark", "Lewis", "Robinson", "Walker",
+              "Tanaka", "Ivanova", "Okafor", "Wang", "Sharma", "Müller", "Dubois", "Rossi", "Silva", "Kowalski"]
+TITLE_WORDS = ["The", "of", "and", "Night", "Shadow", "House", "Last", "Secret", "Garden", "War", "Love", "Stone",
+               "River", "Fire", "King", "Queen", "Empire", "Dream", "City", "Winter", "Summer", "Storm", "Light",
+               "Dark", "Road", "Sea", "Star", "Blood", "Silver", "Golden", "Lost", "Hidden", "Iron", "Glass",
+               "Forest", "Mountain", "Island", "Journey", "Return", "Song", "Book", "Memory", "Time", "Machine",
+               "Ghost", "Wolf", "Crown", "Dragon", "Letters", "Children", "Daughter", "Son", "Wind", "Rain"]
+# (centre, spread, weight): publishing eras
+YEAR_CLUSTERS = [(1850, 30, 1), (1935, 15, 2), (1975, 10, 3), (2005, 8, 6), (2018, 4, 5)]
+
+AUTHOR_SKEW = 0.8  # Zipf exponent for books per author
+WORD_SKEW = 1.0    # Zipf exponent for title words
+
+
+def _zipf_cum_weights(n: int, s: float) -> list:
+    return list(itertools.accumulate(1 / (rank ** s) for rank in range(1, n + 1)))
+
+
+def _isbn(i: int) -> str:
+    # a bijection on 0..10**10-1 (7919 is coprime with 10), so ISBNs are unique but not sequential
+    return f"{(i * 7919 + 1234567) % 10 ** 10:010d}"
+
+
+def author_rows(rng: random.Random, start: int, n: int) -> Iterator[AuthorCreate]:
+    for i in range(start, start + n):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        # model_construct: generated data is valid by construction, skip re-validating millions of rows
+        local = f"{first}.{last}.{i}".lower().encode("ascii", "ignore").decode()
+        yield AuthorCreate.model_construct(name=f"{first} {last}", email=f"{local}@example.com")
+
+
+def book_rows(rng: random.Random, start: int, n: int, author_ids: list) -> Iterator[BookCreate]:
+    author_cum = _zipf_cum_weights(len(author_ids), AUTHOR_SKEW)
+    # shuffle which authors are the prolific ones, so it is not simply the lowest ids
+    order = author_ids[:]
+    rng.shuffle(order)
+    word_cum = _zipf_cum_weights(len(TITLE_WORDS), WORD_SKEW)
+    year_cum = list(itertools.accumulate(w for _, _, w in YEAR_CLUSTERS))
+    for i in range(start, start + n):
+        words = rng.choices(TITLE_WORDS, cum_weights=word_cum, k=rng.randint(1, 5))
+        centre, spread, _ = YEAR_CLUSTERS[bisect.bisect_left(year_cum, rng.random() * year_cum[-1])]
+        year = min(2100, max(1000, round(rng.gauss(centre, spread))))
+        author_id = order[bisect.bisect_left(author_cum, rng.random() * author_cum[-1])]
+        yield BookCreate.model_construct(title=" ".join(words), isbn=_isbn(i), published_year=year, author_id=author_id)
+
+
+def _chunks(rows: Iterator, size: int) -> Iterator[list]:
+    while chunk := list(itertools.islice(rows, size)):
+        yield chunk
+
+
+def generate(authors: int, books: int, seed: int = 42, chunk_size: int = CHUNK_SIZE) -> None:
+    rng = random.Random(seed)
+    # bulk_create_* index the search tables after the fact (search.deferred_indexing),
+    # which needs the write lock from the first read on
+    db = database.WriteSessionLocal()
+    try:
+        # continue numbering after existing rows so emails/ISBNs stay unique on re-runs
+        author_start = db.scalar(select(func.coalesce(func.max(Author.id), 0)))
+        book_start = db.scalar(select(func.coalesce(func.max(Book.id), 0)))
+
+        started, author_ids = time.perf_counter(), []
+        for chunk in _chunks(author_rows(rng, author_start, authors), chunk_size):
+            results = bulk_create_authors(db, chunk)
+            author_ids += [v for status, v in results if status == "created"]
+        print(f"authors: {len(author_ids)} in {time.perf_counter() - started:.1f}s")
+
+        if not author_ids:
+            author_ids = list(db.scalars(select(Author.id)))
+        if not author_ids:
+            raise SystemExit("No authors to attach books to; pass --authors.")
+        started, created = time.perf_counter(), 0
+        for chunk in _chunks(book_rows(rng, book_start, books, author_ids), chunk_size):
+            created += sum(1 for status, _ in bulk_create_books(db, chunk) if status == "created")
+            print(f"  books: {created}/{books}", end="\r", flush=True)
+        print(f"books: {created} in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--authors", type=int, default=10_000)
+    parser.add_argument("--books", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+    generate(args.authors, args.books, args.seed, args.chunk_size)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,37 @@
 """
-Creates SQLite schema for authors and books.
+Brings the SQLite database to the latest schema version (app/migrations.py).
+
+Safe to re-run: only migrations not yet recorded in schema_migrations are
+applied. Databases created before versioning are adopted by migration 1.
 
 Usage:
-    python scripts/migrate.py
+    python -m scripts.migrate            # upgrade to the latest version
+    python -m scripts.migrate --to 2     # upgrade or revert to version 2
+    python -m scripts.migrate --list     # show versions and which are applied
 """
-from app.db import engine
-from app.models import Base
+import argparse
+
+from app.db import write_engine
+from app.migrations import MIGRATIONS, applied_versions, migrate
 
 def main():
-    print("Creating tables...")
-    Base.metadata.create_all(bind=engine)
-    print("Done.")
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--to", type=int, default=None, help="target version (0 reverts everything revertible)")
+    parser.add_argument("--list", action="store_true")
+    args = parser.parse_args()
+
+    if args.list:
+        applied = set(applied_versions(write_engine))
+        for m in MIGRATIONS:
+            print(f"{'x' if m.version in applied else ' '} {m.version:4d}  {m.name}")
+        return
+    try:
+        steps = migrate(write_engine, args.to)
+    except ValueError as e:
+        raise SystemExit(str(e))
+    for direction, m in steps:
+        print(f"{direction:4s} {m.version:4d}  {m.name}")
+    print(f"At version {max(applied_versions(write_engine), default=0)}.")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,29 @@
+"""
+Recomputes authors.book_count from the books table.
+
+book_count is maintained incrementally by the API; run this if it has drifted
+(e.g. after editing the database by hand). The change is logged for cache
+invalidation (app/invalidation.py), so running workers pick it up.
+
+Usage:
+    python -m scripts.rebuild_counts
+"""
+from app import invalidation
+from app.crud import recompute_author_book_counts
+from app.db import SessionLocal
+
+def main():
+    db = SessionLocal()
+    try:
+        drifted = recompute_author_book_counts(db)
+        invalidation.record(db, ["books", "authors"])
+        db.commit()
+        print(f"Rebuilt book counts ({drifted} author(s) were out of date).")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
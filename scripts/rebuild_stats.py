@@ -0,0 +1,36 @@
+"""
+Rebuilds the catalog statistics served by /stats (app/stats.py) from the
+books and authors tables, along with authors.book_count.
+
+The API keeps them current on every write; run this after editing the
+database by hand, or loading rows some other way than through app.crud.
+The rebuild is logged for cache invalidation (app/invalidation.py) in the
+same transaction, so running workers drop their cached counts and ETags.
+
+Usage:
+    python -m scripts.rebuild_stats
+"""
+from app import invalidation, stats
+from app.crud import recompute_author_book_counts
+from app.db import SessionLocal
+
+def main():
+    db = SessionLocal()
+    try:
+        before = stats.totals(db)
+        stats.rebuild(db)
+        drifted = recompute_author_book_counts(db)
+        after = stats.totals(db)
+        invalidation.record(db, ["books", "authors"])
+        db.commit()
+        print(f"Rebuilt catalog stats: {after['books']} books, {after['authors']} authors, "
+              f"{after['years']} years ({'unchanged' if after == before else 'totals were out of date'}); "
+              f"{drifted} author book count(s) were out of date.")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,10 @@ Usage:
     python scripts/seed.py
 """
 from sqlalchemy import select
-from app.db import SessionLocal
-from app.models import Author, Book
+from app.crud import bulk_create_authors, bulk_create_books
+from app import db as database
+from app.models import Author
+from app.schemas import AuthorCreate, BookCreate
 
 AUTHORS = [
     {"name": "J. R. R. Tolkien", "email": "tolkien@example.com"},
@@ -31,7 +33,8 @@ BOOKS = [
 ]
 
 def main():
-    db = SessionLocal()
+    # the bulk inserts need the write lock before their first read (search.deferred_indexing)
+    db = database.WriteSessionLocal()
     try:
         # prevent duplicate seeding by checking an author count
         existing = db.execute(select(Author)).scalars().first()
@@ -39,23 +42,16 @@ def main():
             print("Database already has data; skipping seed.")
             return
 
-        # insert authors
-        author_map = {}
-        for a in AUTHORS:
-            author = Author(name=a["name"], email=a["email"])
-            db.add(author)
-            db.flush()  # get id
-            author_map[a["name"]] = author.id
-
-        # insert books
-        for b in BOOKS:
-            db.add(Book(
-                title=b["title"],
-                isbn=b["isbn"],
-                published_year=b["published_year"],
-                author_id=author_map[b["author"]],
-            ))
+        # insert authors (one executemany; ids come back in input order)
+        results = bulk_create_authors(db, [AuthorCreate(**a) for a in AUTHORS], commit=False)
+        author_map = {a["name"]: author_id for a, (_, author_id) in zip(AUTHORS, results)}
 
+        # insert books (also maintains authors.book_count)
+        bulk_create_books(db, [
+            BookCreate(title=b["title"], isbn=b["isbn"], published_year=b["published_year"],
+                       author_id=author_map[b["author"]])
+            for b in BOOKS
+        ], commit=False)
         db.commit()
         print("Seeded authors and books.")
     except Exception as e:
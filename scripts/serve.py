@@ -0,0 +1,36 @@
+"""
+Production server: N uvicorn worker processes sharing one SQLite file.
+
+Each worker has its own read-only connection pool and writer thread
+(app/db.py, app/writer.py). In WAL mode the workers' readers run alongside
+whichever one is writing, busy_timeout queues the writers on the lock, and
+the caches stay coherent through the shared invalidation log
+(app/invalidation.py). Run migrations first.
+
+Usage:
+    python -m scripts.serve [--workers N] [--host 0.0.0.0] [--port 8000]
+
+--workers defaults to $WEB_CONCURRENCY, else the number of CPUs.
+"""
+import argparse
+import os
+
+import uvicorn
+
+
+def default_workers() -> int:
+    return int(os.getenv("WEB_CONCURRENCY") or os.cpu_count() or 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+    uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers, log_level=args.log_level)
+
+
+if __name__ == "__main__":
+    main()
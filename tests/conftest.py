@@ -0,0 +1,59 @@
+"""
+Shared fixtures: the tests run against a migrated and seeded database in a
+temporary directory, never ./app.db, through an app built for it by
+main.create_app.
+"""
+import dataclasses
+import os
+import subprocess
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import main
+from app import db as database
+from app.settings import Settings
+
+
+def make_database(path) -> Settings:
+    """Migrates and seeds a database at `path`; returns the Settings (from the environment) for it."""
+    env = dict(os.environ, DATABASE_PATH=str(path))
+    for script in ("scripts.migrate", "scripts.seed"):
+        subprocess.run([sys.executable, "-m", script], env=env, check=True, capture_output=True)
+    return dataclasses.replace(Settings.from_env(), database_path=str(path))
+
+
+@pytest.fixture(scope="session")
+def settings(tmp_path_factory):
+    settings = make_database(tmp_path_factory.mktemp("db") / "app.db")
+    # processes the tests start (tests/test_cache.py) open the same file
+    env = pytest.MonkeyPatch()
+    env.setenv("DATABASE_PATH", settings.database_path)
+    yield settings
+    env.undo()
+
+
+@pytest.fixture(autouse=True)
+def app(settings):
+    # built for every test, so one that points the process at another file does not leak into the next
+    return main.create_app(settings)
+
+
+@pytest.fixture
+def client(app):
+    return TestClient(app)
+
+
+@pytest.fixture
+def statements(app):
+    """The SQL run on the read-write engine (app.db.SessionLocal) during the test, in order."""
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+    engine = database.engine
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
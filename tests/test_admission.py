@@ -0,0 +1,37 @@
+import asyncio
+from app import admission
+from app.admission import ConcurrencyLimiter, TokenBuckets
+def test_limiter_queues_hands_over_and_sheds():
+    async def scenario():
+        lim = ConcurrencyLimiter("test", limit=1, max_queue=1, max_wait=5)
+        assert await lim.acquire() is None
+        waiting = asyncio.create_task(lim.acquire())
+        await asyncio.sleep(0)
+        assert lim.queued == 1
+        assert await lim.acquire() == "queue_full"
+        lim.release()
+        assert await waiting is None and lim.active == 1 and lim.queued == 0
+        lim.max_wait = 0.01
+        assert await lim.acquire() == "timeout" and lim.queued == 0
+        lim.release()
+        assert lim.active == 0
+    asyncio.run(scenario())
+def test_token_bucket_refills_at_rate():
+    b = TokenBuckets(rate=1000, burst=2)
+    assert b.take("a") == 0 and b.take("a") == 0
+    assert b.take("a") > 0 and b.take("b") == 0
+def test_overloaded_class_gets_503_and_other_routes_still_served(client, monkeypatch):
+    full = ConcurrencyLimiter("read", limit=0, max_queue=0, max_wait=0)
+    monkeypatch.setitem(admission.limiters, "read", full)
+    r = client.get("/books/")
+    assert r.status_code == 503 and r.headers["retry-after"] == "1" and "error" in r.json()
+    assert client.get("/health").status_code == 200
+    r = client.post("/books/batch-get", json={"ids": [1]})
+    assert r.status_code == 503
+    monkeypatch.setattr(admission, "rate_limiter", TokenBuckets(rate=0.001, burst=1))
+    assert client.post("/authors/", json={}).status_code == 400
+    r = client.post("/authors/", json={})
+    assert r.status_code == 429 and int(r.headers["retry-after"]) > 1
+    text = client.get("/metrics").text
+    assert 'admission_shed_total{class="read",reason="queue_full"}' in text
+    assert 'admission_shed_total{class="write",reason="rate_limited"}' in text
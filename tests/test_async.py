@@ -0,0 +1,22 @@
+import asyncio
+import uuid
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app import crud_async, schemas
+from app import db as database
+def test_crud_async_roundtrip_on_aiosqlite():
+    async def run():
+        engine = create_async_engine(database.ASYNC_DATABASE_URL)
+        try:
+            async with async_sessionmaker(engine, expire_on_commit=False)() as db:
+                a = await crud_async.create_author(db, schemas.AuthorCreate(name="Async Author", email=f"async-{uuid.uuid4().hex[:8]}@example.com"))
+                b = await crud_async.create_book(db, schemas.BookCreate(title="Async Book", isbn=str(uuid.uuid4().int)[:10], author_id=a.id))
+                book = await crud_async.get_book_by_id(db, b.id, with_author=True)
+                assert book.author.id == a.id
+                author = await crud_async.get_author_by_id(db, a.id, with_books=True)
+                assert [x.id for x in author.books] == [b.id]
+                items, _ = await crud_async.list_books_paginated(db, title="Async Book", author=None, year=None,
+                                                                 sort="id", order="desc", limit=5, offset=0)
+                assert b.id in [x.id for x in items]
+        finally:
+            await engine.dispose()
+    asyncio.run(run())
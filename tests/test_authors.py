@@ -1,9 +1,55 @@
-﻿from fastapi.testclient import TestClient
-from main import app
-client = TestClient(app)
-def test_create_author_success():
+﻿import uuid
+def test_create_author_success(client):
     r = client.post("/authors", json={"name":"Isaac Asimov","email":"asimov@example.com"})
     assert r.status_code == 201
-def test_create_author_invalid_email():
+def test_create_author_invalid_email(client):
     r = client.post("/authors", json={"name":"Bad","email":"not-an-email"})
     assert r.status_code == 400
+def test_list_authors_cursor_matches_offset_order(client):
+    for order in ("asc", "desc"):
+        full = client.get("/authors", params={"sort": "book_count", "order": order, "limit": 100}).json()
+        ids, cursor = [], None
+        while True:
+            params = {"sort": "book_count", "order": order, "limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            body = client.get("/authors", params=params).json()
+            ids += [a["id"] for a in body["data"]]
+            cursor = body["next_cursor"]
+            if not cursor:
+                break
+        assert ids == [a["id"] for a in full["data"]]
+def _book_count(client, author_id):
+    rows = client.get("/authors", params={"sort": "id", "order": "desc", "limit": 100}).json()["data"]
+    return next(a["book_count"] for a in rows if a["id"] == author_id)
+def test_book_count_follows_create_and_move(client):
+    tag = uuid.uuid4().hex[:8]
+    a1 = client.post("/authors", json={"name": "Count One", "email": f"c1-{tag}@example.com"}).json()
+    a2 = client.post("/authors", json={"name": "Count Two", "email": f"c2-{tag}@example.com"}).json()
+    b = client.post("/books", json={"title": "Counted", "isbn": str(uuid.uuid4().int)[:10], "author_id": a1["id"]}).json()
+    assert (_book_count(client, a1["id"]), _book_count(client, a2["id"])) == (1, 0)
+    client.put(f"/books/{b['id']}", json={"author_id": a2["id"]})
+    assert (_book_count(client, a1["id"]), _book_count(client, a2["id"])) == (0, 1)
+def test_create_author_duplicate_email_is_409(client):
+    email = f"dup-{uuid.uuid4().hex[:8]}@example.com"
+    assert client.post("/authors", json={"name": "First", "email": email}).status_code == 201
+    r = client.post("/authors", json={"name": "Second", "email": email})
+    assert r.status_code == 409 and r.json() == {"error": "Email already exists."}
+def test_list_authors_include_books_is_one_extra_query(client, statements):
+    from app import crud
+    from app.db import SessionLocal
+    db = SessionLocal()
+    try:
+        rows, _ = crud.list_authors_paginated(db, None, "book_count", "desc", 20, 0, include="books")
+        assert sum(len(a.books) for a, _ in rows) == sum(bc for _, bc in rows)
+        assert len(statements) == 2
+    finally:
+        db.close()
+
+    body = client.get("/authors", params={"include": "books", "fields": "id,name", "limit": 3}).json()
+    assert all(set(a) == {"id", "name", "books"} for a in body["data"])
+def test_batch_get_authors(client):
+    ids = [a["id"] for a in client.get("/authors", params={"sort": "id", "limit": 2}).json()["data"]]
+    results = client.post("/authors/batch-get", json={"ids": [ids[1], -1, ids[0]]}).json()["results"]
+    assert [(x["id"], x["status"]) for x in results] == [(ids[1], "found"), (-1, "not_found"), (ids[0], "found")]
+    assert results[2]["data"]["books"] == client.get(f"/authors/{ids[0]}").json()["books"]
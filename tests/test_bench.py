@@ -0,0 +1,28 @@
+import random
+from collections import Counter
+from app.schemas import AuthorCreate, BookCreate
+from scripts.bench import compare, uncovered_routes
+from scripts.generate_data import author_rows, book_rows
+def test_generator_is_deterministic_valid_and_skewed():
+    books = list(book_rows(random.Random(1), 0, 5000, list(range(1, 501))))
+    assert books == list(book_rows(random.Random(1), 0, 5000, list(range(1, 501))))
+    assert len({b.isbn for b in books}) == 5000
+    for b in books[:200]:
+        BookCreate.model_validate(b.model_dump())
+    per_author = sorted(Counter(b.author_id for b in books).values(), reverse=True)
+    assert sum(per_author[:5]) > 5000 * 0.05  # top 1% of authors
+    authors = list(author_rows(random.Random(1), 0, 200))
+    assert len({a.email for a in authors}) == 200
+    for a in authors:
+        AuthorCreate.model_validate(a.model_dump())
+def test_bench_covers_every_route():
+    assert uncovered_routes() == []
+def test_compare_flags_regressions():
+    base = {"scenarios": {"a": {"p95_ms": 10.0, "rps": 100.0, "errors": 0},
+                          "b": {"p95_ms": 0.2, "rps": 1000.0, "errors": 0}}}
+    same = {"scenarios": {"a": {"p95_ms": 11.0, "rps": 95.0, "errors": 0},
+                          "b": {"p95_ms": 0.5, "rps": 990.0, "errors": 0}}}
+    assert compare(same, base) == []
+    worse = {"scenarios": {"a": {"p95_ms": 20.0, "rps": 50.0, "errors": 1},
+                           "b": {"p95_ms": 0.2, "rps": 1000.0, "errors": 0}}}
+    assert len(compare(worse, base)) == 3
@@ -1,6 +1,147 @@
-﻿from fastapi.testclient import TestClient
-from main import app
-client = TestClient(app)
-def test_list_books_filter_by_year():
+﻿import json
+import uuid
+def test_list_books_filter_by_year(client):
     r = client.get("/books?year=1937&limit=5")
     assert r.status_code == 200
+def _walk(client, path, **params):
+    ids, cursor = [], None
+    while True:
+        q = dict(params, limit=3, **({"cursor": cursor} if cursor else {}))
+        body = client.get(path, params=q).json()
+        ids += [row["id"] for row in body["data"]]
+        cursor = body["next_cursor"]
+        if not cursor:
+            return ids
+def test_list_books_cursor_matches_offset_order(client):
+    for sort in ("title", "published_year", "created_at", "id"):
+        for order in ("asc", "desc"):
+            full = client.get("/books", params={"sort": sort, "order": order, "limit": 100}).json()
+            assert _walk(client, "/books", sort=sort, order=order) == [b["id"] for b in full["data"]]
+def test_list_books_invalid_cursor(client):
+    r = client.get("/books?cursor=not-a-cursor")
+    assert r.status_code == 400
+def test_fts_search_tracks_create_and_update(client):
+    word = "zq" + uuid.uuid4().hex[:8]
+    a = client.post("/authors", json={"name": "Fts Author", "email": f"{word}@example.com"}).json()
+    isbn = str(uuid.uuid4().int)[:10]
+    b = client.post("/books", json={"title": f"The {word} Chronicles", "isbn": isbn, "author_id": a["id"]}).json()
+    r = client.get("/books", params={"title": word[:5], "match": "fts", "sort": "relevance"}).json()
+    assert [x["id"] for x in r["data"]] == [b["id"]] and r["total"] == 1
+    client.put(f"/books/{b['id']}", json={"title": "Renamed"})
+    assert client.get("/books", params={"title": word, "match": "fts"}).json()["total"] == 0
+    # a term with no tokens matches nothing, as with match=substring
+    for params in ({"title": "!!!"}, {"author": "!!!"}, {"title": word[:5], "author": "?"}):
+        r = client.get("/books", params={**params, "match": "fts", "total": "exact"}).json()
+        assert (r["data"], r["total"]) == ([], 0)
+    r = client.get("/authors", params={"name": "!!!", "match": "fts", "total": "exact"}).json()
+    assert (r["data"], r["total"]) == ([], 0)
+    assert client.get("/books/export", params={"title": "!!!", "match": "fts"}).text == ""
+def test_list_books_total_modes_and_cache_invalidation(client):
+    before = client.get("/books", params={"limit": 1}).json()["total"]
+    assert client.get("/books", params={"limit": 1, "total": "none"}).json()["total"] is None
+    assert client.get("/books", params={"limit": 1, "total": "estimate"}).json()["total"] >= before
+    a = client.post("/authors", json={"name": "Total Author", "email": f"t-{uuid.uuid4().hex[:8]}@example.com"}).json()
+    client.post("/books", json={"title": "Counted Once", "isbn": str(uuid.uuid4().int)[:10], "author_id": a["id"]})
+    assert client.get("/books", params={"limit": 1}).json()["total"] == before + 1
+def test_book_detail_cache_invalidated_on_update_and_author_move(client):
+    tag = uuid.uuid4().hex[:8]
+    a1 = client.post("/authors", json={"name": "Cache One", "email": f"k1-{tag}@example.com"}).json()
+    a2 = client.post("/authors", json={"name": "Cache Two", "email": f"k2-{tag}@example.com"}).json()
+    b = client.post("/books", json={"title": "Cached", "isbn": str(uuid.uuid4().int)[:10], "author_id": a1["id"]}).json()
+    assert client.get(f"/books/{b['id']}").json()["author"]["id"] == a1["id"]
+    assert [x["id"] for x in client.get(f"/authors/{a2['id']}").json()["books"]] == []
+    client.put(f"/books/{b['id']}", json={"title": "Moved", "author_id": a2["id"]})
+    detail = client.get(f"/books/{b['id']}").json()
+    assert (detail["title"], detail["author"]["id"]) == ("Moved", a2["id"])
+    assert client.get(f"/authors/{a1['id']}").json()["books"] == []
+    assert [x["id"] for x in client.get(f"/authors/{a2['id']}").json()["books"]] == [b["id"]]
+def test_get_missing_book_is_404(client):
+    assert client.get("/books/999999999").status_code == 404
+def test_export_books_streams_filtered_rows(client):
+    tag = uuid.uuid4().hex[:8]
+    aid = client.post("/authors", json={"name": "Export Author", "email": f"exp-{tag}@example.com"}).json()["id"]
+    for i in range(3):
+        client.post("/books", json={"title": f"Export {tag} {i}", "isbn": str(uuid.uuid4().int)[:10], "published_year": 2001, "author_id": aid})
+    r = client.get("/books/export", params={"title": tag})
+    assert r.status_code == 200 and r.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in r.text.splitlines()]
+    assert [b["title"] for b in rows] == [f"Export {tag} {i}" for i in range(3)]
+    assert set(rows[0]) == {"id", "title", "isbn", "published_year", "author_id", "created_at"}
+    r = client.get("/books/export", params={"title": tag, "match": "fts", "format": "csv"})
+    lines = r.text.splitlines()
+    assert lines[0] == "id,title,isbn,published_year,author_id,created_at" and len(lines) == 4
+def test_list_books_include_author_and_fields(client, statements):
+    from app import crud
+    from app.db import SessionLocal
+    db = SessionLocal()
+    try:
+        books, _ = crud.list_books_paginated(db, None, None, None, "title", "asc", 20, 0,
+                                             include="author", fields=["title"])
+        assert all(b.author.name for b in books)
+        assert len(statements) == 1 and "isbn" not in statements[0]
+    finally:
+        db.close()
+
+    body = client.get("/books", params={"include": "author", "fields": "title,isbn", "limit": 3}).json()
+    assert body["data"] and all(set(b) == {"title", "isbn", "author"} for b in body["data"])
+    assert "email" in body["data"][0]["author"]
+    assert client.get("/books", params={"fields": "title,nope"}).status_code == 400
+def test_list_books_fast_path_matches_response_model(client):
+    from app.schemas import PaginatedBooks
+    r = client.get("/books", params={"limit": 5})
+    expected = PaginatedBooks.model_validate(r.json()).model_dump(mode="json")
+    assert r.content == json.dumps(expected, separators=(",", ":")).encode()
+def test_conditional_get_returns_304_until_a_write(client):
+    from app import metrics
+    tag = uuid.uuid4().hex[:8]
+    aid = client.post("/authors", json={"name": "Etag Author", "email": f"etag-{tag}@example.com"}).json()["id"]
+    bid = client.post("/books", json={"title": f"Etag {tag}", "isbn": str(uuid.uuid4().int)[:10], "author_id": aid}).json()["id"]
+
+    r = client.get(f"/books/{bid}")
+    etag = r.headers["etag"]
+    assert r.headers["last-modified"] and "must-revalidate" in r.headers["cache-control"]
+    queries = metrics.db_queries_total.value(("/books/{book_id}",))
+    r = client.get(f"/books/{bid}", headers={"If-None-Match": etag})
+    assert r.status_code == 304 and r.content == b""
+    assert metrics.db_queries_total.value(("/books/{book_id}",)) == queries
+
+    client.put(f"/books/{bid}", json={"published_year": 1999})
+    r = client.get(f"/books/{bid}", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.headers["etag"] != etag and r.json()["published_year"] == 1999
+
+    list_etag = client.get("/books/", params={"title": tag}).headers["etag"]
+    assert client.get("/books/", params={"title": tag}, headers={"If-None-Match": list_etag}).status_code == 304
+    client.post("/books", json={"title": f"Etag {tag} 2", "isbn": str(uuid.uuid4().int)[:10], "author_id": aid})
+    r = client.get("/books/", params={"title": tag}, headers={"If-None-Match": list_etag})
+    assert r.status_code == 200 and r.json()["total"] == 2
+def test_batch_get_books_keeps_request_order_and_marks_missing(client):
+    ids = [b["id"] for b in client.get("/books/", params={"limit": 3, "total": "none"}).json()["data"]]
+    client.get(f"/books/{ids[1]}")  # one of them cached
+    r = client.post("/books/batch-get", json={"ids": [ids[2], 999999999, ids[0], ids[1], ids[2]]})
+    assert r.status_code == 200
+    results = r.json()["results"]
+    assert [x["id"] for x in results] == [ids[2], 999999999, ids[0], ids[1], ids[2]]
+    assert [x["status"] for x in results] == ["found", "not_found", "found", "found", "found"]
+    assert results[0]["data"] == client.get(f"/books/{ids[2]}").json()
+    assert client.post("/books/batch-get", json={"ids": []}).status_code == 400
+def test_writes_map_constraint_violations_and_patch_updates_in_place(client):
+    tag = uuid.uuid4().hex[:8]
+    a = client.post("/authors", json={"name": "Constraint Author", "email": f"c-{tag}@example.com"}).json()
+    assert a["book_count"] == 0
+    r = client.post("/authors", json={"name": "Again", "email": f"c-{tag}@example.com"})
+    assert r.status_code == 409 and r.json()["error"] == "Email already exists."
+    isbn, other = str(uuid.uuid4().int)[:10], str(uuid.uuid4().int)[:10]
+    r = client.post("/books", json={"title": "Orphan", "isbn": isbn, "author_id": 999999999})
+    assert r.status_code == 400 and "author_id" in r.json()["error"]
+    b = client.post("/books", json={"title": "Before", "isbn": isbn, "author_id": a["id"]}).json()
+    r = client.post("/books", json={"title": "Dup", "isbn": isbn, "author_id": a["id"]})
+    assert r.status_code == 409 and r.json()["error"] == "ISBN already exists."
+    client.post("/books", json={"title": "Other", "isbn": other, "author_id": a["id"]})
+    r = client.patch(f"/books/{b['id']}", json={"title": "After"})
+    assert r.status_code == 200 and r.json()["title"] == "After" and r.json()["isbn"] == isbn
+    assert client.get(f"/books/{b['id']}").json()["title"] == "After"
+    assert client.patch(f"/books/{b['id']}", json={"isbn": other}).status_code == 409
+    assert client.patch(f"/books/{b['id']}", json={"author_id": 999999999}).status_code == 400
+    assert client.patch(f"/books/{b['id']}", json={"title": None}).status_code == 400
+    assert client.patch("/books/999999999", json={"title": "Nope"}).status_code == 404
+    assert client.get(f"/authors/{a['id']}").json()["books"][0]["title"] == "After"
@@ -0,0 +1,45 @@
+import json
+import uuid
+def _isbn():
+    return str(uuid.uuid4().int)[:10]
+def test_bulk_create_authors_and_books_reports_each_row(client):
+    tag = uuid.uuid4().hex[:8]
+    r = client.post("/authors/bulk", json=[
+        {"name": "Bulk One", "email": f"b1-{tag}@example.com"},
+        {"name": "Bulk Two", "email": "not-an-email"},
+        {"name": "Bulk Dup", "email": f"b1-{tag}@example.com"},
+    ])
+    assert r.status_code == 200
+    body = r.json()
+    assert (body["created"], body["failed"]) == (1, 2)
+    assert [x["status"] for x in body["results"]] == ["created", "error", "error"]
+    author_id = body["results"][0]["id"]
+
+    isbns = [_isbn() for _ in range(3)]
+    lines = [json.dumps({"title": f"Bulk {tag} {i}", "isbn": isbn, "published_year": 2000, "author_id": author_id})
+             for i, isbn in enumerate(isbns)]
+    lines.insert(1, "{not json")
+    r = client.post("/books/bulk", content="\n".join(lines), headers={"Content-Type": "application/x-ndjson"})
+    body = r.json()
+    assert (body["created"], body["failed"]) == (3, 1)
+    assert body["results"][1] == {"row": 1, "status": "error", "error": "Malformed JSON line."}
+    book = client.get(f"/books/{body['results'][2]['id']}").json()
+    assert book["isbn"] == isbns[1]
+    assert len(client.get(f"/authors/{author_id}").json()["books"]) == 3
+    listed = client.get("/authors", params={"name": "Bulk One", "limit": 100}).json()["data"]
+    assert next(a for a in listed if a["id"] == author_id)["book_count"] == 3
+    assert client.get("/books", params={"title": tag, "match": "fts"}).json()["total"] == 3
+def test_bulk_rejects_non_array_body(client):
+    r = client.post("/books/bulk", json={"title": "x"})
+    assert r.status_code == 400
+def test_deferred_indexing_requires_the_write_lock():
+    import pytest
+    from app import crud, schemas
+    from app import db as database
+    rows = [schemas.AuthorCreate(name="Locked", email=f"lk-{uuid.uuid4().hex[:8]}@example.com")]
+    with database.SessionLocal() as db:  # no write yet: another connection could insert before max(id)
+        with pytest.raises(RuntimeError):
+            crud.bulk_create_authors(db, rows, commit=False)
+    with database.WriteSessionLocal() as db:
+        assert crud.bulk_create_authors(db, rows, commit=False)[0][0] == "created"
+        db.rollback()
@@ -0,0 +1,61 @@
+from app.cache import EntityCache
+def test_entity_cache_lru_eviction_and_tag_invalidation():
+    c = EntityCache(maxsize=2, ttl=60)
+    c.put(("books", 1), {"id": 1}, tags=[("authors", 9)])
+    c.put(("books", 2), {"id": 2})
+    c.get(("books", 1))
+    c.put(("books", 3), {"id": 3})
+    assert c.get(("books", 2)) is None and c.evictions == 1
+    c.invalidate(("authors", 9))
+    assert c.get(("books", 1)) is None and c.get(("books", 3)) == {"id": 3}
+def test_entity_cache_ttl_and_stale_put():
+    c = EntityCache(ttl=0)
+    c.put(("books", 1), {"id": 1})
+    assert c.get(("books", 1)) is None and c.expirations == 1
+    c = EntityCache()
+    gen = c.generation
+    c.invalidate(("books", 1))
+    c.put(("books", 1), {"id": 1}, generation=gen)
+    assert c.get(("books", 1)) is None
+def test_entity_cache_versions_change_on_invalidate_and_survive_forgetting():
+    c = EntityCache(max_versions=2)
+    v1 = c.version(("books", 1))
+    c.invalidate(("books", 1))
+    v2 = c.version(("books", 1))
+    assert v2 != v1
+    c.invalidate(("books", 2))
+    c.invalidate(("books", 3))
+    # forgotten, but never reported as an older version
+    assert c.version(("books", 1)) >= v2
+def test_write_in_another_process_invalidates_caches_and_etags_agree(client):
+    import subprocess
+    import sys
+    import uuid
+    a = client.post("/authors", json={"name": "Multi Proc", "email": f"mp-{uuid.uuid4().hex[:8]}@example.com"}).json()
+    b = client.post("/books", json={"title": "Before", "isbn": str(uuid.uuid4().int)[:10], "author_id": a["id"]}).json()
+    etag = client.get(f"/books/{b['id']}").headers["etag"]  # now cached here
+    def other_process(code):
+        return subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout.strip()
+    other_process("from app import crud, schemas; from app.db import SessionLocal; "
+                  f"crud.update_book_by_id(SessionLocal(), {b['id']}, schemas.BookUpdate(title='After'))")
+    r = client.get(f"/books/{b['id']}", headers={"If-None-Match": etag})
+    assert r.status_code == 200 and r.json()["title"] == "After"
+    there = other_process("from fastapi.testclient import TestClient; from main import app; "
+                          f"print(TestClient(app).get('/books/{b['id']}').headers['etag'])")
+    assert there == r.headers["etag"]
+def test_etags_of_unchanged_rows_agree_across_a_log_prune(client, monkeypatch):
+    import subprocess
+    import sys
+    import uuid
+    from app import invalidation
+    book_id = client.get("/books/", params={"limit": 1, "sort": "id"}).json()["data"][0]["id"]
+    client.get(f"/books/{book_id}")  # this process started before the prune
+    monkeypatch.setattr(invalidation, "CACHE_LOG_RETAIN", 2)
+    monkeypatch.setattr(invalidation, "_PRUNE_EVERY", 1)
+    for _ in range(4):
+        client.post("/authors", json={"name": "Pruned", "email": f"pr-{uuid.uuid4().hex[:8]}@example.com"})
+    here = client.get(f"/books/{book_id}").headers["etag"]
+    there = subprocess.run([sys.executable, "-c", "from fastapi.testclient import TestClient; from main import app; "
+                            f"print(TestClient(app).get('/books/{book_id}').headers['etag'])"],
+                           check=True, capture_output=True, text=True).stdout.strip()
+    assert there == here
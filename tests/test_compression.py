@@ -0,0 +1,39 @@
+import uuid
+from app import metrics
+from app.compression import Compressed, CompressedCache, compressed_cache, negotiate
+def test_negotiate_respects_q_values():
+    assert negotiate("gzip, deflate") == "gzip"
+    assert negotiate("gzip;q=0, deflate") is None
+    assert negotiate("*") is not None and negotiate("") is None and negotiate("identity") is None
+def test_compressed_cache_is_bounded_by_bytes():
+    c = CompressedCache(max_bytes=10)
+    c.put("a", Compressed("1", [], b"12345"))
+    c.put("b", Compressed("1", [], b"12345"))
+    c.get("a")
+    c.put("c", Compressed("1", [], b"123"))
+    assert c.get("b") is None and c.get("a").body == b"12345" and c.size == 8 and c.evictions == 1
+    c.put("a", Compressed("2", [], b"1"))
+    assert c.get("a").etag == "2" and c.size == 4
+def test_list_pages_are_compressed_once_and_match_identity(client):
+    params = {"limit": 100, "sort": "id"}
+    plain = client.get("/books/", params=params, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers and plain.headers["vary"] == "Accept-Encoding"
+    first = client.get("/books/", params=params, headers={"Accept-Encoding": "gzip"})
+    hits, queries = compressed_cache.hits, metrics.db_queries_total.value(("/books/",))
+    again = client.get("/books/", params=params, headers={"Accept-Encoding": "gzip"})
+    assert first.headers["content-encoding"] == again.headers["content-encoding"] == "gzip"
+    assert again.status_code == 200 and again.json() == plain.json() and compressed_cache.hits == hits + 1
+    assert first.headers["etag"] == again.headers["etag"] == plain.headers["etag"]
+    # served without running the handler's queries
+    assert metrics.db_queries_total.value(("/books/",)) == queries
+    # the client's own If-None-Match is answered by the handler
+    r = client.get("/books/", params=params,
+                   headers={"Accept-Encoding": "gzip", "If-None-Match": first.headers["etag"]})
+    assert r.status_code == 304
+    # a write makes the entry stale: the new page replaces it
+    a = client.post("/authors", json={"name": "Gz", "email": f"gz-{uuid.uuid4().hex[:8]}@example.com"}).json()
+    client.post("/books", json={"title": "Gz", "isbn": str(uuid.uuid4().int)[:10], "author_id": a["id"]})
+    fresh = client.get("/books/", params=params, headers={"Accept-Encoding": "gzip"})
+    assert fresh.headers["etag"] != first.headers["etag"] and compressed_cache.hits == hits + 1
+    # below COMPRESS_MIN_BYTES: sent as is
+    assert "content-encoding" not in client.get("/health", headers={"Accept-Encoding": "gzip"}).headers
@@ -1,7 +1,4 @@
-﻿from fastapi.testclient import TestClient
-from main import app
-client = TestClient(app)
-def test_health():
+﻿def test_health(client):
     r = client.get("/health")
     assert r.status_code == 200
     assert r.json() == {"status": "ok"}
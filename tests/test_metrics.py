@@ -0,0 +1,40 @@
+import logging
+from app import metrics
+def test_metrics_use_route_templates_and_count_sql(client):
+    book_id = client.get("/books/", params={"limit": 1}).json()["data"][0]["id"]
+    client.get(f"/books/{book_id}")
+    client.get("/books/999999999")
+    before = metrics.db_queries_total.value(("/books/",))
+    client.get("/books/", params={"limit": 1})
+    assert metrics.db_queries_total.value(("/books/",)) > before
+
+    body = client.get("/metrics").text
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/books/{book_id}",le="+Inf"}' in body
+    assert 'http_requests_total{method="GET",route="/books/{book_id}",status="404"}' in body
+    assert "999999999" not in body
+    assert 'http_request_db_queries_count{method="GET",route="/books/"}' in body
+    assert "# TYPE http_requests_in_flight gauge" in body
+def test_slow_query_log(client, monkeypatch, caplog):
+    monkeypatch.setattr(metrics, "SLOW_QUERY_MS", 0.000001)
+    with caplog.at_level(logging.WARNING, logger="app.sql.slow"):
+        client.get("/authors/", params={"limit": 1})
+    assert any("slow query" in r.getMessage() and "/authors/" in r.getMessage() for r in caplog.records)
+def test_export_sql_is_counted_against_the_export_route(client):
+    import asyncio
+    from functools import partial
+    from app import crud, export
+    before = metrics.db_queries_total.value(("/books/export",))
+    background = metrics.db_queries_total.value(("background",))
+    assert client.get("/books/export").text
+    assert metrics.db_queries_total.value(("/books/export",)) > before
+    # the body is sent after the middleware has reset the request's stats
+    token = metrics.current_request.set(metrics.RequestStats("/books/export"))
+    query = partial(crud.export_books, title=None, author=None, year=None)
+    response = export.export_response(query, crud.BOOK_EXPORT_COLUMNS, "ndjson", "books")
+    metrics.current_request.reset(token)
+    before = metrics.db_queries_total.value(("/books/export",))
+    async def drain():
+        return [chunk async for chunk in response.body_iterator]
+    assert asyncio.run(drain())
+    assert metrics.db_queries_total.value(("/books/export",)) > before
+    assert metrics.db_queries_total.value(("background",)) == background
@@ -0,0 +1,112 @@
+import itertools
+import re
+from sqlalchemy import event
+from app import crud, stats
+from app import db as database
+from app.schemas import BookCreate
+from app.utils.pagination import encode_cursor
+# EXPLAIN QUERY PLAN for every SELECT the crud read paths issue, across the
+# filter x sort x cursor combinations the list endpoints accept. A plan fails on
+#   "SCAN books" / "SCAN authors" - a table or whole-index walk - unless the
+#       query is unfiltered (it walks in ORDER BY order and stops at LIMIT) or
+#       filters with a substring LIKE '%term%', which no b-tree can serve
+#   "USE TEMP B-TREE" - sorting rows after fetching them - unless the rows come
+#       from an FTS match, which is unordered by nature
+FULL_SCAN = re.compile(r"^SCAN (books|authors)\b")
+def _plans(fn):
+    statements = []
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+    # the writer's engine: the bulk path's deferred indexing needs the write lock
+    event.listen(database.write_engine, "before_cursor_execute", capture)
+    try:
+        with database.WriteSessionLocal() as db:
+            fn(db)
+            db.rollback()
+            conn = db.connection()
+            return [(sql, [row[3] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", params)])
+                    for sql, params in statements]
+    finally:
+        event.remove(database.write_engine, "before_cursor_execute", capture)
+def _check(label, fn, scan_ok=False, sort_ok=False):
+    problems = []
+    for sql, plan in _plans(fn):
+        bad = [line for line in plan
+               if (FULL_SCAN.match(line) and not scan_ok) or ("TEMP B-TREE" in line and not sort_ok)]
+        if bad:
+            problems.append(f"{label}: {bad}\n  {sql}")
+    return problems
+BOOK_FILTERS = [  # (title, author, year, match)
+    (None, None, None, "substring"), ("war", None, None, "substring"), (None, "smith", None, "substring"),
+    (None, None, 1975, "substring"), ("war", None, 1975, "substring"), ("war", None, None, "fts"),
+    (None, "smith", None, "fts"), ("war", "smith", 1975, "fts"),
+]
+BOOK_CURSORS = {"title": "M", "published_year": 1975, "created_at": "2024-01-01T00:00:00", "id": 50}
+def test_book_queries_use_indexes():
+    problems = []
+    for (title, author, year, match), sort, order, paged in itertools.product(
+            BOOK_FILTERS, [*BOOK_CURSORS, "relevance"], ("asc", "desc"), (False, True)):
+        if paged and sort == "relevance":
+            continue
+        cursor = encode_cursor(sort, order, BOOK_CURSORS[sort], 50) if paged else None
+        unfiltered = not (title or author or year)
+        substring = match == "substring" and bool(title or author)
+        problems += _check(
+            f"books title={title} author={author} year={year} match={match} sort={sort} {order} cursor={paged}",
+            lambda db: crud.list_books_paginated(db, title, author, year, sort, order, 20, 0, cursor=cursor,
+                                                 match=match, include="author"),
+            scan_ok=unfiltered or substring, sort_ok=match == "fts")
+    for title, author, year, match in BOOK_FILTERS:
+        # an exact count visits every matching row; unfiltered, that is all of them
+        unfiltered = not (title or author or year)
+        scan_ok = unfiltered or (match == "substring" and bool(title or author))
+        problems += _check(f"count_books {title} {author} {year} {match}",
+                           lambda db: crud.count_books(db, title, author, year, match), scan_ok=scan_ok)
+        problems += _check(f"export_books {title} {author} {year} {match}",
+                           lambda db: list(crud.export_books(db, title, author, year, match)), scan_ok=scan_ok,
+                           sort_ok=match == "fts")
+    assert not problems, "\n".join(problems)
+def test_author_queries_use_indexes():
+    problems = []
+    filters = [(None, "substring"), ("smith", "substring"), ("smith", "fts")]
+    for (name, match), sort, order, paged in itertools.product(
+            filters, ("book_count", "id", "relevance"), ("asc", "desc"), (False, True)):
+        if paged and sort == "relevance":
+            continue
+        cursor = encode_cursor(sort, order, 3 if sort == "book_count" else 50, 50) if paged else None
+        scan_ok = match == "substring"
+        problems += _check(
+            f"authors name={name} match={match} sort={sort} {order} cursor={paged}",
+            lambda db: crud.list_authors_paginated(db, name, sort, order, 20, 0, cursor=cursor, match=match,
+                                                   include="books"),
+            scan_ok=scan_ok, sort_ok=match == "fts")
+    for name, match in filters:
+        scan_ok = match == "substring"
+        problems += _check(f"count_authors {name} {match}", lambda db: crud.count_authors(db, name, match),
+                           scan_ok=scan_ok)
+        problems += _check(f"export_authors {name} {match}", lambda db: list(crud.export_authors(db, name, match)),
+                           scan_ok=scan_ok, sort_ok=match == "fts")
+    assert not problems, "\n".join(problems)
+def test_lookups_and_bulk_checks_use_indexes():
+    def lookups(db):
+        crud.get_book_by_id(db, 1, with_author=True)
+        crud.get_author_by_id(db, 1, with_books=True)
+        crud.get_books_by_ids(db, [1, 2, 3])
+        crud.get_authors_by_ids(db, [1, 2, 3])
+        crud.get_book_by_isbn(db, "0000000000")
+        crud.get_author_by_email(db, "nobody@example.com")
+        # duplicate / author checks and new-id lookup; _plans rolls the insert back
+        crud.bulk_create_books(db, [BookCreate(title="Plan", isbn="0000000001", author_id=1)], commit=False)
+    problems = _check("lookups", lookups)
+    assert not problems, "\n".join(problems)
+def test_stats_read_summary_tables():
+    # the summary tables hold at most one row per year, so grouping them is fine; top
+    # authors walks ix_authors_book_count_id in order and stops at LIMIT, unsorted
+    def reads(db):
+        stats.totals(db)
+        stats.year_counts(db, 1900, 2000)
+        stats.decade_counts(db)
+    problems = _check("stats", reads, sort_ok=True)
+    problems += _check("stats top authors", lambda db: stats.top_authors(db, 10), scan_ok=True)
+    assert not problems, "\n".join(problems)
@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+from app.settings import Settings
+from fastapi.testclient import TestClient
+def test_settings_from_env(monkeypatch):
+    monkeypatch.setenv("DATABASE_PATH", "/tmp/other.db")
+    monkeypatch.setenv("PREWARM", "yes")
+    monkeypatch.setenv("DB_READ_POOL_SIZE", "3")
+    s = Settings.from_env()
+    assert (s.database_path, s.prewarm, s.read_pool_size) == ("/tmp/other.db", True, 3)
+    assert Settings.from_env() == s
+def test_import_opens_nothing_and_prewarmed_app_serves(tmp_path):
+    # a fresh process, so the app's module-level state starts cold
+    env = dict(os.environ, DATABASE_PATH=str(tmp_path / "cold.db"), PREWARM="1")
+    code = """
+import os, subprocess, sys
+import main
+from app import db
+from fastapi.testclient import TestClient
+assert not any(db.database.created(n) for n in ("engine", "read_engine", "write_engine"))
+assert not os.path.exists(db.DATABASE_PATH)
+subprocess.run([sys.executable, "-m", "scripts.migrate"], check=True)
+with TestClient(main.create_app()) as client:
+    assert db.database.created("read_engine") and db.database.created("write_engine")
+    print(client.get("/stats/").status_code, client.get("/books/?limit=5").status_code)
+"""
+    out = subprocess.run([sys.executable, "-c", code], env=env, check=True, capture_output=True, text=True)
+    assert out.stdout.split()[-2:] == ["200", "200"]
+def test_second_app_on_another_file_starts_from_its_own_data(client, tmp_path):
+    from main import create_app
+    from tests.conftest import make_database
+    a = client.post("/authors", json={"name": "First File", "email": "first-file@example.com"}).json()
+    b = client.post("/books", json={"title": "Only Here", "isbn": "1212121212", "author_id": a["id"]}).json()
+    assert client.get(f"/books/{b['id']}").status_code == 200  # cached
+    total = client.get("/books/", params={"total": "exact"}).json()["total"]
+    other = TestClient(create_app(make_database(tmp_path / "other.db")))
+    assert other.get(f"/books/{b['id']}").status_code == 404
+    page = other.get("/books/", params={"total": "exact", "limit": 100}).json()
+    assert page["total"] == len(page["data"]) < total
+    assert other.patch("/books/1", json={"title": "After"}).status_code == 200
+    assert other.get("/books/1").json()["title"] == "After"
+    assert other.post("/books", json={"title": "Free", "isbn": "1212121212", "author_id": 1}).status_code == 201
@@ -0,0 +1,55 @@
+import uuid
+from sqlalchemy import text
+from app import db as database
+def _years(client):
+    return {row["year"]: row["books"] for row in client.get("/stats/years").json()}
+def test_stats_follow_writes_and_match_the_catalog(client):
+    tag = uuid.uuid4().hex[:8]
+    before, years_before = client.get("/stats").json(), _years(client)
+    a = client.post("/authors", json={"name": "Stats Author", "email": f"st-{tag}@example.com"}).json()
+    isbns = [str(uuid.uuid4().int)[:10] for _ in range(3)]
+    books = [client.post("/books", json={"title": "Stat", "isbn": i, "published_year": 1001, "author_id": a["id"]}).json()
+             for i in isbns[:2]]
+    client.post("/books/bulk", json=[{"title": "Stat", "isbn": isbns[2], "author_id": a["id"]}])
+    client.patch(f"/books/{books[0]['id']}", json={"published_year": 1002})
+    after, years = client.get("/stats").json(), _years(client)
+    assert after["books"] == before["books"] + 3 and after["authors"] == before["authors"] + 1
+    assert after["books_without_year"] == before["books_without_year"] + 1
+    assert years[1001] == years_before.get(1001, 0) + 1 and years[1002] == years_before.get(1002, 0) + 1
+    assert client.get("/stats/years", params={"from": 1001, "to": 1001}).json() == [{"year": 1001, "books": years[1001]}]
+    decades = {row["decade"]: row["books"] for row in client.get("/stats/decades").json()}
+    assert decades[1000] == sum(n for y, n in years.items() if 1000 <= y < 1010)
+    top = client.get("/stats/authors", params={"limit": 5}).json()
+    assert len(top) <= 5 and [t["book_count"] for t in top] == sorted((t["book_count"] for t in top), reverse=True)
+    with database.SessionLocal() as db:
+        actual = dict(db.execute(text("SELECT published_year, count(*) FROM books WHERE published_year IS NOT NULL "
+                                      "GROUP BY published_year")).all())
+        assert years == actual and after["books"] == db.scalar(text("SELECT count(*) FROM books"))
+def test_stats_etag_changes_with_writes(client):
+    r = client.get("/stats/years")
+    assert client.get("/stats/years", headers={"If-None-Match": r.headers["etag"]}).status_code == 304
+    tag = uuid.uuid4().hex[:8]
+    a = client.post("/authors", json={"name": "Etag Stats", "email": f"se-{tag}@example.com"}).json()
+    client.post("/books", json={"title": "E", "isbn": str(uuid.uuid4().int)[:10], "published_year": 1003, "author_id": a["id"]})
+    assert client.get("/stats/years", headers={"If-None-Match": r.headers["etag"]}).status_code == 200
+def test_rebuild_scripts_invalidate_running_workers(client):
+    import subprocess
+    import sys
+    def run(script):
+        return subprocess.run([sys.executable, "-m", script], check=True, capture_output=True, text=True).stdout
+    a = client.post("/authors", json={"name": "Drift", "email": f"drift-{uuid.uuid4().hex[:8]}@example.com"}).json()
+    client.post("/books", json={"title": "D", "isbn": str(uuid.uuid4().int)[:10], "author_id": a["id"]})
+    with database.SessionLocal() as db:  # edited by hand: nothing logged
+        db.execute(text("UPDATE authors SET book_count = 7 WHERE id = :id"), {"id": a["id"]})
+        db.commit()
+    listed = client.get("/authors/", params={"sort": "id", "order": "desc", "limit": 1})
+    assert listed.json()["data"][0]["book_count"] == 7
+    etag = client.get("/stats/").headers["etag"]
+    assert "(1 author(s) were out of date)" in run("scripts.rebuild_counts")
+    r = client.get("/authors/", params={"sort": "id", "order": "desc", "limit": 1},
+                   headers={"If-None-Match": listed.headers["etag"]})
+    assert r.status_code == 200 and r.json()["data"][0]["book_count"] == 1
+    assert client.get("/stats/", headers={"If-None-Match": etag}).status_code == 200
+    etag = client.get("/stats/").headers["etag"]
+    assert "0 author book count(s) were out of date" in run("scripts.rebuild_stats")
+    assert client.get("/stats/", headers={"If-None-Match": etag}).status_code == 200
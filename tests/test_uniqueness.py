@@ -0,0 +1,40 @@
+import random
+import uuid
+from fastapi.testclient import TestClient
+from app.uniqueness import BloomFilter, SortedKeys, unique_index
+from app.writer import write_queue
+def test_sorted_keys_and_bloom_filter():
+    keys = SortedKeys(range(0, 20000, 2))
+    keys.add(3)
+    keys.discard(4)
+    assert 3 in keys and 4 not in keys and 2 in keys and len(keys) == 10000
+    for k in range(5, 5000, 2):  # past the merge threshold
+        keys.add(k)
+    assert 4 not in keys and 4999 in keys and 19998 in keys and len(keys) == 10000 + 2498
+    bloom = BloomFilter(1000, 0.01)
+    added = [f"{uuid.uuid4().hex}@example.com" for _ in range(5000)]  # grows past its first layer
+    for email in added:
+        bloom.add(email)
+    assert all(email in bloom for email in added) and len(bloom.layers) > 1
+    others = sum(f"{uuid.uuid4().hex}@example.org" in bloom for _ in range(5000))
+    assert others < 5000 * 0.03 and bloom.expected_fp_rate() < 0.01
+def test_known_duplicates_are_rejected_without_a_write(app):
+    with TestClient(app) as client:  # the lifespan starts loading the index
+        assert unique_index.wait(10)
+        email = f"uq-{uuid.uuid4().hex[:8]}@example.com"
+        a = client.post("/authors", json={"name": "Unique", "email": email}).json()
+        isbn = str(random.randrange(10**9, 10**10))
+        b = client.post("/books", json={"title": "Unique", "isbn": isbn, "author_id": a["id"]}).json()
+        jobs, rejected = write_queue.jobs, dict(unique_index.rejected)
+        r1 = client.post("/authors", json={"name": "Again", "email": email})
+        r2 = client.post("/books", json={"title": "Again", "isbn": isbn, "author_id": a["id"]})
+        assert (r1.status_code, r1.json()["error"]) == (409, "Email already exists.")
+        assert (r2.status_code, r2.json()["error"]) == (409, "ISBN already exists.")
+        assert write_queue.jobs == jobs and unique_index.rejected != rejected
+        # changing a book's ISBN frees the old one
+        new_isbn = str(random.randrange(10**9, 10**10))
+        assert client.patch(f"/books/{b['id']}", json={"isbn": new_isbn}).status_code == 200
+        r = client.post("/books", json={"title": "Reuse", "isbn": isbn, "author_id": a["id"]})
+        assert r.status_code == 201
+        assert client.post("/books", json={"title": "Dup", "isbn": new_isbn, "author_id": a["id"]}).status_code == 409
+        assert "unique_index_email_fp_rate" in client.get("/metrics").text
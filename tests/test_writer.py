@@ -0,0 +1,19 @@
+import uuid
+import pytest
+from sqlalchemy.exc import IntegrityError
+from app import crud, schemas
+from app.writer import WriteQueue
+def test_write_queue_batches_and_isolates_failures():
+    wq = WriteQueue(max_batch=50, max_wait_ms=50)
+    try:
+        tag = uuid.uuid4().hex[:8]
+        emails = [f"w{i}-{tag}@example.com" for i in range(10)]
+        futures = [wq.submit(crud.create_author, schemas.AuthorCreate(name="Writer", email=e)) for e in emails]
+        futures.append(wq.submit(crud.create_author, schemas.AuthorCreate(name="Dup", email=emails[0])))
+        authors = [f.result(timeout=10) for f in futures[:-1]]
+        with pytest.raises(IntegrityError):
+            futures[-1].result(timeout=10)
+        assert [a.email for a in authors] == emails and len({a.id for a in authors}) == 10
+        assert wq.batches < wq.jobs and wq.failed == 1
+    finally:
+        wq.stop()